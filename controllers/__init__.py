@@ -1 +1,21 @@
 from .osc_handler import OSCHandler
+from .frame_publisher import SharedMemoryFramePublisher, SharedMemoryFrameReader
+from .output_pipeline import FrameRing, OutputPipeline
+from .delta_encoder import DeltaEncoder, DeltaDecoder
+from .frame_recorder import FrameRecorder, FrameReplayer
+from .frame_scheduler import FrameScheduler
+from .raw_output import RawRGBOutput
+from .osc_async_server import AsyncOSCServer
+from .osc_router import OSCRouter, OSCRoute
+from .update_queue import ParameterUpdateQueue
+from .bundle_scheduler import BundleScheduler
+from .state_dump import StateDumpSender
+from .osc_clients import OSCClient, OSCClientPool
+from .frame_stream import FrameStreamer
+from .ingress_queue import IngressQueue
+from .ramps import RampTable
+from .segment_schema import SegmentSchema
+from .namespace import NamespaceTree, NamespaceHTTPServer
+from .clock_source import ClockSource, OSCClock
+from .artnet_input import ArtNetInput, ArtNetMapping
+from .http_api import HTTPControlServer
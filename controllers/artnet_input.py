@@ -0,0 +1,474 @@
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import json
+import socket
+import struct
+import sys
+import threading
+import time
+import numpy as np
+
+sys.path.append('..')
+from controllers.osc_router import parse_segment_selector
+from controllers.packed_params import PACKED_SETTERS
+from controllers.update_queue import ParameterUpdateQueue
+from models.light_scene import LightScene
+from models.light_segment import LightSegment
+from utils.log_utils import get_logger
+
+logger = get_logger("artnet")
+
+ARTNET_PORT = 6454
+ARTNET_ID = b"Art-Net\0"
+OP_DMX = 0x5000
+PROTOCOL_VERSION = 14
+DMX_CHANNELS = 512
+
+# ArtDmx header: ID, opcode (little-endian), protocol version, sequence, physical port,
+# 15-bit port address (SubUni, then Net), data length (big-endian)
+ARTDMX_HEADER_SIZE = 18
+
+# Merge modes
+HTP = "htp"  # highest value of all sources wins (intensities)
+LTP = "ltp"  # latest received value wins
+
+# Seconds of silence after which a source no longer takes part in the merge (as in the Art-Net spec)
+SOURCE_TIMEOUT = 10.0
+
+# Most sources merged per universe; packets from further sources are discarded until one times out
+MAX_SOURCES = 8
+
+
+def parse_artdmx(data: bytes) -> Optional[Tuple[int, int, bytes]]:
+    """
+    Parse an ArtDmx packet.
+
+    Args:
+        data: UDP payload
+
+    Returns:
+        (universe, sequence, DMX data), or None if the packet is a valid Art-Net packet of
+        another kind (e.g. ArtPoll)
+
+    Raises:
+        ValueError: If the packet is not Art-Net or is malformed
+    """
+    if len(data) < 10 or not data.startswith(ARTNET_ID):
+        raise ValueError("Not an Art-Net packet")
+    opcode = data[8] | data[9] << 8
+    if opcode != OP_DMX:
+        return None
+    if len(data) < ARTDMX_HEADER_SIZE:
+        raise ValueError(f"ArtDmx packet too short ({len(data)} bytes)")
+    sequence = data[12]
+    universe = (data[14] | data[15] << 8) & 0x7FFF
+    length = data[16] << 8 | data[17]
+    if not 2 <= length <= DMX_CHANNELS or len(data) < ARTDMX_HEADER_SIZE + length:
+        raise ValueError(f"Invalid ArtDmx data length {length}")
+    return universe, sequence, data[ARTDMX_HEADER_SIZE:ARTDMX_HEADER_SIZE + length]
+
+
+def build_artdmx(universe: int, dmx: bytes, sequence: int = 0) -> bytes:
+    """
+    Build an ArtDmx packet (e.g. to test the input with a local sender).
+
+    Args:
+        universe: 15-bit port address
+        dmx: Channel values (padded to an even length of at least 2)
+        sequence: Sequence number 1~255, or 0 to disable reordering checks
+
+    Returns:
+        UDP payload
+    """
+    dmx = bytes(dmx[:DMX_CHANNELS]).ljust(2, b"\0")
+    if len(dmx) % 2:
+        dmx += b"\0"
+    return ARTNET_ID + struct.pack("<HxBBBH", OP_DMX, PROTOCOL_VERSION, sequence & 0xFF, 0, universe & 0x7FFF) \
+        + struct.pack(">H", len(dmx)) + dmx
+
+
+class ArtNetMapping(NamedTuple):
+    """
+    Maps consecutive DMX channels to a parameter of consecutive segments: the first
+    segment reads channel `channel` (1-based), the next one the following channel, or the
+    following two channels for 16-bit values (coarse, then fine).
+    """
+    universe: int
+    channel: int
+    scene_id: int
+    effect_id: int
+    segment_ids: Tuple[int, ...]
+    param: str
+    value_range: Tuple[float, float] = (0.0, 1.0)
+    fine: bool = False
+    merge: str = LTP
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ArtNetMapping":
+        """
+        Create a mapping from its JSON form, e.g. {"universe": 0, "channel": 1, "scene": 1,
+        "effect": 1, "segments": "[1-100]", "param": "transparency", "range": [0, 1],
+        "fine": false, "merge": "htp"}. "segments" is a list of IDs or a selector as in
+        bulk OSC addresses.
+        """
+        segments = data["segments"]
+        if isinstance(segments, str):
+            ranges = parse_segment_selector(segments)
+            if ranges is None:
+                raise ValueError("Art-Net mappings need explicit segment IDs")
+            segments = sorted({segment_id for first, last in ranges for segment_id in range(first, last + 1)})
+            if len(segments) > DMX_CHANNELS:
+                raise ValueError(f"Segments {data['segments']} need more than {DMX_CHANNELS} channels")
+        return cls(
+            universe=int(data.get("universe", 0)),
+            channel=int(data["channel"]),
+            scene_id=int(data.get("scene", 1)),
+            effect_id=int(data.get("effect", 1)),
+            segment_ids=tuple(int(segment_id) for segment_id in segments),
+            param=str(data["param"]),
+            value_range=tuple(float(value) for value in data.get("range", (0.0, 1.0))),
+            fine=bool(data.get("fine", False)),
+            merge=str(data.get("merge", LTP)).lower()
+        )
+
+
+def load_mappings(file_path: str) -> List[ArtNetMapping]:
+    """
+    Load Art-Net mappings from a JSON file holding a list of mappings (see ArtNetMapping.from_dict).
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        return [ArtNetMapping.from_dict(entry) for entry in json.load(f)]
+
+
+class _Group(NamedTuple):
+    # Rows of one universe's table that write the same parameter of the same effect
+    scene_id: int
+    effect_id: int
+    param: str
+    rows: np.ndarray
+    segment_ids: np.ndarray
+
+
+class _UniverseTable:
+    """
+    Compiled mappings of one universe: per row (one segment parameter) the coarse and fine
+    channel indexes and the scale to the parameter range, grouped by effect and parameter.
+    """
+
+    def __init__(self, mappings: List[ArtNetMapping]):
+        coarse, fine, low, scale, targets = [], [], [], [], []
+        self.htp = np.zeros(DMX_CHANNELS, dtype=bool)
+        self.mapped = np.zeros(DMX_CHANNELS, dtype=bool)
+        for mapping in mappings:
+            if mapping.param not in PACKED_SETTERS:
+                raise ValueError(f"Parameter {mapping.param} cannot be mapped to DMX "
+                                 f"(expected one of {', '.join(PACKED_SETTERS)})")
+            if mapping.merge not in (HTP, LTP):
+                raise ValueError(f"Unknown merge mode {mapping.merge}")
+            width = 2 if mapping.fine else 1
+            first = mapping.channel - 1
+            last = first + width * len(mapping.segment_ids)
+            if first < 0 or last > DMX_CHANNELS:
+                raise ValueError(f"Channels {mapping.channel}-{last} of universe {mapping.universe} are out of range")
+            self.mapped[first:last] = True
+            if mapping.merge == HTP:
+                self.htp[first:last] = True
+            full_scale = 65535.0 if mapping.fine else 255.0
+            minimum, maximum = mapping.value_range
+            for index, segment_id in enumerate(mapping.segment_ids):
+                channel = first + width * index
+                coarse.append(channel)
+                fine.append(channel + 1 if mapping.fine else channel)
+                low.append(minimum)
+                scale.append((maximum - minimum) / full_scale)
+                targets.append((mapping.scene_id, mapping.effect_id, mapping.param, segment_id, mapping.fine))
+
+        self.coarse = np.array(coarse, dtype=np.intp)
+        self.fine = np.array(fine, dtype=np.intp)
+        self.is_fine = np.array([target[4] for target in targets], dtype=bool)
+        self.low = np.array(low)
+        self.scale = np.array(scale)
+
+        groups: Dict[Tuple[int, int, str], List[int]] = {}
+        for row, (scene_id, effect_id, param, _, _) in enumerate(targets):
+            groups.setdefault((scene_id, effect_id, param), []).append(row)
+        self.groups = [
+            _Group(scene_id, effect_id, param, np.array(rows, dtype=np.intp),
+                   np.array([targets[row][3] for row in rows], dtype=np.int64))
+            for (scene_id, effect_id, param), rows in groups.items()
+        ]
+
+    def raw_values(self, dmx: np.ndarray) -> np.ndarray:
+        """
+        Get the raw value of every row (0~255, or 0~65535 for 16-bit rows).
+        """
+        coarse = dmx[self.coarse].astype(np.int32)
+        return np.where(self.is_fine, coarse * 256 + dmx[self.fine], coarse)
+
+
+class _UniverseState:
+    def __init__(self, table: _UniverseTable):
+        self.table = table
+        # Source address -> (latest DMX data, time received, last sequence)
+        self.sources: Dict[Tuple[str, int], Tuple[np.ndarray, float, int]] = {}
+        self.merged = np.zeros(DMX_CHANNELS, dtype=np.uint8)
+        # Raw row values last written to the segments (-1: never written)
+        self.applied = np.full(len(table.coarse), -1, dtype=np.int32)
+        self.queued = False
+
+        self.packets = 0
+        self.out_of_order = 0
+        self.refused_sources = 0
+        self.changes = 0
+        self.applied_frames = 0
+        self.applied_values = 0
+        self.last_packet = 0.0
+
+
+class ArtNetInput:
+    """
+    ArtNetInput receives DMX over Art-Net and writes mapped channels to segment parameters.
+
+    Packets from several sources for the same universe are merged per channel: channels of
+    HTP mappings take the highest value of all sources, the others (LTP) the latest value
+    received. Sources silent for SOURCE_TIMEOUT seconds drop out of the merge, and at most
+    max_sources take part at once. Packets with a sequence number behind the source's last
+    one are discarded. Packets for universes without mappings are only counted.
+
+    Mappings are compiled into per-universe arrays once. When a packet changes a mapped
+    channel, the universe is queued on the ParameterUpdateQueue (one entry per universe,
+    so packets arriving within one frame coalesce). At the frame boundary only the rows
+    whose raw value changed are scaled, in one vectorized pass, and written with one batch
+    update per effect and parameter.
+    """
+
+    def __init__(self, light_scenes: Dict[int, LightScene], update_queue: ParameterUpdateQueue,
+                 mappings: Iterable[ArtNetMapping], host: str = "0.0.0.0", port: int = ARTNET_PORT,
+                 setter_for: Callable[[str], Callable[[LightSegment, float], Any]] = None,
+                 on_update: Callable[[int, int], Any] = None, source_timeout: float = SOURCE_TIMEOUT,
+                 max_sources: int = MAX_SOURCES):
+        """
+        Initialize the input.
+
+        Args:
+            light_scenes: Dictionary mapping scene_ID to LightScene instances
+            update_queue: Queue applying updates at frame boundaries
+            mappings: Channel mappings (see ArtNetMapping)
+            host: Address to listen on
+            port: UDP port to listen on (0 picks a free port)
+            setter_for: Function returning the setter for a parameter (defaults to PACKED_SETTERS)
+            on_update: Called as on_update(scene_id, effect_id) after segments were updated
+            source_timeout: Seconds after which a silent source drops out of the merge
+            max_sources: Most sources merged per universe
+
+        Raises:
+            ValueError: If a mapping is invalid
+        """
+        self.light_scenes = light_scenes
+        self.update_queue = update_queue
+        self.setter_for = setter_for or PACKED_SETTERS.__getitem__
+        self.on_update = on_update
+        self.source_timeout = source_timeout
+        self.max_sources = max(1, max_sources)
+
+        by_universe: Dict[int, List[ArtNetMapping]] = {}
+        for mapping in mappings:
+            by_universe.setdefault(mapping.universe, []).append(mapping)
+        self.universes = {universe: _UniverseState(_UniverseTable(entries)) for universe, entries in by_universe.items()}
+        # Packets received per universe without mappings
+        self.unmapped: Dict[int, int] = {}
+        self.lock = threading.Lock()
+
+        self.host = host
+        self.port = port
+        self.socket: Optional[socket.socket] = None
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+        self.malformed = 0
+        self.ignored = 0
+
+    def start(self):
+        """
+        Bind the UDP socket and start receiving on a background thread.
+        """
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.settimeout(0.5)
+        self.port = self.socket.getsockname()[1]
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="artnet-input")
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info("start", "Art-Net input listening on %s:%d (%d universes mapped)", self.host, self.port, len(self.universes))
+
+    def stop(self):
+        """
+        Stop receiving and close the socket.
+        """
+        self.running = False
+        if self.thread:
+            self.thread.join(1.0)
+            self.thread = None
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+
+    def _run(self):
+        while self.running:
+            try:
+                data, address = self.socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.receive(data, address)
+
+    def receive(self, data: bytes, address: Tuple[str, int], now: Optional[float] = None) -> bool:
+        """
+        Process a received packet. Called by the receiving thread.
+
+        Args:
+            data: UDP payload
+            address: Address of the sender
+            now: Time received on the time.perf_counter() clock (defaults to now)
+
+        Returns:
+            True if the packet changed a mapped channel
+        """
+        try:
+            packet = parse_artdmx(data)
+        except ValueError as e:
+            self.malformed += 1
+            logger.warning("malformed", "Malformed Art-Net packet from %s: %s", address[0], e)
+            return False
+        if packet is None:
+            self.ignored += 1
+            return False
+        universe, sequence, dmx = packet
+        if now is None:
+            now = time.perf_counter()
+
+        with self.lock:
+            state = self.universes.get(universe)
+            if state is None:
+                self.unmapped[universe] = self.unmapped.get(universe, 0) + 1
+                return False
+            state.packets += 1
+            state.last_packet = now
+
+            source = state.sources.get(address)
+            if source is not None and sequence and source[2] and 0 < (source[2] - sequence) % 256 < 128:
+                state.out_of_order += 1
+                return False
+            if len(state.sources) > 1 or (source is None and state.sources):
+                expired = [key for key, (_, seen, _) in state.sources.items() if now - seen > self.source_timeout]
+                for key in expired:
+                    del state.sources[key]
+            if address not in state.sources and len(state.sources) >= self.max_sources:
+                state.refused_sources += 1
+                return False
+            values = np.zeros(DMX_CHANNELS, dtype=np.uint8)
+            values[:len(dmx)] = np.frombuffer(dmx, dtype=np.uint8)
+            state.sources[address] = (values, now, sequence)
+
+            if len(state.sources) > 1:
+                highest = np.max([source_values for source_values, _, _ in state.sources.values()], axis=0)
+                merged = np.where(state.table.htp, highest, values)
+            else:
+                merged = values
+
+            if np.array_equal(merged[state.table.mapped], state.merged[state.table.mapped]):
+                return False
+            state.merged = merged
+            state.changes += 1
+            queued, state.queued = state.queued, True
+
+        if not queued:
+            self.update_queue.submit(("artnet", universe), self._apply_universe, universe)
+        return True
+
+    def invalidate(self, scene_id: Optional[int] = None):
+        """
+        Write every mapped channel again at the next frame boundary, e.g. after a scene was
+        replaced by a loaded one whose segments no longer hold the DMX values.
+
+        Args:
+            scene_id: Only universes mapped to this scene (None for all)
+        """
+        with self.lock:
+            queue = []
+            for universe, state in self.universes.items():
+                if scene_id is not None and all(group.scene_id != scene_id for group in state.table.groups):
+                    continue
+                state.applied.fill(-1)
+                if state.sources and not state.queued:
+                    state.queued = True
+                    queue.append(universe)
+        for universe in queue:
+            self.update_queue.submit(("artnet", universe), self._apply_universe, universe)
+
+    def _apply_universe(self, universe: int):
+        # Runs on the render thread: write the rows whose raw value changed since the last write
+        with self.lock:
+            state = self.universes[universe]
+            state.queued = False
+            merged = state.merged
+
+        table = state.table
+        raw = table.raw_values(merged)
+        changed = raw != state.applied
+        if not changed.any():
+            return
+        state.applied = raw
+        values = table.low + table.scale * raw
+        state.applied_frames += 1
+
+        for group in table.groups:
+            group_changed = changed[group.rows]
+            if not group_changed.any():
+                continue
+            scene = self.light_scenes.get(group.scene_id)
+            effect = scene.effects.get(group.effect_id) if scene else None
+            if effect is None:
+                logger.warning("target", "Art-Net universe %d maps to missing effect %d in scene %d",
+                               universe, group.effect_id, group.scene_id)
+                continue
+            rows = group.rows[group_changed]
+            updated = effect.batch_update(group.segment_ids[group_changed].tolist(), values[rows].tolist(),
+                                          self.setter_for(group.param))
+            state.applied_values += len(updated)
+            if updated and self.on_update:
+                self.on_update(group.scene_id, group.effect_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get receive statistics.
+
+        Returns:
+            Dictionary with malformed and ignored (non-DMX) packet counts, packets received
+            per unmapped universe and, per mapped universe, packets received, packets dropped
+            as out of order or from sources over max_sources, active sources, packets that
+            changed a mapped channel, frames with writes, values written and seconds since the
+            last packet (None before the first)
+        """
+        now = time.perf_counter()
+        with self.lock:
+            return {
+                "malformed": self.malformed,
+                "ignored": self.ignored,
+                "unmapped": dict(self.unmapped),
+                "universes": {
+                    universe: {
+                        "packets": state.packets,
+                        "out_of_order": state.out_of_order,
+                        "refused_sources": state.refused_sources,
+                        "sources": len(state.sources),
+                        "changes": state.changes,
+                        "applied_frames": state.applied_frames,
+                        "applied_values": state.applied_values,
+                        "last_packet_age": now - state.last_packet if state.packets else None
+                    }
+                    for universe, state in self.universes.items()
+                }
+            }
@@ -0,0 +1,131 @@
+from typing import Any, Callable, Dict, List, Tuple
+import heapq
+import threading
+import time
+from pythonosc import osc_message
+from pythonosc.parsing import osc_types
+
+
+class BundleScheduler:
+    """
+    BundleScheduler holds OSC bundles until the frame their timetag falls on.
+
+    Timetags are converted from wall clock time to the render loop's clock and kept in a
+    timer heap. At the start of every frame all bundles due within half a frame interval
+    are dispatched together on the render thread, so every message of a bundle lands on
+    the same frame. Bundles tagged "immediately" and bundles whose time has already passed
+    run on the next frame; late bundles are counted.
+    """
+
+    def __init__(self, dispatch: Callable[[List[osc_message.OscMessage], Tuple[str, int]], Any],
+                 max_pending: int = 4096):
+        """
+        Initialize the scheduler.
+
+        Args:
+            dispatch: Function dispatching a list of messages, called as dispatch(messages, client_address)
+            max_pending: Maximum number of bundles waiting in the heap; further bundles are dropped
+        """
+        self.dispatch = dispatch
+        self.max_pending = max_pending
+        self.frame_scheduler = None
+        self.lock = threading.Lock()
+        self.heap: List[tuple] = []
+        self.sequence = 0
+
+        self.scheduled = 0
+        self.executed = 0
+        self.late = 0
+        self.dropped = 0
+        self.max_lead = 0.0
+        self.max_error = 0.0
+
+    def attach(self, frame_scheduler):
+        """
+        Run due bundles at the start of every frame of a frame scheduler.
+        Must be attached before the parameter update queue so writes from a bundle
+        are applied in the frame the bundle runs in.
+
+        Args:
+            frame_scheduler: FrameScheduler driving the render loop
+        """
+        self.frame_scheduler = frame_scheduler
+        frame_scheduler.add_pre_update_hook(self.run_due)
+
+    def schedule(self, timetag: float, messages: List[osc_message.OscMessage], client_address: Tuple[str, int]):
+        """
+        Schedule the messages of one bundle. Called from the OSC server thread.
+
+        Args:
+            timetag: Bundle time in seconds since the epoch, or osc_types.IMMEDIATELY
+            messages: Messages contained directly in the bundle
+            client_address: Address of the sender
+        """
+        if self.frame_scheduler is None:
+            self.dispatch(messages, client_address)
+            return
+
+        now = time.perf_counter()
+        if timetag == osc_types.IMMEDIATELY:
+            due = now
+        else:
+            due = timetag - time.time() + now
+            if due < now:
+                with self.lock:
+                    self.late += 1
+                due = now
+
+        with self.lock:
+            if len(self.heap) >= self.max_pending:
+                self.dropped += 1
+                return
+            self.scheduled += 1
+            self.sequence += 1
+            heapq.heappush(self.heap, (due, self.sequence, messages, client_address))
+            if due - now > self.max_lead:
+                self.max_lead = due - now
+
+    def run_due(self, frame_index: int = None) -> int:
+        """
+        Dispatch every bundle due on the current frame. Called by the render thread.
+
+        Args:
+            frame_index: Index of the frame being started
+
+        Returns:
+            Number of bundles dispatched
+        """
+        frame_start = self.frame_scheduler.frame_start
+        horizon = frame_start + self.frame_scheduler.frame_interval / 2
+        due_bundles = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= horizon:
+                due_bundles.append(heapq.heappop(self.heap))
+
+        for due, _, messages, client_address in due_bundles:
+            error = abs(frame_start - due)
+            if error > self.max_error:
+                self.max_error = error
+            self.dispatch(messages, client_address)
+        self.executed += len(due_bundles)
+        return len(due_bundles)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the scheduler counters.
+
+        Returns:
+            Dictionary with scheduled, executed, late, dropped and pending bundle counts,
+            the longest lead time and the largest distance between a timetag and its frame start
+        """
+        with self.lock:
+            pending = len(self.heap)
+        return {
+            "scheduled": self.scheduled,
+            "executed": self.executed,
+            "late": self.late,
+            "dropped": self.dropped,
+            "pending": pending,
+            "max_lead": self.max_lead,
+            "max_error": self.max_error
+        }
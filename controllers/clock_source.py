@@ -0,0 +1,279 @@
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+import sys
+import threading
+import time
+import numpy as np
+
+sys.path.append('..')
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+_UNIX_EPOCH = datetime(1970, 1, 1)
+
+
+def clock_seconds(value) -> float:
+    """
+    Convert a received clock value to seconds.
+
+    Args:
+        value: Seconds as a number, or an OSC timetag argument as parsed by python-osc
+               ((UTC datetime, fraction of 2**32) tuple)
+
+    Returns:
+        Time in seconds (Unix time for timetags)
+
+    Raises:
+        ValueError: If the value is not a finite time
+    """
+    if isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], datetime):
+        utc, fraction = value
+        seconds = (utc - _UNIX_EPOCH).total_seconds() + fraction / 2 ** 32
+    elif isinstance(value, (bool, str, bytes)):
+        raise ValueError(f"Expected a time, got {value!r}")
+    else:
+        seconds = float(value)
+    if not np.isfinite(seconds):
+        raise ValueError(f"Invalid clock time: {value!r}")
+    return seconds
+
+
+class ClockSource:
+    """
+    ClockSource supplies the show time that scenes and segments are advanced to on each
+    frame (see FrameScheduler.set_clock). The base class runs free on the local
+    time.perf_counter() clock, starting at zero on the first frame.
+    """
+
+    name = "internal"
+
+    def __init__(self):
+        self.origin: Optional[float] = None
+        self.time = 0.0
+
+    def tick(self, now: Optional[float] = None) -> float:
+        """
+        Get the show time of the frame starting now. Called once per frame on the render thread.
+
+        Args:
+            now: Start of the frame on the time.perf_counter() clock (defaults to now)
+
+        Returns:
+            Show time in seconds
+        """
+        if now is None:
+            now = time.perf_counter()
+        if self.origin is None:
+            self.origin = now
+        self.time = now - self.origin
+        return self.time
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the clock state.
+
+        Returns:
+            Dictionary with the clock source name and the current show time
+        """
+        return {"source": self.name, "time": self.time}
+
+
+class OSCClock(ClockSource):
+    """
+    OSCClock follows an external clock (e.g. the playback position of an audio or video
+    player) from periodic OSC timestamp messages.
+
+    Each sample pairs the received time with the local time it arrived. A least-squares
+    line through the last samples estimates the remote clock's offset and rate, so network
+    and scheduling jitter averages out instead of reaching the show time. Samples far off
+    the line (late packets) are discarded; several in a row, or one off by more than
+    jump_threshold, mean the remote clock was seeked, paused or restarted and the estimate
+    starts over.
+
+    The show time does not follow the estimate step by step. Like a PLL it runs at the
+    estimated rate and pulls in the remaining error with the time constant slew_time,
+    changing speed by at most max_slew, so corrections stay invisible. Errors larger than
+    jump_threshold are applied at once. When samples stop arriving the clock keeps running
+    at the last estimated rate (holdover).
+
+    add_sample() is called from the OSC threads, tick() from the render thread.
+    """
+
+    name = "osc"
+
+    def __init__(self, window: int = 64, slew_time: float = 0.5, max_slew: float = 0.05,
+                 jump_threshold: float = 0.25, outlier_factor: float = 3.0, min_jitter: float = 0.002,
+                 holdover: float = 2.0, latency: float = 0.0):
+        """
+        Initialize the clock.
+
+        Args:
+            window: Number of samples in the regression
+            slew_time: Time constant in seconds for pulling in the error
+            max_slew: Largest relative speed change used for corrections (0.05 = 5%)
+            jump_threshold: Errors in seconds above which the clock jumps instead of slewing
+            outlier_factor: Samples further off the line than this many times the jitter are discarded
+            min_jitter: Lower bound in seconds for the jitter used in outlier rejection
+            holdover: Seconds without samples after which the clock reports holdover
+            latency: Seconds added to the remote time (to compensate for a fixed output delay)
+        """
+        super().__init__()
+        self.window = deque(maxlen=max(2, window))
+        self.slew_time = slew_time
+        self.max_slew = max_slew
+        self.jump_threshold = jump_threshold
+        self.outlier_factor = outlier_factor
+        self.min_jitter = min_jitter
+        self.holdover = holdover
+        self.latency = latency
+        self.lock = threading.Lock()
+
+        # Current estimate: remote time = anchor_remote + rate * (local time - anchor_local)
+        self.locked = False
+        self.anchor_local = 0.0
+        self.anchor_remote = 0.0
+        self.rate = 1.0
+        self.jitter = 0.0
+        self.last_sample: Optional[float] = None
+        self.run_of_outliers = 0
+
+        # Output
+        self.synced = False
+        self.last_tick: Optional[float] = None
+        self.error = 0.0
+
+        self.samples = 0
+        self.outliers = 0
+        self.jumps = 0
+        self.resyncs = 0
+
+    def add_sample(self, remote_time: float, received: Optional[float] = None) -> bool:
+        """
+        Add a timestamp received from the external clock.
+
+        Args:
+            remote_time: Remote clock time in seconds
+            received: Local arrival time on the time.perf_counter() clock (defaults to now)
+
+        Returns:
+            False if the sample was discarded as an outlier
+        """
+        if received is None:
+            received = time.perf_counter()
+        with self.lock:
+            self.samples += 1
+            self.last_sample = received
+            if self.locked:
+                error = remote_time - self._estimate(received)
+                if abs(error) > self.jump_threshold:
+                    self._restart("Remote clock jumped by %.3fs", error)
+                elif len(self.window) >= 4 and abs(error) > max(self.outlier_factor * self.jitter, self.min_jitter):
+                    self.run_of_outliers += 1
+                    if self.run_of_outliers < 4:
+                        self.outliers += 1
+                        return False
+                    self._restart("Remote clock rate changed (error %.3fs)", error)
+                else:
+                    self.run_of_outliers = 0
+
+            self.window.append((received, remote_time))
+            self._fit()
+            return True
+
+    def _restart(self, message: str, error: float):
+        logger.info("clock.jump", message, error)
+        self.window.clear()
+        self.run_of_outliers = 0
+        self.jumps += 1
+
+    def _fit(self):
+        samples = np.array(self.window)
+        local, remote = samples[:, 0], samples[:, 1]
+        local_mean, remote_mean = local.mean(), remote.mean()
+        dx = local - local_mean
+        span = local[-1] - local[0]
+        # Rates fitted over a fraction of a second are mostly jitter; assume real time until then
+        if span >= 0.5:
+            rate = max(float(np.dot(dx, remote - remote_mean) / np.dot(dx, dx)), 0.0)
+        else:
+            rate = 1.0
+        residuals = remote - remote_mean - rate * dx
+        self.anchor_local = float(local_mean)
+        self.anchor_remote = float(remote_mean)
+        self.rate = rate
+        self.jitter = float(np.sqrt(np.mean(residuals * residuals))) if len(samples) > 2 else 0.0
+        self.locked = True
+
+    def _estimate(self, now: float) -> float:
+        return self.anchor_remote + self.rate * (now - self.anchor_local)
+
+    def tick(self, now: Optional[float] = None) -> float:
+        """
+        Get the show time of the frame starting now. Called once per frame on the render thread.
+        Until the first sample arrives the clock runs free from zero.
+
+        Args:
+            now: Start of the frame on the time.perf_counter() clock (defaults to now)
+
+        Returns:
+            Show time in seconds
+        """
+        if now is None:
+            now = time.perf_counter()
+        dt = 0.0 if self.last_tick is None else now - self.last_tick
+        self.last_tick = now
+
+        with self.lock:
+            if not self.locked:
+                self.time += dt
+                return self.time
+            target = self._estimate(now) + self.latency
+            rate = self.rate
+
+        predicted = self.time + rate * dt
+        error = target - predicted
+        if not self.synced or abs(error) > self.jump_threshold:
+            # First lock, or too far off to slew
+            self.synced = True
+            self.time = target
+            self.resyncs += 1
+        else:
+            limit = self.max_slew * dt
+            self.time = predicted + min(max(error * dt / self.slew_time, -limit), limit)
+        self.error = target - self.time
+        return self.time
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the clock state and filter statistics.
+
+        Returns:
+            Dictionary with the state (free, locked or holdover), the show time, the offset
+            of the remote clock from the local clock, rate and drift, the jitter (RMS distance
+            of the samples from the fitted line) and remaining error in milliseconds, and
+            the sample, outlier, jump and resync counts
+        """
+        now = time.perf_counter()
+        with self.lock:
+            if not self.locked:
+                state = "free"
+            elif now - self.last_sample > self.holdover:
+                state = "holdover"
+            else:
+                state = "locked"
+            return {
+                "source": self.name,
+                "state": state,
+                "time": self.time,
+                "offset": self._estimate(now) - now if self.locked else 0.0,
+                "rate": self.rate,
+                "drift_ppm": (self.rate - 1.0) * 1e6,
+                "jitter_ms": self.jitter * 1000.0,
+                "error_ms": self.error * 1000.0,
+                "samples": self.samples,
+                "outliers": self.outliers,
+                "jumps": self.jumps,
+                "resyncs": self.resyncs
+            }
@@ -0,0 +1,243 @@
+from typing import Dict, Optional
+import struct
+import sys
+import numpy as np
+
+sys.path.append('..')
+from utils.frame_utils import Frame, frame_to_array
+
+MAGIC = b"CD"
+KEYFRAME = 0
+DELTA = 1
+
+# magic, packet kind, sequence, base sequence (0 for keyframes), LED count
+HEADER_FORMAT = "<2sBxIII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RUN_DTYPE = np.dtype([("start", "<u4"), ("length", "<u4")])
+
+
+class DeltaEncoder:
+    """
+    DeltaEncoder turns successive LED frames into compact packets for network outputs.
+    Each frame is compared against the last acknowledged frame and sent either as runs of
+    changed pixels or, when the delta is too large or a keyframe is due, as a full keyframe.
+
+    Packet layout (little-endian):
+        header: magic "CD", kind (0 keyframe, 1 delta), sequence, base sequence, LED count
+        keyframe payload: LED count * 3 bytes of RGB
+        delta payload: run count (u32), runs as (start u32, length u32), then the RGB bytes of all runs
+    """
+
+    def __init__(self, keyframe_interval: int = 60, delta_threshold: float = 0.5,
+                 merge_gap: int = 2, require_ack: bool = False, history: int = 16):
+        """
+        Initialize the encoder.
+
+        Args:
+            keyframe_interval: Maximum number of frames between keyframes (for loss recovery)
+            delta_threshold: Send a keyframe when the delta would exceed this fraction of a keyframe
+            merge_gap: Unchanged pixels shorter than this between two runs are sent to save run headers
+            require_ack: Diff against acknowledged frames only (otherwise against the last sent frame)
+            history: Number of sent frames kept for acknowledgement
+        """
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.delta_threshold = delta_threshold
+        self.merge_gap = merge_gap
+        self.require_ack = require_ack
+        self.history = max(1, history)
+
+        self.sequence = 0
+        self.reference = None
+        self.reference_sequence = 0
+        self.frames_since_keyframe = 0
+        self.force_keyframe = True
+        self.sent_frames: Dict[int, np.ndarray] = {}
+
+        self.keyframes = 0
+        self.deltas = 0
+        self.bytes_sent = 0
+        self.raw_bytes = 0
+
+    def request_keyframe(self):
+        """
+        Force the next encoded frame to be a keyframe (e.g. when a receiver reports loss).
+        """
+        self.force_keyframe = True
+
+    def acknowledge(self, sequence: int):
+        """
+        Mark a sent frame as received so later deltas are based on it.
+
+        Args:
+            sequence: Sequence number reported by the receiver
+        """
+        frame = self.sent_frames.get(sequence)
+        if frame is not None and sequence > self.reference_sequence:
+            self.reference = frame
+            self.reference_sequence = sequence
+            for old in [s for s in self.sent_frames if s < sequence]:
+                del self.sent_frames[old]
+
+    def encode(self, frame: Frame) -> bytes:
+        """
+        Encode a frame as a keyframe or delta packet.
+
+        Args:
+            frame: Rendered frame as returned by render() or get_led_output()
+
+        Returns:
+            Packet bytes ready to be sent
+        """
+        pixels = frame_to_array(frame).copy()
+        led_count = len(pixels)
+        self.sequence += 1
+        self.raw_bytes += HEADER_SIZE + pixels.nbytes
+
+        packet = None
+        if (not self.force_keyframe
+                and self.reference is not None
+                and len(self.reference) == led_count
+                and self.frames_since_keyframe < self.keyframe_interval):
+            packet = self._encode_delta(pixels)
+
+        if packet is None:
+            packet = struct.pack(HEADER_FORMAT, MAGIC, KEYFRAME, self.sequence, 0, led_count) + pixels.tobytes()
+            self.keyframes += 1
+            self.frames_since_keyframe = 0
+            self.force_keyframe = False
+        else:
+            self.deltas += 1
+            self.frames_since_keyframe += 1
+
+        self._remember(pixels)
+        self.bytes_sent += len(packet)
+        return packet
+
+    def _encode_delta(self, pixels: np.ndarray) -> Optional[bytes]:
+        diff = pixels != self.reference
+        changed = diff[:, 0] | diff[:, 1] | diff[:, 2]
+        edges = np.diff(np.concatenate(([0], changed.view(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        if len(starts) > 1 and self.merge_gap > 0:
+            keep = (starts[1:] - ends[:-1]) > self.merge_gap
+            starts = np.concatenate((starts[:1], starts[1:][keep]))
+            ends = np.concatenate((ends[:-1][keep], ends[-1:]))
+
+        runs = np.empty(len(starts), dtype=RUN_DTYPE)
+        runs["start"] = starts
+        runs["length"] = ends - starts
+
+        covered = np.zeros(len(pixels) + 1, dtype=np.int32)
+        covered[starts] = 1
+        covered[ends] = -1
+        data = pixels[np.cumsum(covered[:-1]) > 0]
+
+        size = HEADER_SIZE + 4 + runs.nbytes + data.nbytes
+        if size > (HEADER_SIZE + pixels.nbytes) * self.delta_threshold:
+            return None
+
+        header = struct.pack(HEADER_FORMAT, MAGIC, DELTA, self.sequence, self.reference_sequence, len(pixels))
+        return header + struct.pack("<I", len(runs)) + runs.tobytes() + data.tobytes()
+
+    def _remember(self, pixels: np.ndarray):
+        if not self.require_ack:
+            self.reference = pixels
+            self.reference_sequence = self.sequence
+            return
+
+        self.sent_frames[self.sequence] = pixels
+        while len(self.sent_frames) > self.history:
+            del self.sent_frames[min(self.sent_frames)]
+
+    def get_stats(self) -> Dict:
+        """
+        Get encoder counters.
+
+        Returns:
+            Dictionary with keyframe/delta counts and the bytes saved compared to raw frames
+        """
+        return {
+            "keyframes": self.keyframes,
+            "deltas": self.deltas,
+            "bytes_sent": self.bytes_sent,
+            "raw_bytes": self.raw_bytes,
+            "ratio": self.bytes_sent / self.raw_bytes if self.raw_bytes else 1.0
+        }
+
+
+class DeltaDecoder:
+    """
+    DeltaDecoder rebuilds frames from packets produced by DeltaEncoder on the receiving side.
+    """
+
+    def __init__(self, history: int = 16):
+        """
+        Initialize the decoder.
+
+        Args:
+            history: Number of decoded frames kept as possible delta bases
+        """
+        self.history = max(1, history)
+        self.frames: Dict[int, np.ndarray] = {}
+        self.last_sequence = 0
+        self.missing_base = 0
+
+    def decode(self, packet: bytes) -> Optional[np.ndarray]:
+        """
+        Decode a packet into a full frame.
+
+        Args:
+            packet: Packet bytes from DeltaEncoder.encode()
+
+        Returns:
+            (n, 3) uint8 frame, or None if the packet is invalid or its base frame was lost
+        """
+        if len(packet) < HEADER_SIZE:
+            return None
+        magic, kind, sequence, base_sequence, led_count = struct.unpack_from(HEADER_FORMAT, packet, 0)
+        if magic != MAGIC:
+            return None
+
+        if kind == KEYFRAME:
+            if len(packet) != HEADER_SIZE + led_count * 3:
+                return None
+            frame = np.frombuffer(packet, dtype=np.uint8, count=led_count * 3, offset=HEADER_SIZE).reshape(-1, 3).copy()
+        elif kind == DELTA:
+            if len(packet) < HEADER_SIZE + 4:
+                return None
+            run_count = struct.unpack_from("<I", packet, HEADER_SIZE)[0]
+            data_offset = HEADER_SIZE + 4 + run_count * RUN_DTYPE.itemsize
+            if data_offset > len(packet) or (len(packet) - data_offset) % 3:
+                return None
+
+            base = self.frames.get(base_sequence)
+            if base is None or len(base) != led_count:
+                self.missing_base += 1
+                return None
+
+            runs = np.frombuffer(packet, dtype=RUN_DTYPE, count=run_count, offset=HEADER_SIZE + 4)
+            data = np.frombuffer(packet, dtype=np.uint8, offset=data_offset).reshape(-1, 3)
+            starts = runs["start"].astype(np.int64)
+            ends = starts + runs["length"]
+            if run_count and ends.max() > led_count:
+                return None
+
+            covered = np.zeros(led_count + 1, dtype=np.int32)
+            np.add.at(covered, starts, 1)
+            np.add.at(covered, ends, -1)
+            changed = np.cumsum(covered[:-1]) > 0
+            # Overlapping runs cover fewer pixels than the packet has data for
+            if np.count_nonzero(changed) != len(data):
+                return None
+            frame = base.copy()
+            frame[changed] = data
+        else:
+            return None
+
+        self.frames[sequence] = frame
+        while len(self.frames) > self.history:
+            del self.frames[min(self.frames)]
+        self.last_sequence = max(self.last_sequence, sequence)
+        return frame
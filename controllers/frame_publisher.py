@@ -0,0 +1,209 @@
+from typing import Optional, NamedTuple
+import struct
+import sys
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+sys.path.append('..')
+from utils.frame_utils import Frame, frame_to_array
+
+MAGIC = b"CSSF"
+LAYOUT_VERSION = 1
+HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 32
+
+# Header layout: magic, layout version, slot count, LED capacity, then the latest sequence at offset 16
+HEADER_FORMAT = "<4sIII"
+LATEST_OFFSET = 16
+
+# Slot header layout: seqlock word at 0, timestamp at 8, LED count at 16
+SLOT_LOCK_OFFSET = 0
+SLOT_TIMESTAMP_OFFSET = 8
+SLOT_COUNT_OFFSET = 16
+
+
+class SharedFrame(NamedTuple):
+    sequence: int
+    timestamp: float
+    pixels: np.ndarray
+
+
+def _slot_size(capacity: int) -> int:
+    data_size = capacity * 3
+    return SLOT_HEADER_SIZE + ((data_size + 7) // 8) * 8
+
+
+def _map_slots(buf, slot_count: int, capacity: int) -> list:
+    """
+    Create numpy views over each slot of a shared memory frame ring.
+
+    Args:
+        buf: Shared memory buffer
+        slot_count: Number of slots in the ring
+        capacity: Maximum number of LEDs per frame
+
+    Returns:
+        List of (lock, timestamp, led_count, pixels) views, one per slot
+    """
+    slots = []
+    slot_size = _slot_size(capacity)
+    for i in range(slot_count):
+        base = HEADER_SIZE + i * slot_size
+        slots.append((
+            np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=base + SLOT_LOCK_OFFSET),
+            np.ndarray((1,), dtype=np.float64, buffer=buf, offset=base + SLOT_TIMESTAMP_OFFSET),
+            np.ndarray((1,), dtype=np.uint32, buffer=buf, offset=base + SLOT_COUNT_OFFSET),
+            np.ndarray((capacity, 3), dtype=np.uint8, buffer=buf, offset=base + SLOT_HEADER_SIZE)
+        ))
+    return slots
+
+
+class SharedMemoryFramePublisher:
+    """
+    SharedMemoryFramePublisher writes rendered LED frames into a shared memory ring buffer.
+    Each slot is guarded by a seqlock word so readers in other processes can copy frames
+    without locks or serialization and detect frames that were overwritten mid-copy.
+    """
+
+    def __init__(self, name: str, led_count: int, slot_count: int = 4):
+        """
+        Create the shared memory segment for the frame ring.
+
+        Args:
+            name: Name of the shared memory segment consumers attach to
+            led_count: Maximum number of LEDs per frame
+            slot_count: Number of frames kept in the ring
+        """
+        self.name = name
+        self.capacity = led_count
+        self.slot_count = max(2, slot_count)
+        self.sequence = 0
+
+        size = HEADER_SIZE + self.slot_count * _slot_size(self.capacity)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a publisher that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.shm.buf[:size] = bytes(size)
+        struct.pack_into(HEADER_FORMAT, self.shm.buf, 0, MAGIC, LAYOUT_VERSION, self.slot_count, self.capacity)
+
+        self._latest = np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf, offset=LATEST_OFFSET)
+        self._slots = _map_slots(self.shm.buf, self.slot_count, self.capacity)
+
+    def publish(self, frame: Frame, timestamp: Optional[float] = None) -> int:
+        """
+        Write a frame into the next slot of the ring.
+
+        Args:
+            frame: Rendered frame as returned by render() or get_led_output()
+            timestamp: Frame timestamp in seconds (defaults to time.time())
+
+        Returns:
+            Sequence number of the published frame
+        """
+        pixels = frame_to_array(frame)
+        count = min(len(pixels), self.capacity)
+        sequence = self.sequence + 1
+        lock, stamp, led_count, data = self._slots[sequence % self.slot_count]
+
+        lock[0] = 2 * sequence - 1
+        data[:count] = pixels[:count]
+        stamp[0] = time.time() if timestamp is None else timestamp
+        led_count[0] = count
+        lock[0] = 2 * sequence
+
+        self._latest[0] = sequence
+        self.sequence = sequence
+        return sequence
+
+    def close(self):
+        """
+        Release the shared memory segment and remove it from the system.
+        """
+        self._latest = None
+        self._slots = []
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedMemoryFrameReader:
+    """
+    SharedMemoryFrameReader attaches to a frame ring created by SharedMemoryFramePublisher
+    and copies out the most recent consistent frame.
+    """
+
+    def __init__(self, name: str):
+        """
+        Attach to an existing shared memory frame ring.
+
+        Args:
+            name: Name of the shared memory segment
+        """
+        if sys.version_info >= (3, 13):
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Readers must not unlink the segment owned by the publisher when they exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        magic, version, self.slot_count, self.capacity = struct.unpack_from(HEADER_FORMAT, self.shm.buf, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self.shm.close()
+            raise ValueError(f"Shared memory segment {name} is not a frame ring")
+
+        self._latest = np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf, offset=LATEST_OFFSET)
+        self._slots = _map_slots(self.shm.buf, self.slot_count, self.capacity)
+        for views in self._slots:
+            for view in views:
+                view.flags.writeable = False
+
+    @property
+    def latest_sequence(self) -> int:
+        return int(self._latest[0])
+
+    def read_latest(self, after: int = 0, retries: int = 8) -> Optional[SharedFrame]:
+        """
+        Copy the most recently published frame.
+
+        Args:
+            after: Only return a frame whose sequence number is greater than this
+            retries: Number of attempts before giving up when the writer keeps overtaking
+
+        Returns:
+            SharedFrame with sequence, timestamp and an (n, 3) uint8 copy of the pixels,
+            or None if no newer consistent frame is available
+        """
+        for _ in range(retries):
+            sequence = int(self._latest[0])
+            if sequence == 0 or sequence <= after:
+                return None
+
+            lock, stamp, led_count, data = self._slots[sequence % self.slot_count]
+            before = int(lock[0])
+            if before != 2 * sequence:
+                continue
+
+            timestamp = float(stamp[0])
+            pixels = data[:int(led_count[0])].copy()
+
+            if int(lock[0]) == before:
+                return SharedFrame(sequence, timestamp, pixels)
+
+        return None
+
+    def close(self):
+        """
+        Detach from the shared memory segment without removing it.
+        """
+        self._latest = None
+        self._slots = []
+        self.shm.close()
@@ -0,0 +1,305 @@
+from typing import Callable, Iterator, List, Optional, Tuple
+import bisect
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+import numpy as np
+
+sys.path.append('..')
+from utils.frame_utils import Frame, frame_to_array
+
+FILE_MAGIC = b"CSSREC01"
+CHUNK_MAGIC = b"CHNK"
+INDEX_MAGIC = b"CSSIDX01"
+
+# File header: magic, frames per chunk, reserved
+FILE_HEADER_FORMAT = "<8sII"
+# Chunk header: magic, frame count, compressed size, raw size, first timestamp, last timestamp
+CHUNK_HEADER_FORMAT = "<4sIIIdd"
+# Trailer: magic, index offset, index entry count
+TRAILER_FORMAT = "<8sQI"
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("first", "<f8"), ("last", "<f8"), ("count", "<u4")])
+
+FILE_HEADER_SIZE = struct.calcsize(FILE_HEADER_FORMAT)
+CHUNK_HEADER_SIZE = struct.calcsize(CHUNK_HEADER_FORMAT)
+TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+
+
+class FrameRecorder:
+    """
+    FrameRecorder appends rendered frames to a chunked, zlib-compressed recording file.
+    Frames are buffered and compressed one chunk at a time; an index of chunk offsets
+    and timestamps is written at the end so replay can seek without reading the whole file.
+
+    Each chunk holds the frame timestamps (float64), the LED count of every frame (uint32)
+    and the concatenated RGB bytes, compressed together.
+
+    As a FrameScheduler frame hook, record() stamps every rendered frame with its render
+    time and queues it without limit, so no frame is skipped; after start() the chunks are
+    compressed and written on a writer thread instead of the render thread.
+    """
+
+    def __init__(self, file_path: str, frames_per_chunk: int = 120, compression_level: int = 1):
+        """
+        Open a new recording.
+
+        Args:
+            file_path: Path of the recording file (overwritten if it exists)
+            frames_per_chunk: Number of frames compressed together
+            compression_level: zlib compression level (1 favours speed)
+        """
+        self.file_path = file_path
+        self.frames_per_chunk = max(1, frames_per_chunk)
+        self.compression_level = compression_level
+
+        self.file = open(file_path, "wb")
+        self.file.write(struct.pack(FILE_HEADER_FORMAT, FILE_MAGIC, self.frames_per_chunk, 0))
+
+        self.timestamps: List[float] = []
+        self.counts: List[int] = []
+        self.pixels: List[bytes] = []
+        self.index: List[Tuple[int, float, float, int]] = []
+        self.frames_written = 0
+
+        self.queue: Optional[queue.Queue] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """
+        Write the frames passed to record() on a writer thread.
+        """
+        if self.thread is not None:
+            return
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="frame-recorder")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def record(self, frame: Frame):
+        """
+        Record a frame as it is rendered, stamped with the current time. Use as a
+        FrameScheduler frame hook.
+
+        Args:
+            frame: Rendered frame as returned by render() or get_led_output()
+        """
+        if self.queue is None:
+            self.write_frame(frame)
+        else:
+            # Copied: the renderer may reuse its array for the next frame
+            self.queue.put((np.array(frame_to_array(frame)), time.time()))
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            self.write_frame(*job)
+
+    def write_frame(self, frame: Frame, timestamp: Optional[float] = None):
+        """
+        Append a frame to the recording.
+
+        Args:
+            frame: Rendered frame as returned by render() or get_led_output()
+            timestamp: Frame timestamp in seconds (defaults to time.time())
+        """
+        pixels = frame_to_array(frame)
+        self.timestamps.append(time.time() if timestamp is None else timestamp)
+        self.counts.append(len(pixels))
+        self.pixels.append(pixels.tobytes())
+        self.frames_written += 1
+
+        if len(self.timestamps) >= self.frames_per_chunk:
+            self.flush()
+
+    def capture(self, source, timestamp: Optional[float] = None):
+        """
+        Record the current output of a LightScene or SceneManager.
+
+        Args:
+            source: Object providing get_led_output()
+            timestamp: Frame timestamp in seconds (defaults to time.time())
+        """
+        self.write_frame(source.get_led_output(), timestamp)
+
+    def flush(self):
+        """
+        Compress and write the buffered frames as one chunk.
+        """
+        if not self.timestamps:
+            return
+
+        raw = (np.asarray(self.timestamps, dtype="<f8").tobytes()
+               + np.asarray(self.counts, dtype="<u4").tobytes()
+               + b"".join(self.pixels))
+        data = zlib.compress(raw, self.compression_level)
+
+        offset = self.file.tell()
+        self.file.write(struct.pack(CHUNK_HEADER_FORMAT, CHUNK_MAGIC, len(self.timestamps),
+                                    len(data), len(raw), self.timestamps[0], self.timestamps[-1]))
+        self.file.write(data)
+        self.index.append((offset, self.timestamps[0], self.timestamps[-1], len(self.timestamps)))
+
+        self.timestamps = []
+        self.counts = []
+        self.pixels = []
+
+    def close(self):
+        """
+        Write the queued frames, flush, write the chunk index and close the file.
+        """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.file.closed:
+            return
+        self.flush()
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+        self.file.write(struct.pack(TRAILER_FORMAT, INDEX_MAGIC, index_offset, len(self.index)))
+        self.file.close()
+
+
+class FrameReplayer:
+    """
+    FrameReplayer reads recordings written by FrameRecorder.
+    Only the chunk index is kept in memory; chunks are decompressed one at a time
+    while streaming, so memory use is bounded by a single chunk.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Open a recording and load its chunk index.
+
+        Args:
+            file_path: Path of the recording file
+        """
+        self.file_path = file_path
+        self.file = open(file_path, "rb")
+        magic, self.frames_per_chunk, _ = struct.unpack(FILE_HEADER_FORMAT, self.file.read(FILE_HEADER_SIZE))
+        if magic != FILE_MAGIC:
+            self.file.close()
+            raise ValueError(f"{file_path} is not a frame recording")
+
+        self.index = self._read_index()
+        self.chunk_starts = [float(entry["first"]) for entry in self.index]
+        self.running = False
+
+    def _read_index(self) -> np.ndarray:
+        size = os.fstat(self.file.fileno()).st_size
+        if size >= FILE_HEADER_SIZE + TRAILER_SIZE:
+            self.file.seek(size - TRAILER_SIZE)
+            magic, index_offset, count = struct.unpack(TRAILER_FORMAT, self.file.read(TRAILER_SIZE))
+            if magic == INDEX_MAGIC:
+                self.file.seek(index_offset)
+                return np.frombuffer(self.file.read(count * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+
+        # The recording was not closed cleanly: rebuild the index by walking the chunk headers
+        entries = []
+        offset = FILE_HEADER_SIZE
+        while offset + CHUNK_HEADER_SIZE <= size:
+            self.file.seek(offset)
+            magic, count, compressed, _, first, last = struct.unpack(CHUNK_HEADER_FORMAT, self.file.read(CHUNK_HEADER_SIZE))
+            if magic != CHUNK_MAGIC or offset + CHUNK_HEADER_SIZE + compressed > size:
+                break
+            entries.append((offset, first, last, count))
+            offset += CHUNK_HEADER_SIZE + compressed
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    @property
+    def frame_count(self) -> int:
+        return int(self.index["count"].sum()) if len(self.index) else 0
+
+    @property
+    def start_time(self) -> float:
+        return float(self.index[0]["first"]) if len(self.index) else 0.0
+
+    @property
+    def duration(self) -> float:
+        return float(self.index[-1]["last"] - self.index[0]["first"]) if len(self.index) else 0.0
+
+    def _read_chunk(self, chunk: int) -> Tuple[np.ndarray, np.ndarray, bytes]:
+        self.file.seek(int(self.index[chunk]["offset"]))
+        _, count, compressed, _, _, _ = struct.unpack(CHUNK_HEADER_FORMAT, self.file.read(CHUNK_HEADER_SIZE))
+        raw = zlib.decompress(self.file.read(compressed))
+        timestamps = np.frombuffer(raw, dtype="<f8", count=count)
+        counts = np.frombuffer(raw, dtype="<u4", count=count, offset=count * 8)
+        return timestamps, counts, raw[count * 12:]
+
+    def frames(self, start: float = 0.0, end: Optional[float] = None) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        Iterate over recorded frames, seeking to the start time through the index.
+
+        Args:
+            start: Offset from the beginning of the recording in seconds
+            end: Optional offset in seconds at which to stop
+
+        Yields:
+            Tuples of (offset in seconds, (n, 3) uint8 frame)
+        """
+        if not len(self.index):
+            return
+        origin = self.start_time
+        first_chunk = max(0, bisect.bisect_right(self.chunk_starts, origin + start) - 1)
+
+        for chunk in range(first_chunk, len(self.index)):
+            timestamps, counts, pixels = self._read_chunk(chunk)
+            position = 0
+            for timestamp, count in zip(timestamps, counts):
+                offset = float(timestamp) - origin
+                size = int(count) * 3
+                if offset >= start:
+                    if end is not None and offset > end:
+                        return
+                    yield offset, np.frombuffer(pixels, dtype=np.uint8, count=size, offset=position).reshape(-1, 3)
+                position += size
+
+    def play(self, send: Callable[[np.ndarray], None], speed: float = 1.0,
+             start: float = 0.0, end: Optional[float] = None, loop: bool = False):
+        """
+        Stream frames to an output with their original timing.
+
+        Args:
+            send: Callable that receives each (n, 3) uint8 frame (e.g. OutputPipeline.push)
+            speed: Playback speed multiplier (2.0 plays twice as fast)
+            start: Offset from the beginning of the recording in seconds
+            end: Optional offset in seconds at which to stop
+            loop: Restart from the start offset when the end is reached
+
+        Raises:
+            ValueError: If speed is not greater than 0
+        """
+        if not speed > 0:
+            raise ValueError(f"Replay speed must be greater than 0, got {speed}")
+        self.running = True
+        while self.running:
+            clock_start = time.perf_counter()
+            for offset, frame in self.frames(start, end):
+                if not self.running:
+                    break
+                delay = (offset - start) / speed - (time.perf_counter() - clock_start)
+                if delay > 0:
+                    time.sleep(delay)
+                send(frame)
+            if not loop:
+                break
+        self.running = False
+
+    def stop(self):
+        """
+        Stop a running play() call.
+        """
+        self.running = False
+
+    def close(self):
+        """
+        Close the recording file.
+        """
+        self.running = False
+        self.file.close()
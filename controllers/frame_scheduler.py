@@ -0,0 +1,140 @@
+from typing import Callable, List, Optional
+import sys
+import time
+
+sys.path.append('..')
+from utils.frame_utils import Frame
+from utils.log_utils import get_logger
+
+logger = get_logger("frames")
+
+
+class FrameScheduler:
+    """
+    FrameScheduler paces the render loop and marks frame boundaries.
+    Pre-update hooks run at the start of each frame before scenes are updated;
+    frame hooks receive the rendered frame once it is available.
+    With a clock source set, frame_time holds the show time scenes are advanced to.
+    """
+
+    def __init__(self, fps: int):
+        """
+        Initialize the scheduler.
+
+        Args:
+            fps: Target frame rate
+        """
+        self.fps = fps
+        self.frame_interval = 1.0 / fps
+        self.frame_index = 0
+        self.start_time = None
+        self.next_deadline = None
+        self.running = False
+
+        self.pre_update_hooks: List[Callable[[int], None]] = []
+        self.frame_hooks: List[Callable[[Frame], None]] = []
+
+        self.overruns = 0
+        self.last_frame_duration = 0.0
+        self.frame_start = 0.0
+        self.clock = None
+        self.frame_time: Optional[float] = None
+
+    def add_pre_update_hook(self, callback: Callable[[int], None]):
+        """
+        Register a callback run at the start of every frame.
+
+        Args:
+            callback: Function receiving the frame index
+        """
+        self.pre_update_hooks.append(callback)
+
+    def add_frame_hook(self, callback: Callable[[Frame], None]):
+        """
+        Register a callback receiving every rendered frame.
+
+        Args:
+            callback: Function receiving the frame (e.g. OutputPipeline.push)
+        """
+        self.frame_hooks.append(callback)
+
+    def set_clock(self, clock):
+        """
+        Take the show time of each frame from a clock source instead of advancing it by
+        one frame interval.
+
+        Args:
+            clock: ClockSource sampled at the start of every frame (None restores fixed steps)
+        """
+        self.clock = clock
+        self.frame_time = None
+
+    def begin_frame(self):
+        """
+        Mark the start of a frame, sample the clock source and run the pre-update hooks.
+        """
+        self.frame_start = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = self.frame_start
+            self.next_deadline = self.frame_start
+        if self.clock is not None:
+            self.frame_time = self.clock.tick(self.frame_start)
+
+        for callback in self.pre_update_hooks:
+            try:
+                callback(self.frame_index)
+            except Exception as e:
+                logger.error("frame_hook", "Error in frame hook: %s", e)
+
+    def end_frame(self, frame: Optional[Frame] = None):
+        """
+        Mark the end of a frame and hand the rendered frame to the frame hooks.
+
+        Args:
+            frame: Rendered frame (frame hooks are skipped if None)
+        """
+        if frame is not None:
+            for callback in self.frame_hooks:
+                try:
+                    callback(frame)
+                except Exception as e:
+                    logger.error("frame_hook", "Error in frame hook: %s", e)
+
+        self.frame_index += 1
+        self.last_frame_duration = time.perf_counter() - self.frame_start
+
+    def wait_for_next_frame(self):
+        """
+        Sleep until the next frame deadline.
+        Deadlines advance by a fixed interval so timing does not drift; after an
+        overrun longer than a frame the schedule restarts from the current time.
+        """
+        self.next_deadline += self.frame_interval
+        now = time.perf_counter()
+        delay = self.next_deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        elif -delay > self.frame_interval:
+            self.overruns += 1
+            self.next_deadline = now
+
+    def run(self, update: Callable[[], None], render: Callable[[], Frame]):
+        """
+        Run the frame loop until stop() is called.
+
+        Args:
+            update: Function advancing all scenes by one frame
+            render: Function returning the frame to hand to the frame hooks
+        """
+        self.running = True
+        while self.running:
+            self.begin_frame()
+            update()
+            self.end_frame(render() if self.frame_hooks else None)
+            self.wait_for_next_frame()
+
+    def stop(self):
+        """
+        Stop a running frame loop.
+        """
+        self.running = False
@@ -0,0 +1,278 @@
+from typing import Any, Dict, Optional, Tuple
+import sys
+import threading
+import numpy as np
+
+sys.path.append('..')
+from controllers.delta_encoder import HEADER_SIZE, DeltaEncoder
+from controllers.osc_clients import OSCClient, build_datagram
+from controllers.output_pipeline import OutputPipeline
+from controllers.state_dump import MAX_DATAGRAM_SIZE
+from controllers.update_queue import ParameterUpdateQueue
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+# Stream rates clients can choose from; requested rates are rounded down to one of these
+STREAM_RATES = (1, 2, 5, 10, 15, 20, 30, 60)
+MAX_DOWNSAMPLE = 64
+
+# Most pixels a keyframe can hold and still fit in one datagram (the /stream/frame message
+# adds its address, type tag and blob length; the blob is padded to 4 bytes)
+_FRAME_MESSAGE_SIZE = len(build_datagram("/stream/frame", [bytes(4)])) - 4
+MAX_STREAM_PIXELS = (MAX_DATAGRAM_SIZE - _FRAME_MESSAGE_SIZE - HEADER_SIZE) // 3
+
+TierKey = Tuple[int, int, bool]
+
+
+def downsample_frame(pixels: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Average every factor consecutive LEDs into one pixel.
+
+    Args:
+        pixels: (n, 3) uint8 frame
+        factor: Number of LEDs per output pixel
+
+    Returns:
+        (ceil(n / factor), 3) uint8 frame
+    """
+    if factor <= 1 or len(pixels) == 0:
+        return pixels
+    starts = np.arange(0, len(pixels), factor)
+    sums = np.add.reduceat(pixels.astype(np.uint32), starts, axis=0)
+    counts = np.diff(np.append(starts, len(pixels)))
+    return (sums // counts[:, None]).astype(np.uint8)
+
+
+class FrameStreamTier:
+    """
+    FrameStreamTier streams frames at one rate and downsampling factor.
+    Each frame is downsampled and encoded once and the same datagram is sent to every
+    subscriber of the tier.
+    """
+
+    def __init__(self, key: TierKey, max_errors: int):
+        """
+        Initialize the tier.
+
+        Args:
+            key: (fps, downsample, delta)
+            max_errors: Failed sends without hearing from a subscriber after which it is dropped
+        """
+        self.key = key
+        self.fps, self.downsample, self.delta = key
+        self.max_errors = max_errors
+        # Delta tiers send a keyframe at least once per second for clients that lost a packet
+        self.encoder = DeltaEncoder(keyframe_interval=self.fps)
+        # Replaced, never modified, so send() can iterate it without holding the lock
+        self.subscribers: Dict[Tuple[str, int], OSCClient] = {}
+        self.lock = threading.Lock()
+        self.frames = 0
+
+    @property
+    def name(self) -> str:
+        return f"stream-{self.fps}fps-x{self.downsample}{'-delta' if self.delta else ''}"
+
+    def add(self, client: OSCClient):
+        with self.lock:
+            self.subscribers = {**self.subscribers, client.address: client}
+        self.encoder.request_keyframe()
+
+    def remove(self, address: Tuple[str, int]):
+        with self.lock:
+            self.subscribers = {a: c for a, c in self.subscribers.items() if a != address}
+
+    def send(self, pixels: np.ndarray):
+        """
+        Encode a frame and send it to all subscribers. Runs on the tier's output thread.
+
+        Args:
+            pixels: (n, 3) uint8 frame
+        """
+        subscribers = self.subscribers
+        if not subscribers:
+            return
+        if not self.delta:
+            # Keyframes only, in the same packet format so clients decode both kinds alike
+            self.encoder.request_keyframe()
+        packet = self.encoder.encode(downsample_frame(pixels, self.downsample))
+        datagram = build_datagram("/stream/frame", [packet])
+        for address, client in subscribers.items():
+            if not client.send_datagram(datagram) and client.recent_errors >= self.max_errors:
+                self.remove(address)
+                logger.warning("stream", "Stopped streaming to %s:%s after %d failed sends",
+                               address[0], address[1], client.recent_errors)
+        self.frames += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.encoder.get_stats()
+        return {
+            "subscribers": len(self.subscribers),
+            "frames": self.frames,
+            "bytes_sent": stats["bytes_sent"],
+            "keyframes": stats["keyframes"],
+            "deltas": stats["deltas"]
+        }
+
+
+class FrameStreamer:
+    """
+    FrameStreamer sends live LED frames to OSC clients for remote previews.
+
+    A client subscribes with a rate, a downsampling factor and whether it accepts delta
+    packets. Subscriptions with the same settings share one tier, which runs as an output of
+    the OutputPipeline on its own thread and encodes each frame once, so the encoding cost
+    depends on the number of distinct tiers, not on the number of subscribers. Rates are
+    rounded down to STREAM_RATES and the number of tiers is limited. The downsampling factor
+    is raised where needed so a keyframe fits in one datagram (MAX_STREAM_PIXELS).
+
+    Frames are sent as /stream/frame with one blob argument in the DeltaEncoder packet
+    format (decode with DeltaDecoder). Delta tiers send a keyframe at least once per second
+    and whenever a client joins or asks for one with /stream/keyframe.
+    """
+
+    def __init__(self, pipeline: OutputPipeline, frame_scheduler=None, update_queue: Optional[ParameterUpdateQueue] = None,
+                 max_fps: int = 30, max_tiers: int = 8, max_errors: int = 3):
+        """
+        Initialize the streamer.
+
+        Args:
+            pipeline: OutputPipeline the rendered frames are pushed to
+            frame_scheduler: FrameScheduler that pushes frames to the pipeline once a client
+                             subscribes (None if frames are pushed already)
+            update_queue: Queue applied on the render thread, used to add the frame hook there
+                          (None adds it on the calling thread)
+            max_fps: Highest stream rate offered
+            max_tiers: Maximum number of distinct tiers
+            max_errors: Failed sends without hearing from a subscriber after which it is dropped
+        """
+        self.pipeline = pipeline
+        self.frame_scheduler = frame_scheduler
+        self.update_queue = update_queue
+        self.max_fps = max_fps
+        self.max_tiers = max_tiers
+        self.max_errors = max_errors
+        self.tiers: Dict[TierKey, FrameStreamTier] = {}
+        self.client_tiers: Dict[Tuple[str, int], TierKey] = {}
+        self.lock = threading.Lock()
+
+    def tier_key(self, fps: float, downsample: int, delta: bool) -> TierKey:
+        """
+        Get the tier a subscription with these settings uses.
+        
+        Raises:
+            ValueError: If even MAX_DOWNSAMPLE leaves a keyframe too large for one datagram
+        """
+        rates = [rate for rate in STREAM_RATES if rate <= self.max_fps] or [STREAM_RATES[0]]
+        rate = max([r for r in rates if r <= fps] or [rates[0]])
+        min_downsample = -(-self.pipeline.ring.capacity // MAX_STREAM_PIXELS)
+        if min_downsample > MAX_DOWNSAMPLE:
+            raise ValueError(f"{self.pipeline.ring.capacity} LEDs do not fit in a datagram at downsample {MAX_DOWNSAMPLE}")
+        return rate, max(min_downsample, min(MAX_DOWNSAMPLE, int(downsample))), bool(delta)
+
+    def subscribe(self, client: OSCClient, fps: float, downsample: int = 1, delta: bool = True) -> Optional[TierKey]:
+        """
+        Start streaming frames to a client, replacing its previous subscription.
+
+        Args:
+            client: Client to send frames to
+            fps: Requested rate
+            downsample: Number of LEDs averaged into one pixel (raised if a keyframe would
+                        not fit in one datagram)
+            delta: Send delta packets between keyframes
+
+        Returns:
+            The tier's (fps, downsample, delta), or None if the tier limit was reached
+
+        Raises:
+            ValueError: If the frames are too large to stream at any downsampling factor
+        """
+        key = self.tier_key(fps, downsample, delta)
+        with self.lock:
+            self._prune()
+            tier = self.tiers.get(key)
+            if tier is None:
+                if len(self.tiers) >= self.max_tiers and not self._only_member(client.address):
+                    logger.warning("stream", "Refused stream for %s:%s: %d tiers in use",
+                                   client.address[0], client.address[1], len(self.tiers))
+                    return None
+                self._leave(client.address)
+                tier = self.tiers[key] = FrameStreamTier(key, self.max_errors)
+                self.pipeline.add_output(tier.name, tier.send, fps=tier.fps)
+                if self.frame_scheduler is not None:
+                    if self.update_queue is not None:
+                        self.update_queue.submit(("stream", "frame_hook"), self._add_frame_hook)
+                    else:
+                        self._add_frame_hook()
+            elif self.client_tiers.get(client.address) != key:
+                self._leave(client.address)
+
+            tier.add(client)
+            self.client_tiers[client.address] = key
+
+        logger.info("stream", "Streaming %d fps, downsample %d%s to %s:%s", key[0], key[1],
+                    ", delta" if key[2] else "", client.reply_address[0], client.reply_address[1])
+        return key
+
+    def unsubscribe(self, address: Tuple[str, int]):
+        """
+        Stop streaming to a client.
+        """
+        with self.lock:
+            self._leave(address)
+
+    def request_keyframe(self, address: Tuple[str, int]):
+        """
+        Send a keyframe next on the client's tier (e.g. after the client lost a packet).
+        """
+        key = self.client_tiers.get(address)
+        tier = self.tiers.get(key) if key is not None else None
+        if tier is not None:
+            tier.encoder.request_keyframe()
+
+    def _add_frame_hook(self):
+        # Runs on the render thread when a queue is set, so frame_hooks is not changed while end_frame() iterates it
+        if self.pipeline.push not in self.frame_scheduler.frame_hooks:
+            self.frame_scheduler.add_frame_hook(self.pipeline.push)
+
+    def _prune(self):
+        # Tiers drop unreachable subscribers on their own thread, which cannot stop itself
+        for key, tier in list(self.tiers.items()):
+            if not tier.subscribers:
+                del self.tiers[key]
+                self.pipeline.remove_output(tier.name, timeout=0)
+        self.client_tiers = {address: key for address, key in self.client_tiers.items()
+                             if key in self.tiers and address in self.tiers[key].subscribers}
+
+    def _only_member(self, address: Tuple[str, int]) -> bool:
+        key = self.client_tiers.get(address)
+        return key is not None and len(self.tiers[key].subscribers) == 1
+
+    def _leave(self, address: Tuple[str, int]):
+        key = self.client_tiers.pop(address, None)
+        tier = self.tiers.get(key) if key is not None else None
+        if tier is None:
+            return
+        tier.remove(address)
+        if not tier.subscribers:
+            del self.tiers[key]
+            self.pipeline.remove_output(tier.name, timeout=0)
+
+    def stop(self):
+        """
+        Stop all tiers.
+        """
+        with self.lock:
+            for tier in self.tiers.values():
+                self.pipeline.remove_output(tier.name)
+            self.tiers = {}
+            self.client_tiers = {}
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-tier counters.
+
+        Returns:
+            Dictionary mapping tier name to subscriber, frame and byte counts
+        """
+        return {tier.name: tier.get_stats() for tier in list(self.tiers.values())}
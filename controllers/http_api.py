@@ -0,0 +1,564 @@
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import itertools
+import json
+import re
+import sys
+import threading
+
+sys.path.append('..')
+from controllers.osc_router import parse_segment_selector, select_segments
+from controllers.segment_schema import SegmentSchema, SegmentUpdate
+from controllers.update_queue import ParameterUpdateQueue
+from models.light_effect import LightEffect
+from models.light_scene import LightScene
+from models.light_segment import LightSegment
+from utils.log_utils import get_logger
+
+logger = get_logger("http")
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+# Seconds a PATCH waits for its frame boundary before answering 202 Accepted
+APPLY_TIMEOUT = 2.0
+
+
+class HTTPError(Exception):
+    """
+    Error answered with an HTTP status and a JSON body of {"error": message} or {"errors": [...]}.
+    """
+
+    def __init__(self, status: int, message: str, errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors
+
+
+# One change of a compiled PATCH, as (kind, scene_id, effect_id, target, value):
+#   ("segments", scene_id, effect_id, segment IDs or None for all, SegmentUpdate)
+#   ("effect_palette", scene_id, effect_id, palette_id, None)
+#   ("scene_palette", scene_id, None, palette_id, None)
+#   ("palette_colors", scene_id, None, palette_id, colors)
+Operation = Tuple[str, int, Optional[int], Any, Any]
+
+# Keys of LightSegment.to_dict() and LightEffect.to_dict(), in the order of the value tuples below
+SEGMENT_KEYS = ("segment_ID", "color", "transparency", "length", "move_speed", "move_range", "initial_position",
+                "current_position", "is_edge_reflect", "dimmer_time", "gradient", "fade", "gradient_colors")
+EFFECT_KEYS = ("effect_ID", "led_count", "fps", "time", "current_palette")
+
+
+def segment_values(segment: LightSegment) -> tuple:
+    """
+    Copy the attribute values of a segment that to_dict() reports, followed by its version.
+    Lists are copied (as tuples, which encode to the same JSON), since some are changed in place.
+    """
+    return (segment.segment_ID, tuple(segment.color), tuple(segment.transparency), tuple(segment.length),
+            segment.move_speed, tuple(segment.move_range), segment.initial_position, segment.current_position,
+            segment.is_edge_reflect, tuple(segment.dimmer_time), segment.gradient, segment.fade,
+            tuple(segment.gradient_colors), segment.version)
+
+
+def effect_values(effect: LightEffect) -> tuple:
+    """
+    Copy the attribute values of an effect that to_dict() reports, followed by the values
+    of its segments as (segment_id, segment_values) pairs.
+    """
+    return (effect.effect_ID, effect.led_count, effect.fps, effect.time, effect.current_palette,
+            [(segment_id, segment_values(segment)) for segment_id, segment in effect.segments.items()])
+
+
+def segment_dict(values: tuple) -> Dict[str, Any]:
+    """
+    Build the to_dict() form of a segment from segment_values().
+    """
+    return dict(zip(SEGMENT_KEYS, values))
+
+
+def effect_dict(values: tuple) -> Dict[str, Any]:
+    """
+    Build the to_dict() form of an effect from effect_values().
+    """
+    data = dict(zip(EFFECT_KEYS, values))
+    data["segments"] = {str(segment_id): segment_dict(segment) for segment_id, segment in values[-1]}
+    return data
+
+
+class HTTPControlServer:
+    """
+    HTTPControlServer exposes scene, effect, segment and palette state as JSON over HTTP,
+    for show control software that needs request/response semantics and batches too large
+    for UDP datagrams.
+
+    GET returns the state as of the next frame boundary: its attribute values are copied on
+    the render thread through the update queue, so a response never mixes two frames, and
+    the response dictionaries are built from the copy on the event loop. PATCH validates the whole body against the segment
+    schema first; if anything is invalid the request is answered with 400 and nothing is
+    changed. A valid body is queued on the same ParameterUpdateQueue as OSC updates as one
+    entry, so all of its changes are applied together at the next frame boundary, and the
+    response is sent once they have been applied.
+
+    Requests are served by a single asyncio event loop on its own thread; the render thread
+    only runs the queued copy and apply steps. JSON encoding runs on the event loop.
+
+    Endpoints:
+        GET   /scenes
+        GET   /scenes/{scene}                          PATCH {"palette", "palettes", "effects": {id: {...}}}
+        GET   /scenes/{scene}/palettes                 PATCH {palette_id: [[r, g, b], ...]}
+        GET   /scenes/{scene}/effects/{effect}         PATCH {"palette", "segments": {...}}
+        GET   /scenes/{scene}/effects/{effect}/segments                PATCH {selector: {param: value}}
+        GET   /scenes/{scene}/effects/{effect}/segments/{segment}      PATCH {param: value}
+        GET   /stats
+    Segment selectors are IDs, "*" or ranges such as "[1-100]", as in bulk OSC addresses.
+    """
+
+    ROUTES = [
+        ("scenes", re.compile(r"/scenes/?")),
+        ("scene", re.compile(r"/scenes/(\d+)/?")),
+        ("palettes", re.compile(r"/scenes/(\d+)/palettes/?")),
+        ("effect", re.compile(r"/scenes/(\d+)/effects/(\d+)/?")),
+        ("segments", re.compile(r"/scenes/(\d+)/effects/(\d+)/segments/?")),
+        ("segment", re.compile(r"/scenes/(\d+)/effects/(\d+)/segments/(\d+)/?")),
+        ("stats", re.compile(r"/stats/?"))
+    ]
+
+    def __init__(self, light_scenes: Dict[int, LightScene], update_queue: ParameterUpdateQueue,
+                 schema: SegmentSchema, set_segment_param: Callable[[LightSegment, SegmentUpdate], Any],
+                 host: str = "127.0.0.1", port: int = 0, on_update: Callable[[int, Optional[int]], Any] = None,
+                 apply_timeout: float = APPLY_TIMEOUT):
+        """
+        Initialize the server.
+
+        Args:
+            light_scenes: Dictionary mapping scene_ID to LightScene instances
+            update_queue: Queue applying updates at frame boundaries (shared with OSCHandler)
+            schema: Segment schema used to validate segment parameters
+            set_segment_param: Function applying a compiled update to a segment
+            host: Address to listen on
+            port: Port to listen on (0 picks a free port)
+            on_update: Called as on_update(scene_id, effect_id) after a change was applied
+            apply_timeout: Seconds a PATCH waits to be applied before answering 202
+        """
+        self.light_scenes = light_scenes
+        self.update_queue = update_queue
+        self.schema = schema
+        self.set_segment_param = set_segment_param
+        self.host = host
+        self.port = port
+        self.on_update = on_update
+        self.apply_timeout = apply_timeout
+        self.sequence = itertools.count()
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.thread: Optional[threading.Thread] = None
+        self.started = threading.Event()
+
+        self.requests = 0
+        self.by_status: Dict[int, int] = {}
+        self.batches_applied = 0
+        self.segments_updated = 0
+        self.timeouts = 0
+
+    def start(self):
+        """
+        Start the event loop thread and listen for connections.
+        """
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="http-api")
+        self.thread.daemon = True
+        self.thread.start()
+        self.started.wait(2.0)
+        logger.info("start", "HTTP API served on http://%s:%s/", self.host, self.port)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._serve, self.host, self.port))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.loop.call_soon(self.started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
+
+    def stop(self):
+        """
+        Stop the server and its event loop.
+        """
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(1.0)
+            self.thread = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # One HTTP/1.1 connection; requests are answered in order until the client closes it
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._send(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._send(writer, HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self._send(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._handle(method.upper(), target.split("?", 1)[0], body)
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        status = HTTPStatus(status)
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+        self.requests += 1
+        self.by_status[status.value] = self.by_status.get(status.value, 0) + 1
+
+    async def _handle(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        for name, pattern in self.ROUTES:
+            match = pattern.fullmatch(path)
+            if match:
+                break
+        else:
+            return HTTPStatus.NOT_FOUND, {"error": f"No such resource: {path}"}
+        ids = [int(group) for group in match.groups()]
+
+        try:
+            if method == "GET":
+                if name == "stats":
+                    return HTTPStatus.OK, self.get_stats()
+                try:
+                    values = await self._at_frame_boundary(self._copy_state, name, ids)
+                    return HTTPStatus.OK, self._build_state(name, values)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "No frame started in time; the render loop is not running"}
+            if method == "PATCH" and name not in ("scenes", "stats"):
+                try:
+                    data = json.loads(body or b"null")
+                except ValueError as e:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+                operations = self._compile(name, ids, data)
+                return await self._submit(operations)
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} is not supported on {path}"}
+        except HTTPError as e:
+            if e.errors:
+                return e.status, {"error": str(e), "errors": e.errors}
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            logger.error("request", "Error handling %s %s: %s", method, path, e)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+    def _copy_state(self, name: str, ids: List[int]) -> Any:
+        # Runs on the render thread, so it only copies values; _build_state() makes the response from them
+        if name == "scenes":
+            return {
+                str(scene_id): {
+                    "current_effect_ID": scene.current_effect_ID,
+                    "current_palette": scene.current_palette,
+                    "effects": sorted(scene.effects),
+                    "version": scene.version
+                }
+                for scene_id, scene in self.light_scenes.items()
+            }
+
+        scene = self._scene(ids[0])
+        palettes = {palette_id: [list(color) for color in colors] for palette_id, colors in scene.palettes.items()}
+        if name == "scene":
+            return (scene.scene_ID, scene.current_effect_ID, scene.current_palette, palettes, scene.version,
+                    [(effect_id, effect_values(effect)) for effect_id, effect in scene.effects.items()])
+        if name == "palettes":
+            return {"current_palette": scene.current_palette, "palettes": palettes}
+        effect = self._effect(scene, ids[1])
+        if name == "effect":
+            return effect_values(effect)
+        if name == "segments":
+            return [(segment_id, segment_values(segment)) for segment_id, segment in effect.segments.items()]
+        segment = effect.segments.get(ids[2])
+        if segment is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Segment {ids[2]} not found in effect {effect.effect_ID}")
+        return segment_values(segment)
+
+    def _build_state(self, name: str, values: Any) -> Any:
+        # Runs on the event loop: the dictionaries of LightScene/LightEffect/LightSegment.to_dict()
+        if name in ("scenes", "palettes"):
+            return values
+        if name == "scene":
+            scene_ID, current_effect_ID, current_palette, palettes, version, effects = values
+            return {
+                "scene_ID": scene_ID,
+                "current_effect_ID": current_effect_ID,
+                "current_palette": current_palette,
+                "palettes": palettes,
+                "effects": {str(effect_id): effect_dict(effect) for effect_id, effect in effects},
+                "version": version
+            }
+        if name == "effect":
+            return effect_dict(values)
+        if name == "segments":
+            return {str(segment_id): segment_dict(segment) for segment_id, segment in values}
+        return dict(segment_dict(values), version=values[-1])
+
+    def _scene(self, scene_id: int) -> LightScene:
+        scene = self.light_scenes.get(scene_id)
+        if scene is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Scene {scene_id} not found")
+        return scene
+
+    def _effect(self, scene: LightScene, effect_id: int) -> LightEffect:
+        effect = scene.effects.get(effect_id)
+        if effect is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Effect {effect_id} not found in scene {scene.scene_ID}")
+        return effect
+
+    def _compile(self, name: str, ids: List[int], data: Any) -> List[Operation]:
+        """
+        Validate a PATCH body into the operations to apply.
+
+        Raises:
+            HTTPError: 404 for missing scenes or effects, 400 listing every invalid value
+        """
+        operations: List[Operation] = []
+        errors: List[str] = []
+        scene = self._scene(ids[0])
+        if name == "scene":
+            self._compile_scene(scene, data, operations, errors)
+        elif name == "palettes":
+            self._compile_palettes(scene, data, operations, errors)
+        else:
+            effect = self._effect(scene, ids[1])
+            if name == "effect":
+                self._compile_effect(scene, effect, data, operations, errors, "")
+            elif name == "segments":
+                self._compile_segments(scene, effect, data, operations, errors, "")
+            else:
+                if ids[2] not in effect.segments:
+                    raise HTTPError(HTTPStatus.NOT_FOUND, f"Segment {ids[2]} not found in effect {effect.effect_ID}")
+                self._compile_segment(scene, effect, (ids[2],), data, operations, errors, "")
+
+        if errors:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid request; nothing was changed", errors)
+        if not operations:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Nothing to change")
+        return operations
+
+    def _compile_scene(self, scene: LightScene, data: Any, operations: List[Operation], errors: List[str]):
+        if not isinstance(data, dict):
+            errors.append("Expected an object")
+            return
+        for key, value in data.items():
+            if key == "palette":
+                if value in scene.palettes:
+                    operations.append(("scene_palette", scene.scene_ID, None, value, None))
+                else:
+                    errors.append(f"palette: unknown palette {value!r}")
+            elif key == "palettes":
+                self._compile_palettes(scene, value, operations, errors)
+            elif key == "effects" and isinstance(value, dict):
+                for effect_id, effect_data in value.items():
+                    effect = scene.effects.get(int(effect_id)) if str(effect_id).isdigit() else None
+                    if effect is None:
+                        errors.append(f"effects.{effect_id}: no such effect")
+                        continue
+                    self._compile_effect(scene, effect, effect_data, operations, errors, f"effects.{effect_id}.")
+            else:
+                errors.append(f"{key}: unknown key")
+
+    def _compile_palettes(self, scene: LightScene, data: Any, operations: List[Operation], errors: List[str]):
+        if not isinstance(data, dict):
+            errors.append("palettes: expected an object mapping palette IDs to colors")
+            return
+        for palette_id, colors in data.items():
+            if palette_id not in scene.palettes:
+                errors.append(f"palettes.{palette_id}: unknown palette")
+            elif not (isinstance(colors, list) and colors and all(
+                    isinstance(color, list) and len(color) == 3 and
+                    all(type(channel) is int and 0 <= channel <= 255 for channel in color) for color in colors)):
+                errors.append(f"palettes.{palette_id}: expected a list of [r, g, b] values 0~255")
+            else:
+                operations.append(("palette_colors", scene.scene_ID, None, palette_id, colors))
+
+    def _compile_effect(self, scene: LightScene, effect: LightEffect, data: Any,
+                        operations: List[Operation], errors: List[str], prefix: str):
+        if not isinstance(data, dict):
+            errors.append(f"{prefix or 'effect'}: expected an object")
+            return
+        for key, value in data.items():
+            if key == "palette":
+                if value in scene.palettes:
+                    operations.append(("effect_palette", scene.scene_ID, effect.effect_ID, value, None))
+                else:
+                    errors.append(f"{prefix}palette: unknown palette {value!r}")
+            elif key == "segments":
+                self._compile_segments(scene, effect, value, operations, errors, f"{prefix}segments.")
+            else:
+                errors.append(f"{prefix}{key}: unknown key")
+
+    def _compile_segments(self, scene: LightScene, effect: LightEffect, data: Any,
+                          operations: List[Operation], errors: List[str], prefix: str):
+        if not isinstance(data, dict):
+            errors.append(f"{prefix or 'segments'}: expected an object mapping segment selectors to parameters")
+            return
+        for selector, params in data.items():
+            if selector.isdigit():
+                segment_ids = (int(selector),)
+                if segment_ids[0] not in effect.segments:
+                    errors.append(f"{prefix}{selector}: no segment {selector} in effect {effect.effect_ID}")
+                    continue
+            elif selector == "*":
+                segment_ids = None
+            else:
+                # Ranges match the segments that exist; IDs listed on their own must exist
+                try:
+                    ranges = parse_segment_selector(selector)
+                    segment_ids = select_segments(selector, effect.segments.keys())
+                except ValueError as e:
+                    errors.append(f"{prefix}{selector}: invalid segment selector ({e})")
+                    continue
+                missing = [first for first, last in ranges if first == last and first not in effect.segments]
+                if missing:
+                    errors.append(f"{prefix}{selector}: no segments {missing[:10]} in effect {effect.effect_ID}")
+                    continue
+            self._compile_segment(scene, effect, segment_ids, params, operations, errors, f"{prefix}{selector}.")
+
+    def _compile_segment(self, scene: LightScene, effect: LightEffect, segment_ids: Optional[Tuple[int, ...]],
+                         data: Any, operations: List[Operation], errors: List[str], prefix: str):
+        if not isinstance(data, dict):
+            errors.append(f"{prefix or 'segment'}: expected an object mapping parameters to values")
+            return
+        update: SegmentUpdate = []
+        for param, value in data.items():
+            param_errors = []
+            compiled = self.schema.compile(param, value, param_errors)
+            errors.extend(prefix + error for error in param_errors)
+            if compiled:
+                update.extend(compiled)
+        if update:
+            operations.append(("segments", scene.scene_ID, effect.effect_ID, segment_ids, update))
+
+    async def _at_frame_boundary(self, function: Callable[..., Any], *args) -> Any:
+        """
+        Run a function on the render thread at the next frame boundary (through the update
+        queue) and wait for its result.
+
+        Raises:
+            asyncio.TimeoutError: If it did not run within apply_timeout (it still runs later)
+            Exception: Whatever the function raised
+        """
+        future = self.loop.create_future()
+
+        def done(result, error):
+            if not future.done():
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        def run():
+            try:
+                result, error = function(*args), None
+            except Exception as e:
+                result, error = None, e
+            self.loop.call_soon_threadsafe(done, result, error)
+            if error is not None and not isinstance(error, HTTPError):
+                raise error
+
+        self.update_queue.submit(("http", next(self.sequence)), run)
+        return await asyncio.wait_for(asyncio.shield(future), self.apply_timeout)
+
+    async def _submit(self, operations: List[Operation]) -> Tuple[int, Any]:
+        try:
+            result = await self._at_frame_boundary(self._apply, operations)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return HTTPStatus.ACCEPTED, {"applied": False, "queued": len(operations)}
+        return HTTPStatus.OK, dict(result, applied=True)
+
+    def _apply(self, operations: List[Operation]) -> Dict[str, Any]:
+        # Runs on the render thread: every operation of the request is applied in this frame
+        segments = 0
+        missing = []
+        changed = set()
+        for kind, scene_id, effect_id, target, value in operations:
+            scene = self.light_scenes.get(scene_id)
+            effect = scene.effects.get(effect_id) if scene is not None and effect_id is not None else None
+            if scene is None or (effect_id is not None and effect is None):
+                missing.append(f"scene {scene_id}" if scene is None else f"effect {effect_id} in scene {scene_id}")
+                continue
+            if kind == "segments":
+                segment_ids = sorted(effect.segments) if target is None else target
+                segments += len(effect.batch_update(segment_ids, itertools.repeat(value), self.set_segment_param))
+            elif kind == "effect_palette":
+                effect.set_palette(target)
+            elif kind == "scene_palette":
+                scene.set_palette(target)
+            elif kind == "palette_colors":
+                scene.update_palette(target, value)
+            changed.add((scene_id, effect_id))
+
+        self.batches_applied += 1
+        self.segments_updated += segments
+        if self.on_update:
+            for scene_id, effect_id in changed:
+                self.on_update(scene_id, effect_id)
+        result = {
+            "segments": segments,
+            "versions": {str(scene_id): self.light_scenes[scene_id].version
+                         for scene_id in {scene_id for scene_id, _ in changed}}
+        }
+        if missing:
+            result["missing"] = missing
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request counters.
+
+        Returns:
+            Dictionary with requests answered (total and per status code), PATCH batches
+            applied, segments updated and requests answered before their frame boundary
+            (PATCH with 202, GET with 503)
+        """
+        return {
+            "requests": self.requests,
+            "by_status": dict(self.by_status),
+            "batches_applied": self.batches_applied,
+            "segments_updated": self.segments_updated,
+            "timeouts": self.timeouts
+        }
@@ -0,0 +1,228 @@
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import itertools
+import sys
+import threading
+import time
+
+sys.path.append('..')
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+# Ingress policies
+COALESCE = "coalesce"  # only the newest message per address is kept while it waits
+FIFO = "fifo"          # kept in order; the oldest are shed when the queue is full
+RELIABLE = "reliable"  # never shed once queued (commands such as save/load)
+
+
+class IngressQueue:
+    """
+    IngressQueue sits between the OSC server and the router. The receiving thread only
+    classifies each datagram and queues it; a single worker thread dispatches the queue in
+    arrival order.
+
+    While the worker keeps up the queue holds at most a message or two and nothing is
+    shed. Under backlog, a message whose address is classified as COALESCE replaces the
+    waiting message for the same address and moves to the back of the queue, so it is
+    still dispatched after every message that arrived before it (e.g. a write to
+    segment/* is not overtaken by an older write to segment/2). When max_pending sheddable
+    messages are waiting the oldest FIFO message is dropped. RELIABLE messages are never
+    dropped once queued and have their own limit, max_reliable; further RELIABLE messages
+    are refused while it is reached. Bundles are queued as FIFO so their messages stay
+    together.
+
+    Messages carrying JSON objects (partial updates such as {"speed": 10}) are queued as FIFO
+    even if their address coalesces, because a newer message may set different fields.
+    """
+
+    def __init__(self, dispatcher, classify: Callable[[str], Tuple[str, str]], max_pending: int = 4096,
+                 max_reliable: int = 256):
+        """
+        Initialize the queue.
+
+        Args:
+            dispatcher: Object with call_handlers_for_packet(data, client_address, received)
+                        (e.g. OSCRouter); received is the perf_counter() time the datagram arrived
+            classify: Function mapping an OSC address to (policy, address class)
+            max_pending: Maximum number of sheddable messages waiting
+            max_reliable: Maximum number of RELIABLE messages waiting
+        """
+        self.dispatcher = dispatcher
+        self.classify = classify
+        self.max_pending = max(1, max_pending)
+        self.max_reliable = max(1, max_reliable)
+
+        self.pending: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.sheddable = 0
+        self.reliable = 0
+        # Keys of waiting FIFO messages in arrival order
+        self.fifo_keys = deque()
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+        self.received = 0
+        self.dispatched = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.refused = 0
+        self.max_depth = 0
+        self.shed_by_class: Dict[str, int] = {}
+
+    def start(self):
+        """
+        Start the dispatch thread.
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="osc-ingress")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """
+        Stop the dispatch thread. Messages still queued are discarded.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def call_handlers_for_packet(self, data: bytes, client_address: Tuple[str, int]) -> List:
+        """
+        Queue a received datagram. Called by the OSC server in place of the dispatcher.
+
+        Args:
+            data: Datagram contents
+            client_address: Address of the sender
+
+        Returns:
+            An empty list; results of handlers registered with map() are sent by the
+            dispatch thread once the packet is dispatched
+        """
+        received = time.perf_counter()
+        if data.startswith(b"#bundle"):
+            policy, address_class, address = FIFO, "bundle", None
+        else:
+            end = data.find(b"\0")
+            address = data[:end].decode("utf-8", "replace") if end > 0 else ""
+            policy, address_class = self.classify(address)
+            if policy == COALESCE and data.find(b"{", end) != -1:
+                policy = FIFO
+
+        with self.condition:
+            self.received += 1
+            if policy == COALESCE:
+                key = address
+                if key in self.pending:
+                    # The newest value moves to the back, behind messages that arrived before it
+                    del self.pending[key]
+                    self.pending[key] = (data, client_address, policy, address_class, received)
+                    self.coalesced += 1
+                    self._count_shed(address_class)
+                    return []
+            else:
+                key = next(self.sequence)
+                if policy == FIFO:
+                    self.fifo_keys.append(key)
+
+            if policy == RELIABLE:
+                if self.reliable >= self.max_reliable:
+                    # Queued commands are kept; the new one is refused rather than dropping one
+                    self.refused += 1
+                    self._count_shed(address_class)
+                    logger.warning("ingress.refused", "OSC ingress queue holds %d commands, refusing %s",
+                                   self.max_reliable, address)
+                    return []
+                self.reliable += 1
+            else:
+                if self.sheddable >= self.max_pending:
+                    self._drop_oldest()
+                self.sheddable += 1
+
+            self.pending[key] = (data, client_address, policy, address_class, received)
+            depth = len(self.pending)
+            if depth > self.max_depth:
+                self.max_depth = depth
+            self.condition.notify()
+        return []
+
+    def _drop_oldest(self):
+        # Drop the oldest FIFO message; coalesced messages hold the latest value of their
+        # address and are only dropped when nothing else can be
+        if self.fifo_keys:
+            key = self.fifo_keys.popleft()
+        else:
+            for candidate, (_, _, policy, _, _) in self.pending.items():
+                if policy == COALESCE:
+                    key = candidate
+                    break
+            else:
+                return
+        address_class = self.pending.pop(key)[3]
+        self.sheddable -= 1
+        self.dropped += 1
+        self._count_shed(address_class)
+        logger.warning("ingress.shed", "OSC ingress queue full (%d messages), dropping the oldest", self.max_pending)
+
+    def _count_shed(self, address_class: str):
+        self.shed_by_class[address_class] = self.shed_by_class.get(address_class, 0) + 1
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                _, (data, client_address, policy, _, received) = self.pending.popitem(last=False)
+                if policy == RELIABLE:
+                    self.reliable -= 1
+                else:
+                    self.sheddable -= 1
+                if policy == FIFO:
+                    self.fifo_keys.popleft()
+
+            try:
+                results = self.dispatcher.call_handlers_for_packet(data, client_address, received)
+                if results:
+                    self._reply(results, client_address)
+            except Exception as e:
+                logger.error("dispatch", "Error dispatching OSC packet: %s", e)
+            self.dispatched += 1
+
+    def _reply(self, results: List, client_address: Tuple[str, int]):
+        # Send handler results back to the sender, as the OSC server does for its dispatcher
+        clients = getattr(self.dispatcher, "clients", None)
+        if clients is None:
+            return
+        client = clients.get(client_address)
+        for result in results:
+            if not isinstance(result, tuple):
+                result = (result,)
+            client.send_message(result[0], list(result[1:]))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the queue counters.
+
+        Returns:
+            Dictionary with received, dispatched, coalesced, dropped and refused (RELIABLE
+            messages over max_reliable) counts, the current and maximum queue depth, the
+            number of RELIABLE messages waiting and the number of shed messages per address class
+        """
+        with self.condition:
+            return {
+                "received": self.received,
+                "dispatched": self.dispatched,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "refused": self.refused,
+                "depth": len(self.pending),
+                "max_depth": self.max_depth,
+                "reliable_pending": self.reliable,
+                "shed_by_class": dict(self.shed_by_class)
+            }
@@ -0,0 +1,375 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+sys.path.append('..')
+from models.light_effect import LightEffect
+from models.light_scene import LightScene
+from controllers.packed_params import PACKED_PARAMS
+from controllers.ramps import EASINGS, RAMP_PARAMS
+from controllers.segment_schema import SEGMENT_SCHEMA, SegmentField
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+# OSCQuery ACCESS values
+ACCESS_NONE = 0
+ACCESS_WRITE = 2
+
+# Most cached documents kept for subtree queries
+MAX_CACHED_DOCUMENTS = 256
+
+# Placeholder for a cached effect fragment in a serialized document
+_MARKER = re.compile(r'"\\u0000(/[^"\\]*)\\u0000"')
+
+
+def _node(path: str, type_tag: Optional[str] = None, description: Optional[str] = None,
+          value_range: Optional[list] = None) -> Dict[str, Any]:
+    node = {"FULL_PATH": path}
+    if type_tag is not None:
+        node["TYPE"] = type_tag
+        node["ACCESS"] = ACCESS_WRITE
+    if value_range is not None:
+        node["RANGE"] = value_range
+    if description:
+        node["DESCRIPTION"] = description
+    return node
+
+
+def _container(path: str, contents: Dict[str, Any], description: Optional[str] = None) -> Dict[str, Any]:
+    node = {"FULL_PATH": path, "ACCESS": ACCESS_NONE, "CONTENTS": contents}
+    if description:
+        node["DESCRIPTION"] = description
+    return node
+
+
+def _field_range(field: SegmentField, led_count: int) -> Optional[list]:
+    """
+    OSCQuery RANGE of a segment field: one entry per argument, nested for arrays.
+    """
+    if field.value_range is None:
+        return None
+    low, high = field.value_range
+    entry = {"MIN": low, "MAX": led_count - 1 if high is None else high}
+    if field.type_tag.startswith("["):
+        return [[entry] * (len(field.type_tag) - 2)]
+    return [entry]
+
+
+def _segment_template(schema: Dict[Tuple[str, Optional[str]], SegmentField], led_count: int) -> List[tuple]:
+    """
+    Describe the parameters of one segment as (relative path, type tag, description, range)
+    rows, shared by every segment of an effect.
+    """
+    rows: Dict[str, tuple] = {}
+    objects: Dict[str, List[str]] = {}
+    for (param, key), field in schema.items():
+        relative = param if key is None else f"{param}/{key}"
+        rows[relative] = (relative, field.type_tag, f"Sets {field.name}", _field_range(field, led_count))
+        if key is not None:
+            objects.setdefault(param, []).append(key)
+    for param, keys in objects.items():
+        description = f"JSON object with any of: {', '.join(keys)}"
+        if param in rows:
+            # Also accepts a plain value (e.g. color takes a list of palette indices)
+            relative, type_tag, plain, value_range = rows[param]
+            rows[param] = (relative, type_tag, f"{plain}, or a {description}", value_range)
+        else:
+            rows[param] = (param, "s", description, None)
+    rows = list(rows.values())
+    rows.append(("ramp", "sfss", f"Ramp a parameter ({', '.join(RAMP_PARAMS)}) to a target over a duration "
+                 f"(seconds or \"2.5s\"/\"250ms\") with an easing ({', '.join(EASINGS)}), or \"param stop\"", None))
+    return rows
+
+
+def _nest(path: str, rows: List[tuple]) -> Dict[str, Any]:
+    """
+    Build the node of a segment from its template rows.
+    """
+    contents: Dict[str, Any] = {}
+    for relative, type_tag, description, value_range in rows:
+        parent, _, name = relative.rpartition("/")
+        target = contents
+        if parent:
+            holder = contents.get(parent)
+            if holder is None:
+                holder = contents[parent] = _node(f"{path}/{parent}")
+            target = holder.setdefault("CONTENTS", {})
+        node = _node(f"{path}/{relative}", type_tag, description, value_range)
+        existing = target.get(name)
+        if existing is not None and "CONTENTS" in existing:
+            node["CONTENTS"] = existing["CONTENTS"]
+        target[name] = node
+    return _container(path, contents)
+
+
+class NamespaceTree:
+    """
+    NamespaceTree describes the OSC address space as an OSCQuery-style JSON tree: every
+    scene, effect and segment with the parameters it accepts, their OSC type tags and
+    value ranges (taken from the segment schema), plus the server commands.
+
+    The tree is built incrementally and cached. Each effect's subtree is built and
+    serialized once per structural version (segments added or removed), so a change in
+    one effect rebuilds only that effect, and whole documents are spliced from the cached
+    fragments. Serialized documents are cached per queried path until the structure of any
+    scene changes, so repeated discovery by many controllers is a dictionary lookup.
+    Parameter values are not part of the tree; /request/init returns them.
+    """
+
+    def __init__(self, light_scenes: Dict[int, LightScene], schema: Dict[Tuple[str, Optional[str]], SegmentField] = None,
+                 name: str = "LED Tape Light", osc_port: Optional[int] = None):
+        """
+        Initialize the tree.
+
+        Args:
+            light_scenes: Dictionary mapping scene_ID to LightScene instances
+            schema: Segment schema describing segment parameters (defaults to SEGMENT_SCHEMA)
+            name: Server name reported in the host info
+            osc_port: OSC port reported in the host info
+        """
+        self.light_scenes = light_scenes
+        self.schema = schema if schema is not None else SEGMENT_SCHEMA
+        self.name = name
+        self.osc_port = osc_port
+        self.lock = threading.Lock()
+
+        self.signature = None
+        self.root: Optional[Dict[str, Any]] = None
+        # id(effect) -> (key, node, JSON fragment)
+        self.effects: Dict[int, tuple] = {}
+        self.fragments: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        self.documents: Dict[str, Optional[bytes]] = {}
+        self.templates: Dict[int, List[tuple]] = {}
+
+        self.builds = 0
+        self.effect_builds = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_json(self, path: str = "/") -> Optional[bytes]:
+        """
+        Get the JSON description of a node and everything below it.
+
+        Args:
+            path: OSC address of the node ("/" for the whole tree)
+
+        Returns:
+            UTF-8 JSON document, or None if there is no such node
+        """
+        path = "/" + path.strip("/")
+        with self.lock:
+            self._refresh()
+            try:
+                document = self.documents[path]
+                self.hits += 1
+                return document
+            except KeyError:
+                pass
+
+            self.misses += 1
+            node = self._find(path)
+            document = None if node is None else self._serialize(node).encode("utf-8")
+            if len(self.documents) >= MAX_CACHED_DOCUMENTS:
+                self.documents.clear()
+            self.documents[path] = document
+            return document
+
+    def host_info(self) -> Dict[str, Any]:
+        """
+        Get the OSCQuery host info.
+        """
+        info = {
+            "NAME": self.name,
+            "OSC_TRANSPORT": "UDP",
+            "EXTENSIONS": {"ACCESS": True, "RANGE": True, "DESCRIPTION": True, "TYPE": True,
+                           "VALUE": False, "LISTEN": False}
+        }
+        if self.osc_port is not None:
+            info["OSC_PORT"] = self.osc_port
+        return info
+
+    def _structure_signature(self) -> tuple:
+        return tuple(
+            (scene_id, id(scene), scene.structure_version, tuple(scene.palettes),
+             tuple((effect_id, id(effect), effect.structure_version, effect.led_count)
+                   for effect_id, effect in list(scene.effects.items())))
+            for scene_id, scene in list(self.light_scenes.items())
+        )
+
+    def _refresh(self):
+        signature = self._structure_signature()
+        if signature == self.signature:
+            return
+        self.documents = {}
+        self.fragments = {}
+        live = set()
+        scenes = {}
+        for scene_id, scene in sorted(list(self.light_scenes.items())):
+            effects = {}
+            for effect_id, effect in sorted(list(scene.effects.items())):
+                live.add(id(effect))
+                path = f"/scene/{scene_id}/effect/{effect_id}"
+                node, fragment = self._effect_node(path, effect, tuple(scene.palettes))
+                # Placeholders are replaced with the cached fragments when serializing
+                marker = f"\0{path}\0"
+                self.fragments[marker] = (node, fragment)
+                effects[str(effect_id)] = marker
+            scenes[str(scene_id)] = self._scene_node(scene_id, scene, effects)
+        self.effects = {key: value for key, value in self.effects.items() if key in live}
+
+        self.root = _container("/", {
+            "scene": _container("/scene", scenes),
+            **self._command_nodes()
+        })
+        self.signature = signature
+        self.builds += 1
+
+    def _effect_node(self, path: str, effect: LightEffect, palettes: tuple) -> Tuple[Dict[str, Any], str]:
+        key = (path, effect.structure_version, effect.led_count, palettes)
+        cached = self.effects.get(id(effect))
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+
+        rows = self.templates.get(effect.led_count)
+        if rows is None:
+            rows = self.templates[effect.led_count] = _segment_template(self.schema, effect.led_count)
+        segments = {str(segment_id): _nest(f"{path}/segment/{segment_id}", rows)
+                    for segment_id in sorted(list(effect.segments))}
+        dense = {param: _node(f"{path}/dense/{param}", "b", "Little-endian float32 values, one per segment in ascending ID order")
+                 for param in PACKED_PARAMS}
+        node = _container(path, {
+            "segment": _container(f"{path}/segment", segments, "Also addressable as segment/* or segment/[1-500]"),
+            "packed": _node(f"{path}/packed", "b", "Little-endian (uint16 segment ID, uint16 parameter ID, float32 value) records; "
+                            f"parameter IDs: {', '.join(PACKED_PARAMS)}"),
+            "dense": _container(f"{path}/dense", dense),
+            "set_palette": _node(f"{path}/set_palette", "s", "Palette ID", [{"VALS": list(palettes)}])
+        })
+        fragment = json.dumps(node, separators=(",", ":"))
+        self.effects[id(effect)] = (key, node, fragment)
+        self.effect_builds += 1
+        return node, fragment
+
+    def _scene_node(self, scene_id: int, scene: LightScene, effects: Dict[str, str]) -> Dict[str, Any]:
+        path = f"/scene/{scene_id}"
+        palettes = [{"VALS": list(scene.palettes)}]
+        return _container(path, {
+            "effect": _container(f"{path}/effect", effects),
+            "set_palette": _node(f"{path}/set_palette", "s", "Palette ID", palettes),
+            "update_palettes": _node(f"{path}/update_palettes", "s", "JSON object mapping palette IDs to lists of [r, g, b]"),
+            "save_effects": _node(f"{path}/save_effects", "s", "File path; answered with save_effects/done or /failed"),
+            "load_effects": _node(f"{path}/load_effects", "s", "File path; answered with load_effects/done or /failed"),
+            "save_palettes": _node(f"{path}/save_palettes", "s", "File path; answered with save_palettes/done or /failed"),
+            "load_palettes": _node(f"{path}/load_palettes", "s", "File path; answered with load_palettes/done or /failed")
+        })
+
+    def _command_nodes(self) -> Dict[str, Any]:
+        return {
+            "request": _container("/request", {
+                "init": _node("/request/init", "ii", "Request a state dump (1), optionally only changes since a version")
+            }),
+            "subscribe": _node("/subscribe", "i", "Receive feedback, optionally on another port"),
+            "unsubscribe": _node("/unsubscribe", "", "Stop receiving feedback"),
+            "stream": _container("/stream", {
+                "subscribe": _node("/stream/subscribe", "fiii", "Stream frames: fps, downsample, delta (0/1), port"),
+                "unsubscribe": _node("/stream/unsubscribe", "", "Stop streaming frames"),
+                "keyframe": _node("/stream/keyframe", "", "Send a keyframe next")
+            }),
+            "namespace": _node("/namespace", "s", "Request the description of a path, answered with /namespace/reply chunks"),
+            "clock": _node("/clock", "d", "Time of the external clock in seconds (or an OSC timetag), sent periodically")
+        }
+
+    def _find(self, path: str) -> Optional[Dict[str, Any]]:
+        node = self.root
+        if path == "/":
+            return node
+        for name in path[1:].split("/"):
+            contents = node.get("CONTENTS") if isinstance(node, dict) else None
+            if contents is None or name not in contents:
+                return None
+            node = contents[name]
+            if isinstance(node, str):
+                node = self.fragments[node][0]
+        return node
+
+    def _serialize(self, node: Dict[str, Any]) -> str:
+        text = json.dumps(node, separators=(",", ":"))
+        if "\\u0000" in text:
+            text = _MARKER.sub(lambda match: self.fragments[f"\0{match.group(1)}\0"][1], text)
+        return text
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with tree rebuilds, effect subtree builds, cache hits and misses
+        """
+        return {
+            "builds": self.builds,
+            "effect_builds": self.effect_builds,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class NamespaceHTTPServer:
+    """
+    NamespaceHTTPServer serves the namespace tree over HTTP like an OSCQuery server:
+    GET /scene/1 returns the JSON description of that node, GET /?HOST_INFO the host info.
+    """
+
+    def __init__(self, tree: NamespaceTree, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialize the server.
+
+        Args:
+            tree: Namespace tree to serve
+            host: Address to listen on
+            port: Port to listen on (0 picks a free port)
+        """
+        self.tree = tree
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                url = urlsplit(handler.path)
+                if url.query == "HOST_INFO":
+                    body = json.dumps(tree.host_info()).encode("utf-8")
+                else:
+                    body = tree.get_json(unquote(url.path))
+                if body is None:
+                    handler.send_error(404, "No such OSC address")
+                    return
+                handler.send_response(200)
+                handler.send_header("Content-Type", "application/json")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                logger.debug("namespace.http", format, *args)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """
+        Start serving on a background thread.
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, name="namespace-http")
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info("namespace", "Namespace served on http://%s:%s/", self.server.server_address[0], self.port)
+
+    def stop(self):
+        """
+        Stop the server.
+        """
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,108 @@
+from typing import Optional
+import asyncio
+import socket
+import sys
+import threading
+from pythonosc import dispatcher
+
+sys.path.append('..')
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+
+class AsyncOSCServer:
+    """
+    AsyncOSCServer receives OSC datagrams on a single asyncio event loop running in one thread.
+    Unlike ThreadingOSCUDPServer it does not start a thread per datagram: every time the socket
+    becomes readable, all queued datagrams (up to batch_size) are read and dispatched in one go.
+    Handlers only hand updates to the render thread through the update queue, so they never block.
+    """
+
+    def __init__(self, ip: str, port: int, osc_dispatcher: dispatcher.Dispatcher, batch_size: int = 64,
+                 receive_buffer: int = 4 * 1024 * 1024):
+        """
+        Initialize the server.
+
+        Args:
+            ip: IP address to listen on
+            port: Port to listen on
+            osc_dispatcher: Dispatcher (or OSCRouter) handling decoded packets
+            batch_size: Maximum number of datagrams read per wakeup
+            receive_buffer: Requested socket receive buffer size in bytes
+        """
+        self.ip = ip
+        self.port = port
+        self.dispatcher = osc_dispatcher
+        self.batch_size = batch_size
+        self.receive_buffer = receive_buffer
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.sock: Optional[socket.socket] = None
+        self.thread: Optional[threading.Thread] = None
+        self.started = threading.Event()
+
+        self.datagrams = 0
+        self.wakeups = 0
+        self.max_batch = 0
+
+    @property
+    def server_address(self):
+        return self.sock.getsockname() if self.sock else (self.ip, self.port)
+
+    def start(self):
+        """
+        Bind the socket and start the event loop thread.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer)
+        except OSError:
+            pass
+        self.sock.bind((self.ip, self.port))
+        self.sock.setblocking(False)
+
+        self.loop = asyncio.SelectorEventLoop()
+        self.thread = threading.Thread(target=self._run, name="osc-asyncio")
+        self.thread.daemon = True
+        self.thread.start()
+        self.started.wait(1.0)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.add_reader(self.sock.fileno(), self._read_batch)
+        self.loop.call_soon(self.started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.remove_reader(self.sock.fileno())
+            self.loop.close()
+            self.sock.close()
+
+    def _read_batch(self):
+        self.wakeups += 1
+        count = 0
+        while count < self.batch_size:
+            try:
+                data, client_address = self.sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                logger.error("receive", "Error receiving OSC datagram: %s", e)
+                break
+            count += 1
+            self.dispatcher.call_handlers_for_packet(data, client_address)
+
+        self.datagrams += count
+        if count > self.max_batch:
+            self.max_batch = count
+
+    def shutdown(self):
+        """
+        Stop the event loop and close the socket.
+        """
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(1.0)
+            self.thread = None
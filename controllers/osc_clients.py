@@ -0,0 +1,329 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import socket
+import sys
+import threading
+import time
+from pythonosc import osc_message_builder
+
+sys.path.append('..')
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+Address = Tuple[str, int]
+
+
+class OSCClient:
+    """
+    OSCClient is a controller that sent messages to the server.
+
+    Replies go to the client's reply address (by default the address its messages came
+    from) through one connected UDP socket that is created on the first send and reused
+    afterwards. Sends are limited by a token bucket; datagrams over the limit are dropped
+    and counted.
+    """
+
+    def __init__(self, address: Address, rate_limit: float, burst: int):
+        """
+        Initialize the client.
+
+        Args:
+            address: Source address the client's messages come from
+            rate_limit: Datagrams per second sent to this client (0 for no limit)
+            burst: Datagrams that may be sent at once before the rate limit applies
+        """
+        self.address = address
+        self.reply_address = address
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.subscribed = False
+
+        self.sock: Optional[socket.socket] = None
+        self.lock = threading.Lock()
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+
+        self.last_seen = self.last_refill
+        self.received = 0
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        # Failed sends since the client was last heard from
+        self.recent_errors = 0
+
+    def set_reply_port(self, port: int):
+        """
+        Send replies to another port on the client's host.
+        """
+        with self.lock:
+            self.reply_address = (self.address[0], port)
+            self._close_socket()
+
+    def send(self, content) -> bool:
+        """
+        Send an OSC message or bundle (anything with a dgram attribute).
+
+        Returns:
+            True if the datagram was sent, False if it was rate limited or failed
+        """
+        return self.send_datagram(content.dgram)
+
+    def send_message(self, address: str, value: Any) -> bool:
+        """
+        Build and send an OSC message, like pythonosc's SimpleUDPClient.send_message.
+        """
+        return self.send_datagram(build_datagram(address, value))
+
+    def send_datagram(self, datagram: bytes) -> bool:
+        """
+        Send an encoded datagram.
+
+        Returns:
+            True if the datagram was sent, False if it was rate limited or failed
+        """
+        with self.lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate_limit)
+                self.last_refill = now
+                if self.tokens < 1.0:
+                    self.dropped += 1
+                    return False
+                self.tokens -= 1.0
+
+            try:
+                if self.sock is None:
+                    self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    self.sock.connect(self.reply_address)
+                self.sock.send(datagram)
+            except OSError as e:
+                # A connected socket reports ICMP port unreachable from an earlier send
+                self.errors += 1
+                self.recent_errors += 1
+                logger.warning("reply", "Could not send to %s:%s: %s", self.reply_address[0], self.reply_address[1], e)
+                return False
+
+            self.sent += 1
+            return True
+
+    def close(self):
+        """
+        Close the client's socket.
+        """
+        with self.lock:
+            self._close_socket()
+
+    def _close_socket(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "reply_address": f"{self.reply_address[0]}:{self.reply_address[1]}",
+            "subscribed": self.subscribed,
+            "received": self.received,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "idle": time.monotonic() - self.last_seen
+        }
+
+
+def build_datagram(address: str, value: Any) -> bytes:
+    """
+    Encode an OSC message. A list or tuple value becomes one argument per item.
+    """
+    builder = osc_message_builder.OscMessageBuilder(address=address)
+    values = value if isinstance(value, (list, tuple)) else [value]
+    for item in values:
+        builder.add_arg(item)
+    return builder.build().dgram
+
+
+class OSCClientPool:
+    """
+    OSCClientPool tracks the controllers talking to the server, keyed by source address.
+
+    Every received packet marks its sender as seen. Replies (init dumps, save/load results)
+    go back to the requesting client, and feedback is encoded once and fanned out to all
+    subscribed clients, each through its own reused socket and rate limit. Clients that are
+    not subscribed are forgotten after idle_timeout seconds; a subscribed client is dropped
+    after max_errors failed sends without hearing from it (e.g. the controller was closed).
+    Subscriptions are refused once max_clients clients are subscribed, so the pool can
+    always make room for a new client by forgetting one that is not subscribed.
+    """
+
+    def __init__(self, rate_limit: float = 1000.0, burst: int = 128, idle_timeout: float = 60.0,
+                 max_clients: int = 64, max_errors: int = 3):
+        """
+        Initialize the pool.
+
+        Args:
+            rate_limit: Datagrams per second sent to each client (0 for no limit)
+            burst: Datagrams that may be sent to a client at once
+            idle_timeout: Seconds after which clients that are not subscribed are forgotten
+            max_clients: Maximum number of subscribed clients (one more that is not subscribed
+                         may be tracked to reply to)
+            max_errors: Failed sends without hearing from a client after which it is unsubscribed
+        """
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.idle_timeout = idle_timeout
+        self.max_clients = max_clients
+        self.max_errors = max_errors
+
+        self.clients: Dict[Address, OSCClient] = {}
+        self.lock = threading.Lock()
+        self.next_expiry = time.monotonic() + idle_timeout
+
+        self.broadcasts = 0
+        self.refused = 0
+
+    def seen(self, address: Address) -> OSCClient:
+        """
+        Record a packet from a client. Called by the router for every received packet.
+
+        Args:
+            address: Source address of the packet
+
+        Returns:
+            The client
+        """
+        client = self.clients.get(address)
+        if client is None:
+            client = self.get(address)
+        client.last_seen = time.monotonic()
+        client.received += 1
+        client.recent_errors = 0
+        return client
+
+    def get(self, address: Address) -> OSCClient:
+        """
+        Get the client for an address, creating it if needed.
+
+        Args:
+            address: Source address of the client
+
+        Returns:
+            The client
+        """
+        client = self.clients.get(address)
+        if client is not None:
+            return client
+
+        with self.lock:
+            client = self.clients.get(address)
+            if client is None:
+                now = time.monotonic()
+                if len(self.clients) >= self.max_clients or now >= self.next_expiry:
+                    self._expire(now)
+                client = OSCClient(address, self.rate_limit, self.burst)
+                self.clients = {**self.clients, address: client}
+        return client
+
+    def subscribe(self, address: Address, reply_port: Optional[int] = None) -> Optional[OSCClient]:
+        """
+        Subscribe a client to feedback.
+
+        Args:
+            address: Source address of the client
+            reply_port: Port on the client's host to send to, instead of the source port
+
+        Returns:
+            The client, or None if max_clients clients are subscribed already
+        """
+        client = self.get(address)
+        if not client.subscribed and len(self.subscribers()) >= self.max_clients:
+            self.refused += 1
+            logger.warning("clients", "Refused subscription from %s:%s: %d clients subscribed",
+                           address[0], address[1], self.max_clients)
+            return None
+        if reply_port:
+            client.set_reply_port(reply_port)
+        client.subscribed = True
+        client.recent_errors = 0
+        logger.info("clients", "Client %s:%s subscribed (replies to %s:%s)",
+                    address[0], address[1], client.reply_address[0], client.reply_address[1])
+        return client
+
+    def unsubscribe(self, address: Address):
+        """
+        Stop sending feedback to a client.
+        """
+        client = self.clients.get(address)
+        if client is not None:
+            client.subscribed = False
+            logger.info("clients", "Client %s:%s unsubscribed", address[0], address[1])
+
+    def subscribers(self) -> List[OSCClient]:
+        """
+        Get the subscribed clients.
+        """
+        return [client for client in self.clients.values() if client.subscribed]
+
+    def broadcast(self, address: str, value: Any, include: Iterable[Optional[OSCClient]] = ()) -> int:
+        """
+        Send a message to all subscribed clients, encoding it once.
+
+        Args:
+            address: OSC address
+            value: Message arguments (a list or tuple is sent as one argument per item)
+            include: Additional clients to send to (e.g. the client that made the request)
+
+        Returns:
+            Number of clients the message was sent to
+        """
+        datagram = build_datagram(address, value)
+        targets = {id(client): client for client in self.subscribers()}
+        for client in include:
+            if client is not None:
+                targets[id(client)] = client
+
+        sent = 0
+        for client in targets.values():
+            if client.send_datagram(datagram):
+                sent += 1
+            elif client.subscribed and client.recent_errors >= self.max_errors:
+                client.subscribed = False
+                logger.warning("clients", "Unsubscribed %s:%s after %d failed sends",
+                               client.address[0], client.address[1], client.recent_errors)
+        self.broadcasts += 1
+        return sent
+
+    def _expire(self, now: float):
+        self.next_expiry = now + self.idle_timeout
+        kept = {address: client for address, client in self.clients.items()
+                if client.subscribed or now - client.last_seen < self.idle_timeout}
+        if len(kept) >= self.max_clients:
+            # Still full: forget the least recently seen clients that are not subscribed
+            idle = sorted((client for client in kept.values() if not client.subscribed), key=lambda c: c.last_seen)
+            for client in idle[:len(kept) - self.max_clients + 1]:
+                del kept[client.address]
+        for address, client in self.clients.items():
+            if address not in kept:
+                client.close()
+        self.clients = kept
+
+    def close(self):
+        """
+        Close all client sockets.
+        """
+        with self.lock:
+            for client in self.clients.values():
+                client.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get per-client counters.
+
+        Returns:
+            Dictionary with the number of broadcasts and refused subscriptions and the
+            counters of each client
+        """
+        clients = self.clients
+        return {
+            "broadcasts": self.broadcasts,
+            "refused": self.refused,
+            "clients": {f"{address[0]}:{address[1]}": client.get_stats() for address, client in clients.items()}
+        }
@@ -1,16 +1,66 @@
-from typing import Dict, List, Any, Optional
-import re
+from typing import Callable, Dict, List, Any, Optional
 import sys
+import copy
+import itertools
+import math
 import threading
-import json
-from pythonosc import dispatcher, osc_server, udp_client
+import time
+from pythonosc import osc_server
 
 sys.path.append('..')
 from models.light_effect import LightEffect
 from models.light_segment import LightSegment
 from models.light_scene import LightScene
+from controllers.osc_router import OSCRouter, OSCRoute, select_segments
+from controllers.update_queue import ParameterUpdateQueue
+from controllers.bundle_scheduler import BundleScheduler
+from controllers.state_dump import MAX_DATAGRAM_SIZE, StateDumpSender
+from controllers.packed_params import PACKED_SETTERS, decode_packed_records, decode_dense_values
+from controllers.osc_async_server import AsyncOSCServer
+from controllers.scene_io import SceneFileWorker, read_json, write_json_atomic
+from controllers.osc_clients import OSCClient, OSCClientPool
+from controllers.frame_stream import FrameStreamer
+from controllers.ingress_queue import IngressQueue, COALESCE, FIFO, RELIABLE
+from controllers.ramps import EASINGS, RAMP_PARAMS, RampTable, parse_duration
+from controllers.segment_schema import SegmentSchema, SegmentUpdate, apply_segment_update
+from controllers.namespace import NamespaceHTTPServer, NamespaceTree
+from controllers.clock_source import ClockSource, clock_seconds
+from controllers.artnet_input import ARTNET_PORT, ArtNetInput, ArtNetMapping
+from controllers.http_api import HTTPControlServer
+from utils.log_utils import get_logger
 from config import DEFAULT_COLOR_PALETTES, DEFAULT_LED_COUNT, DEFAULT_FPS, DEFAULT_TRANSPARENCY, DEFAULT_LENGTH, DEFAULT_MOVE_SPEED, DEFAULT_MOVE_RANGE, DEFAULT_INITIAL_POSITION, DEFAULT_IS_EDGE_REFLECT, DEFAULT_DIMMER_TIME
 
+logger = get_logger("osc")
+
+# Ingress policy per route kind (see IngressQueue); addresses without a route are FIFO
+INGRESS_POLICIES = {
+    "segment": COALESCE,
+    "segment_bulk": COALESCE,
+    "dense": COALESCE,
+    "legacy_segment": COALESCE,
+    "effect_palette": COALESCE,
+    "scene_palette": COALESCE,
+    "update_palettes": COALESCE,
+    "legacy_palette": COALESCE,
+    "packed": FIFO,
+    "ramp": RELIABLE,
+    "save_effects": RELIABLE,
+    "load_effects": RELIABLE,
+    "save_palettes": RELIABLE,
+    "load_palettes": RELIABLE,
+    "init": RELIABLE,
+    "subscribe": RELIABLE,
+    "unsubscribe": RELIABLE,
+    "stream_subscribe": RELIABLE,
+    "stream_unsubscribe": RELIABLE,
+    "stream_keyframe": RELIABLE,
+    "namespace": RELIABLE,
+    "clock": FIFO
+}
+
+# Namespace replies larger than this many datagrams are refused; use the HTTP server instead
+MAX_NAMESPACE_CHUNKS = 64
+
 class OSCHandler:
     """
     OSCHandler manages OSC communication for controlling light scenes, effects, and segments.
@@ -30,54 +80,150 @@ class OSCHandler:
         self.ip = ip
         self.port = port
         
-        self.dispatcher = dispatcher.Dispatcher()
+        self.router = OSCRouter(self.light_scenes)
+        self.dispatcher = self.router
+        self.segment_schema = SegmentSchema()
+        self.namespace = NamespaceTree(self.light_scenes, self.segment_schema.schema, osc_port=port)
+        self.namespace_server = None
         self.setup_dispatcher()
         
+        self.update_queue = ParameterUpdateQueue()
+        self.ramps = RampTable()
+        self.packed_sequence = itertools.count()
+        self.file_sequence = itertools.count()
+        self.stats_lock = threading.Lock()
+        self.non_finite_rejected = 0
+        self.scene_files = SceneFileWorker()
+        self.bundle_scheduler = BundleScheduler(self.router.dispatch_messages)
+        self.router.bundle_scheduler = self.bundle_scheduler
+        
         self.server = None
         self.server_thread = None
-        
-        self.client = udp_client.SimpleUDPClient(ip, port)
+        self.ingress = None
+        self.ingress_policies = dict(INGRESS_POLICIES)
+        
+        # Replies to requests whose sender is unknown (e.g. init_callback called directly)
+        self.client = OSCClient((ip, port), rate_limit=0, burst=0)
+        self.clients = OSCClientPool()
+        self.router.clients = self.clients
+        self.state_dump = StateDumpSender(self.client, update_queue=self.update_queue)
+        self.frame_streamer = None
+        self.frame_scheduler = None
+        self.clock: Optional[ClockSource] = None
+        self.artnet = None
+        self.http_api = None
         
         self.simulator = None
     
     def setup_dispatcher(self):
         """
-        Set up the OSC message dispatcher with appropriate message handlers.
+        Set up the OSC routes with the appropriate message handlers.
+        Each address is parsed once by the router and dispatched straight to the handler.
         """
-        self.dispatcher.map("/scene/*/effect/*/segment/*/*", self.scene_effect_segment_callback)
-        self.dispatcher.map("/scene/*/effect/*/set_palette", self.scene_effect_palette_callback)
-        self.dispatcher.map("/scene/*/set_palette", self.scene_palette_callback)
-        self.dispatcher.map("/scene/*/update_palettes", self.scene_update_palettes_callback)
-        self.dispatcher.map("/scene/*/save_effects", self.scene_save_effects_callback)
-        self.dispatcher.map("/scene/*/load_effects", self.scene_load_effects_callback)
-        self.dispatcher.map("/scene/*/save_palettes", self.scene_save_palettes_callback)
-        self.dispatcher.map("/scene/*/load_palettes", self.scene_load_palettes_callback)
-        
-        self.dispatcher.map("/effect/*/segment/*/*", self.legacy_effect_segment_callback)
-        self.dispatcher.map("/effect/*/object/*/*", self.legacy_effect_object_callback)
-        self.dispatcher.map("/palette/*", self.legacy_palette_callback)
-        self.dispatcher.map("/request/init", self.init_callback)
+        route = self.router.add_route
+        route("ramp", r"/scene/(\d+)/effect/(\d+)/segment/(\d+|\*|\[[\d,\- ]+\])/ramp", ("scene_id", "effect_id", "selector"), self._on_ramp)
+        route("segment", r"/scene/(\d+)/effect/(\d+)/segment/(\d+)/(.+)", ("scene_id", "effect_id", "segment_id", "param"), self._on_segment)
+        route("segment_bulk", r"/scene/(\d+)/effect/(\d+)/segment/(\*|\[[\d,\- ]+\])/(.+)", ("scene_id", "effect_id", "selector", "param"), self._on_segment_bulk)
+        route("packed", r"/scene/(\d+)/effect/(\d+)/packed", ("scene_id", "effect_id"), self._on_packed)
+        route("dense", r"/scene/(\d+)/effect/(\d+)/dense/(.+)", ("scene_id", "effect_id", "param"), self._on_dense)
+        route("effect_palette", r"/scene/(\d+)/effect/(\d+)/set_palette", ("scene_id", "effect_id"), self._on_effect_palette)
+        route("scene_palette", r"/scene/(\d+)/set_palette", ("scene_id",), self._on_scene_palette)
+        route("update_palettes", r"/scene/(\d+)/update_palettes", ("scene_id",), self._on_update_palettes)
+        route("save_effects", r"/scene/(\d+)/save_effects", ("scene_id",), self._on_save_effects)
+        route("load_effects", r"/scene/(\d+)/load_effects", ("scene_id",), self._on_load_effects)
+        route("save_palettes", r"/scene/(\d+)/save_palettes", ("scene_id",), self._on_save_palettes)
+        route("load_palettes", r"/scene/(\d+)/load_palettes", ("scene_id",), self._on_load_palettes)
+        
+        route("legacy_segment", r"/effect/(\d+)/segment/(\d+)/(.+)", ("effect_id", "segment_id", "param"), self._on_legacy_segment, scene_id=1)
+        route("legacy_segment", r"/effect/(\d+)/object/(\d+)/(.+)", ("effect_id", "segment_id", "param"), self._on_legacy_segment, scene_id=1)
+        route("legacy_palette", r"/palette/([^/]+)", ("param",), self._on_legacy_palette)
+        route("init", r"/request/init", (), self._on_init)
+        route("subscribe", r"/subscribe", (), self._on_subscribe)
+        route("unsubscribe", r"/unsubscribe", (), self._on_unsubscribe)
+        route("stream_subscribe", r"/stream/subscribe", (), self._on_stream_subscribe)
+        route("stream_unsubscribe", r"/stream/unsubscribe", (), self._on_stream_unsubscribe)
+        route("stream_keyframe", r"/stream/keyframe", (), self._on_stream_keyframe)
+        route("namespace", r"/namespace", (), self._on_namespace)
+        route("clock", r"/clock", (), self._on_clock)
     
-    def start_server(self):
+    def start_server(self, mode: str = "threading", backlog: int = 4096):
         """
         Start the OSC server in a separate thread.
+        
+        Args:
+            mode: "threading" for ThreadingOSCUDPServer (one thread per datagram) or
+                  "asyncio" for a single event loop reading datagrams in batches
+            backlog: Size of the ingress queue between the server and the router; under
+                     backlog stale messages are shed according to ingress_policies.
+                     0 dispatches every message on the receiving thread
         """
+        dispatcher = self.dispatcher
+        if backlog > 0:
+            self.ingress = IngressQueue(self.router, self._classify_ingress, backlog)
+            self.ingress.start()
+            dispatcher = self.ingress
+        
         try:
-            self.server = osc_server.ThreadingOSCUDPServer((self.ip, self.port), self.dispatcher)
-            self.server_thread = threading.Thread(target=self.server.serve_forever)
-            self.server_thread.daemon = True
-            self.server_thread.start()
-            print(f"OSC server started on {self.ip}:{self.port}")
+            if mode == "asyncio":
+                self.server = AsyncOSCServer(self.ip, self.port, dispatcher)
+                self.server.start()
+            else:
+                self.server = osc_server.ThreadingOSCUDPServer((self.ip, self.port), dispatcher)
+                self.server_thread = threading.Thread(target=self.server.serve_forever)
+                self.server_thread.daemon = True
+                self.server_thread.start()
+            logger.info("server", "OSC server started on %s:%s (%s)", self.ip, self.port, mode)
         except Exception as e:
-            print(f"Error starting OSC server: {e}")
-            
+            logger.error("server", "Error starting OSC server: %s", e)
+    
+    def _classify_ingress(self, address: str):
+        parsed = self.router.parse(address)
+        if parsed is None:
+            return FIFO, "unrouted"
+        kind = parsed[0].kind
+        return self.ingress_policies.get(kind, FIFO), kind
+    
+    def set_ingress_policy(self, kind: str, policy: str):
+        """
+        Set how messages of a route kind are treated under backlog.
+        
+        Args:
+            kind: Route kind (e.g. "segment", "packed", "save_effects")
+            policy: COALESCE, FIFO or RELIABLE (from controllers.ingress_queue)
+        """
+        self.ingress_policies[kind] = policy
+    
+    def get_ingress_stats(self) -> Dict[str, Any]:
+        """
+        Get counters for the ingress queue: received, dispatched, coalesced and dropped
+        messages, queue depth and shed messages per address class.
+        
+        Returns:
+            Dictionary of ingress queue counters (empty if the queue is disabled)
+        """
+        return self.ingress.get_stats() if self.ingress else {}
+    
     def stop_server(self):
         """
         Stop the OSC server.
         """
+        self.state_dump.stop()
+        self.scene_files.shutdown()
+        if self.frame_streamer:
+            self.frame_streamer.stop()
+        self.clients.close()
+        if self.ingress:
+            self.ingress.stop()
+        if self.namespace_server:
+            self.namespace_server.stop()
+        if self.artnet:
+            self.artnet.stop()
+        if self.http_api:
+            self.http_api.stop()
         if self.server:
             self.server.shutdown()
-            print("OSC server stopped")
+            logger.info("server", "OSC server stopped")
+            logger.flush()
 
     def set_simulator(self, simulator):
         """
@@ -88,148 +234,146 @@ class OSCHandler:
         """
         self.simulator = simulator
     
-    def scene_effect_segment_callback(self, address, *args):
+    def set_frame_scheduler(self, frame_scheduler):
         """
-        Handle OSC messages for updating segment parameters within a scene.
+        Apply incoming parameter updates at frame boundaries instead of immediately.
+        Updates are coalesced per target and parameter and applied before each update().
+        Timetagged OSC bundles are held until the frame their timetag falls on.
         
         Args:
-            address: OSC address pattern
-            *args: OSC message arguments
+            frame_scheduler: FrameScheduler driving the render loop
         """
-        pattern = r"/scene/(\d+)/effect/(\d+)/segment/(\d+)/(.+)"
-        match = re.match(pattern, address)
+        self.frame_scheduler = frame_scheduler
+        self.bundle_scheduler.attach(frame_scheduler)
+        frame_scheduler.add_pre_update_hook(self.apply_pending_updates)
+        self.update_queue.immediate = False
+    
+    def set_output_pipeline(self, output_pipeline, frame_scheduler=None, max_fps: int = 30):
+        """
+        Allow clients to stream rendered frames with /stream/subscribe.
         
-        if not match:
-            print(f"Invalid address pattern: {address}")
-            return
-            
-        scene_id = int(match.group(1))
-        effect_id = int(match.group(2))
-        segment_id = int(match.group(3))
-        param_name = match.group(4)
-        value = args[0]
+        Args:
+            output_pipeline: OutputPipeline the rendered frames are pushed to
+            frame_scheduler: FrameScheduler to push frames from once a client subscribes
+            max_fps: Highest stream rate offered to clients
+        """
+        self.frame_streamer = FrameStreamer(output_pipeline, frame_scheduler, self.update_queue, max_fps=max_fps)
+    
+    def set_clock(self, clock: ClockSource, frame_scheduler=None):
+        """
+        Feed /clock messages to a clock source (e.g. an OSCClock following an audio player).
         
-        if scene_id not in self.light_scenes:
-            print(f"Scene {scene_id} not found")
-            return
+        Args:
+            clock: Clock source receiving the samples
+            frame_scheduler: FrameScheduler to drive scene and segment time from the clock
+        """
+        self.clock = clock
+        if frame_scheduler is not None:
+            frame_scheduler.set_clock(clock)
+    
+    def apply_pending_updates(self, frame_index: int = None) -> int:
+        """
+        Apply all queued parameter updates, then advance the active ramps.
+        Must be called from the render thread.
+        
+        Args:
+            frame_index: Index of the frame being started
             
-        scene = self.light_scenes[scene_id]
+        Returns:
+            Number of updates applied
+        """
+        applied = self.update_queue.apply_pending(frame_index)
+        if self.ramps.count and self.ramps.step(self._ramp_time()) and self.simulator:
+            self._update_simulator()
+        return applied
+    
+    def _ramp_time(self) -> Optional[float]:
+        # Ramps run on the show time when a clock source drives the frames, so they follow
+        # the external clock (and stay in step with segment movement) instead of the local clock
+        if self.frame_scheduler is not None and self.frame_scheduler.clock is not None:
+            return self.frame_scheduler.frame_time
+        return None
+    
+    def get_update_stats(self) -> Dict[str, int]:
+        """
+        Get counters for received vs. applied parameter updates.
         
-        if effect_id not in scene.effects:
-            print(f"Effect {effect_id} not found in scene {scene_id}")
-            return
+        Returns:
+            Dictionary of update queue counters
+        """
+        return self.update_queue.get_stats()
+    
+    def get_validation_stats(self) -> Dict[str, Any]:
+        """
+        Get counters for accepted and rejected segment payloads.
         
-        effect = scene.effects[effect_id]
+        Returns:
+            Dictionary of segment schema counters, plus the number of NaN or infinite
+            values skipped in packed and dense blobs
+        """
+        stats = self.segment_schema.get_stats()
+        stats["non_finite_rejected"] = self.non_finite_rejected
+        return stats
+    
+    def get_ramp_stats(self) -> Dict[str, int]:
+        """
+        Get counters for active, started, completed and cancelled ramps.
         
-        if segment_id not in effect.segments:
-            print(f"Segment {segment_id} not found in effect {effect_id}")
-            return
+        Returns:
+            Dictionary of ramp counters
+        """
+        return self.ramps.get_stats()
+    
+    def get_changes_since(self, version: int) -> Dict[int, Optional[Dict[tuple, int]]]:
+        """
+        Get what changed in each scene after a state version.
         
-        segment = effect.segments[segment_id]
-        ui_updated = False
-
-        if param_name == "color":
-            if isinstance(value, dict):
-                if "colors" in value:
-                    segment.update_param("color", value["colors"])
-                    print(f"Updated colors: {value['colors']}")
-                    ui_updated = True
-                    
-                if "speed" in value:
-                    segment.update_param("move_speed", value["speed"])
-                    print(f"Updated speed: {value['speed']}")
-                    ui_updated = True
-                    
-                if "gradient" in value:
-                    segment.update_param("gradient", value["gradient"] == 1)
-                    print(f"Updated gradient: {value['gradient']}")
-                    ui_updated = True
-                    
-            elif isinstance(value, list) and len(value) >= 1:
-                segment.update_param("color", value)
-                print(f"Updated colors directly: {value}")
-                ui_updated = True
-
-        elif param_name == "position":
-            if isinstance(value, dict):
-                if "initial_position" in value:
-                    segment.update_param("initial_position", value["initial_position"])
-                    segment.update_param("current_position", float(value["initial_position"]))
-                    print(f"Updated position: {value['initial_position']}")
-                    ui_updated = True
-                    
-                if "speed" in value:
-                    segment.update_param("move_speed", value["speed"])
-                    print(f"Updated speed: {value['speed']}")
-                    ui_updated = True
-                    
-                if "range" in value and isinstance(value["range"], list) and len(value["range"]) == 2:
-                    segment.update_param("move_range", value["range"])
-                    print(f"Updated range: {value['range']}")
-                    ui_updated = True
-                    
-                if "interval" in value:
-                    segment.update_param("position_interval", value["interval"])
-                    print(f"Updated interval: {value['interval']}")
-                    ui_updated = True
-
-        elif param_name == "span":
-            if isinstance(value, dict):
-                if "span" in value:
-                    new_length = [value["span"]//3, value["span"]//3, value["span"]//3]
-                    segment.update_param("length", new_length)
-                    print(f"Updated span length: {new_length}")
-                    ui_updated = True
-                    
-                if "range" in value and isinstance(value["range"], list) and len(value["range"]) == 2:
-                    segment.update_param("span_range", value["range"])
-                    print(f"Updated span range: {value['range']}")
-                    ui_updated = True
-                    
-                if "speed" in value:
-                    segment.update_param("span_speed", value["speed"])
-                    print(f"Updated span speed: {value['speed']}")
-                    ui_updated = True
-                    
-                if "interval" in value:
-                    segment.update_param("span_interval", value["interval"])
-                    print(f"Updated span interval: {value['interval']}")
-                    ui_updated = True
-                    
-                if "gradient_colors" in value and isinstance(value["gradient_colors"], list):
-                    segment.update_param("gradient_colors", value["gradient_colors"])
-                    print(f"Updated gradient colors: {value['gradient_colors']}")
-                    ui_updated = True
-                    
-                if "fade" in value:
-                    segment.update_param("fade", value["fade"] == 1)
-                    print(f"Updated fade: {value['fade']}")
-                    ui_updated = True
-
-        elif param_name == "transparency":
-            if isinstance(value, list):
-                segment.update_param("transparency", value)
-                print(f"Updated transparency: {value}")
-                ui_updated = True
-
-        elif param_name == "dimmer_time":
-            if isinstance(value, list) and len(value) >= 5:
-                segment.update_param("dimmer_time", value)
-                print(f"Updated dimmer_time: {value}")
-                ui_updated = True
-
-        elif param_name == "is_edge_reflect":
-            segment.update_param("is_edge_reflect", bool(value))
-            print(f"Updated is_edge_reflect: {value}")
-            ui_updated = True
-
-        else:
-            segment.update_param(param_name, value)
-            print(f"Updated {param_name}: {value}")
-            ui_updated = True
+        Args:
+            version: Version the caller is up to date with
+            
+        Returns:
+            Dictionary mapping scene_ID to its changes ((path, param) -> version), or to
+            None if the scene has to be read in full
+        """
+        return {scene_id: scene.changes_since(version) for scene_id, scene in self.light_scenes.items()}
+    
+    def get_bundle_stats(self) -> Dict[str, Any]:
+        """
+        Get counters for scheduled, executed and late OSC bundles.
+        
+        Returns:
+            Dictionary of bundle scheduler counters
+        """
+        return self.bundle_scheduler.get_stats()
+    
+    def _route_address(self, address: str, kind: str) -> Optional[OSCRoute]:
+        """
+        Parse an address through the router for the address-based callbacks.
+        
+        Args:
+            address: OSC address
+            kind: Expected route kind
             
-        if ui_updated and self.simulator:
-            self._update_simulator(scene_id, effect_id, segment_id)
+        Returns:
+            The parsed route, or None if the address does not match
+        """
+        parsed = self.router.parse(address)
+        if parsed is None or parsed[0].kind != kind:
+            logger.warning("invalid_address", "Invalid address pattern: %s", address)
+            return None
+        return parsed[0]
+    
+    def scene_effect_segment_callback(self, address, *args):
+        """
+        Handle OSC messages for updating segment parameters within a scene.
+        
+        Args:
+            address: OSC address pattern
+            *args: OSC message arguments
+        """
+        route = self._route_address(address, "segment")
+        if route:
+            self._on_segment(route, *args)
     
     def scene_effect_palette_callback(self, address, *args):
         """
@@ -239,33 +383,9 @@ class OSCHandler:
             address: OSC address pattern
             *args: OSC message arguments
         """
-        pattern = r"/scene/(\d+)/effect/(\d+)/set_palette"
-        match = re.match(pattern, address)
-        
-        if not match:
-            print(f"Invalid address pattern: {address}")
-            return
-            
-        scene_id = int(match.group(1))
-        effect_id = int(match.group(2))
-        palette_id = args[0]
-        
-        if scene_id not in self.light_scenes:
-            print(f"Scene {scene_id} not found")
-            return
-            
-        scene = self.light_scenes[scene_id]
-        
-        if effect_id not in scene.effects:
-            print(f"Effect {effect_id} not found in scene {scene_id}")
-            return
-        
-        if palette_id in scene.palettes:
-            scene.effects[effect_id].set_palette(palette_id)
-            print(f"Set palette for effect {effect_id} to {palette_id}")
-            
-            if self.simulator:
-                self._update_simulator(scene_id, effect_id)
+        route = self._route_address(address, "effect_palette")
+        if route:
+            self._on_effect_palette(route, *args)
     
     def scene_palette_callback(self, address, *args):
         """
@@ -275,28 +395,9 @@ class OSCHandler:
             address: OSC address pattern
             *args: OSC message arguments
         """
-        pattern = r"/scene/(\d+)/set_palette"
-        match = re.match(pattern, address)
-        
-        if not match:
-            print(f"Invalid address pattern: {address}")
-            return
-            
-        scene_id = int(match.group(1))
-        palette_id = args[0]
-        
-        if scene_id not in self.light_scenes:
-            print(f"Scene {scene_id} not found")
-            return
-            
-        scene = self.light_scenes[scene_id]
-        
-        if palette_id in scene.palettes:
-            scene.set_palette(palette_id)
-            print(f"Set palette for scene {scene_id} to {palette_id}")
-            
-            if self.simulator:
-                self._update_simulator(scene_id)
+        route = self._route_address(address, "scene_palette")
+        if route:
+            self._on_scene_palette(route, *args)
     
     def scene_update_palettes_callback(self, address, *args):
         """
@@ -306,28 +407,9 @@ class OSCHandler:
             address: OSC address pattern
             *args: OSC message arguments
         """
-        pattern = r"/scene/(\d+)/update_palettes"
-        match = re.match(pattern, address)
-        
-        if not match:
-            print(f"Invalid address pattern: {address}")
-            return
-            
-        scene_id = int(match.group(1))
-        new_palettes = args[0]
-        
-        if scene_id not in self.light_scenes:
-            print(f"Scene {scene_id} not found")
-            return
-            
-        scene = self.light_scenes[scene_id]
-        
-        if isinstance(new_palettes, dict):
-            scene.update_all_palettes(new_palettes)
-            print(f"Updated palettes for scene {scene_id}")
-            
-            if self.simulator:
-                self._update_simulator(scene_id)
+        route = self._route_address(address, "update_palettes")
+        if route:
+            self._on_update_palettes(route, *args)
     
     def scene_save_effects_callback(self, address, *args):
         """
@@ -337,192 +419,540 @@ class OSCHandler:
             address: OSC address pattern
             *args: OSC message arguments
         """
-        pattern = r"/scene/(\d+)/save_effects"
-        match = re.match(pattern, address)
+        route = self._route_address(address, "save_effects")
+        if route:
+            self._on_save_effects(route, *args)
+    
+    def scene_load_effects_callback(self, address, *args):
+        """
+        Handle OSC messages for loading effects from a JSON file.
         
-        if not match:
-            print(f"Invalid address pattern: {address}")
-            return
-            
-        scene_id = int(match.group(1))
-        file_path = args[0]
+        Args:
+            address: OSC address pattern
+            *args: OSC message arguments
+        """
+        route = self._route_address(address, "load_effects")
+        if route:
+            self._on_load_effects(route, *args)
+    
+    def scene_save_palettes_callback(self, address, *args):
+        """
+        Handle OSC messages for saving palettes to a JSON file.
         
-        if scene_id not in self.light_scenes:
-            print(f"Scene {scene_id} not found")
-            return
-            
-        scene = self.light_scenes[scene_id]
+        Args:
+            address: OSC address pattern
+            *args: OSC message arguments
+        """
+        route = self._route_address(address, "save_palettes")
+        if route:
+            self._on_save_palettes(route, *args)
+    
+    def scene_load_palettes_callback(self, address, *args):
+        """
+        Handle OSC messages for loading palettes from a JSON file.
         
-        try:
-            scene.save_to_json(file_path)
-            print(f"Saved effects configuration to {file_path}")
-        except Exception as e:
-            print(f"Error saving effects configuration: {e}")
+        Args:
+            address: OSC address pattern
+            *args: OSC message arguments
+        """
+        route = self._route_address(address, "load_palettes")
+        if route:
+            self._on_load_palettes(route, *args)
     
-    def scene_load_effects_callback(self, address, *args):
+    def legacy_effect_segment_callback(self, address, *args):
         """
-        Handle OSC messages for loading effects from a JSON file.
+        Handle legacy OSC messages for backward compatibility.
+        Maps to new scene-based structure internally.
         
         Args:
             address: OSC address pattern
             *args: OSC message arguments
         """
-        pattern = r"/scene/(\d+)/load_effects"
-        match = re.match(pattern, address)
+        route = self._route_address(address, "legacy_segment")
+        if route:
+            self._on_legacy_segment(route, *args)
+    
+    def legacy_effect_object_callback(self, address, *args):
+        """
+        Handle legacy OSC messages with 'object' instead of 'segment'.
+        Maps to new scene-based structure internally.
+        
+        Args:
+            address: OSC address pattern
+            *args: OSC message arguments
+        """
+        route = self._route_address(address, "legacy_segment")
+        if route:
+            self._on_legacy_segment(route, *args)
+    
+    def legacy_palette_callback(self, address, *args):
+        """
+        Handle legacy OSC messages for updating palettes.
+        Maps to new scene-based structure internally.
         
-        if not match:
-            print(f"Invalid address pattern: {address}")
+        Args:
+            address: OSC address pattern
+            *args: OSC message arguments
+        """
+        parsed = self.router.parse(address)
+        if parsed is None or parsed[0].kind != "legacy_palette":
+            logger.warning("invalid_address", "Invalid palette address: %s", address)
             return
-            
-        scene_id = int(match.group(1))
-        file_path = args[0]
+        self._on_legacy_palette(parsed[0], *args)
+    
+    def _on_segment(self, route: OSCRoute, *args):
+        """
+        Queue a segment parameter update addressed by a parsed route.
         
-        try:
-            new_scene = LightScene.load_from_json(file_path)
-            new_scene.scene_ID = scene_id  # Ensure the scene ID matches the request
-            self.light_scenes[scene_id] = new_scene
-            print(f"Loaded effects configuration from {file_path}")
+        Args:
+            route: Parsed route with scene, effect, segment and parameter
+            *args: OSC message arguments (several arguments form a list value, e.g. transparency)
+        """
+        self._submit_segment_update(route, args[0] if len(args) == 1 else list(args), self._apply_segment_update)
+    
+    def _submit_segment_update(self, route: OSCRoute, value, apply):
+        """
+        Validate and queue a segment update, splitting dictionary payloads per field so
+        that each sub-parameter is coalesced independently.
+        
+        Args:
+            route: Parsed segment route
+            value: Message value
+            apply: Function applying (route, update) on the render thread
+        """
+        update = self.segment_schema.compile(route.param, value)
+        if update is None:
+            return
+        if len(update) == 1:
+            self.update_queue.submit((route, update[0][0].name), apply, route, update)
+            return
+        for field, item in update:
+            self.update_queue.submit((route, field.name), apply, route, [(field, item)])
+    
+    def _apply_segment_update(self, route: OSCRoute, update: SegmentUpdate):
+        """
+        Apply a segment parameter update.
+        
+        Args:
+            route: Parsed route with scene, effect, segment and parameter
+            update: Compiled update (see SegmentSchema)
+        """
+        scene, effect, segment, error = self.router.resolve(route)
+        if error:
+            logger.warning("resolve", "%s", error)
+            return
+        
+        if self._set_segment_param(segment, update) and self.simulator:
+            self._update_simulator(route.scene_id, route.effect_id, route.segment_id)
+    
+    def _set_segment_param(self, segment: LightSegment, update: SegmentUpdate) -> bool:
+        """
+        Apply a compiled update to a segment, stopping ramps of the parameters it writes.
+        
+        Args:
+            segment: Segment to update
+            update: Compiled update (see SegmentSchema)
             
-            if self.simulator:
-                self._update_simulator(scene_id)
-        except Exception as e:
-            print(f"Error loading effects configuration: {e}")
+        Returns:
+            True if the segment was updated
+        """
+        if self.ramps.count:
+            for field, _ in update:
+                self.ramps.cancel(segment, field.name)
+        return apply_segment_update(segment, update)
     
-    def scene_save_palettes_callback(self, address, *args):
+    def _on_segment_bulk(self, route: OSCRoute, *args):
         """
-        Handle OSC messages for saving palettes to a JSON file.
+        Queue an update for the segments matched by a wildcard or range address, e.g.
+        /scene/1/effect/1/segment/*/position or /scene/1/effect/1/segment/[1-500]/position.
+        The value is applied to every matched segment. Arguments are read as in _on_segment:
+        several arguments form one list value (e.g. transparency). To give each segment its
+        own value, use a dense blob (/scene/N/effect/M/dense/param) or the HTTP API.
         
         Args:
-            address: OSC address pattern
+            route: Parsed route with scene, effect, segment selector and parameter
             *args: OSC message arguments
         """
-        pattern = r"/scene/(\d+)/save_palettes"
-        match = re.match(pattern, address)
+        self._submit_segment_update(route, args[0] if len(args) == 1 else list(args), self._apply_bulk_segment_update)
+    
+    def _apply_bulk_segment_update(self, route: OSCRoute, update: SegmentUpdate):
+        """
+        Apply one update to every segment matched by a bulk route, as a single batch on the
+        effect with one change log entry and one simulator refresh.
         
-        if not match:
-            print(f"Invalid address pattern: {address}")
+        Args:
+            route: Parsed bulk route
+            update: Compiled update (see SegmentSchema)
+        """
+        scene, effect, _, error = self.router.resolve(route)
+        if error:
+            logger.warning("resolve", "%s", error)
             return
-            
-        scene_id = int(match.group(1))
-        file_path = args[0]
         
-        if scene_id not in self.light_scenes:
-            print(f"Scene {scene_id} not found")
+        try:
+            segment_ids = select_segments(route.selector, effect.segments.keys())
+        except ValueError as e:
+            logger.warning("bulk", "Invalid segment selector %s: %s", route.selector, e)
             return
-            
-        scene = self.light_scenes[scene_id]
         
+        updated = effect.batch_update(segment_ids, itertools.repeat(update), self._set_segment_param)
+        if updated and self.simulator:
+            self._update_simulator(route.scene_id, route.effect_id)
+    
+    def _on_packed(self, route: OSCRoute, *args):
+        """
+        Queue a packed parameter blob: little-endian (uint16 segment ID, uint16 parameter ID,
+        float32 value) records, see controllers.packed_params. Packets are not coalesced
+        with each other since each may address a different set of segments.
+        
+        Args:
+            route: Parsed route with scene and effect
+            *args: OSC message arguments (a single blob)
+        """
+        if not args or not isinstance(args[0], bytes):
+            logger.warning("packed", "Expected a blob for packed parameters in effect %s", route.effect_id)
+            return
         try:
-            scene.save_palettes_to_json(file_path)
-            print(f"Saved palettes to {file_path}")
-        except Exception as e:
-            print(f"Error saving palettes: {e}")
+            updates, rejected = decode_packed_records(args[0])
+        except ValueError as e:
+            logger.warning("packed", "%s", e)
+            return
+        if rejected:
+            self._count_non_finite(rejected, f"packed blob for effect {route.effect_id}")
+        self.update_queue.submit((route, next(self.packed_sequence)), self._apply_packed, route, updates)
     
-    def scene_load_palettes_callback(self, address, *args):
+    def _apply_packed(self, route: OSCRoute, updates: Dict[str, tuple]):
+        scene, effect, _, error = self.router.resolve(route)
+        if error:
+            logger.warning("resolve", "%s", error)
+            return
+        
+        updated = False
+        for param, (segment_ids, values) in updates.items():
+            if effect.batch_update(segment_ids, values, self._packed_setter(param)):
+                updated = True
+        if updated and self.simulator:
+            self._update_simulator(route.scene_id, route.effect_id)
+    
+    def _on_dense(self, route: OSCRoute, *args):
         """
-        Handle OSC messages for loading palettes from a JSON file.
+        Queue a dense parameter blob: one little-endian float32 value per segment, in
+        ascending segment ID order. A newer blob for the same parameter replaces a pending one.
         
         Args:
-            address: OSC address pattern
+            route: Parsed route with scene, effect and parameter
+            *args: OSC message arguments (a single blob)
+        """
+        if route.param not in PACKED_SETTERS:
+            logger.warning("packed", "Unsupported dense parameter: %s", route.param)
+            return
+        if not args or not isinstance(args[0], bytes):
+            logger.warning("packed", "Expected a blob for dense parameter %s", route.param)
+            return
+        try:
+            positions, values, rejected = decode_dense_values(args[0])
+        except ValueError as e:
+            logger.warning("packed", "%s", e)
+            return
+        if rejected:
+            self._count_non_finite(rejected, f"dense {route.param} blob")
+        self.update_queue.submit(route, self._apply_dense, route, positions, values)
+    
+    def _count_non_finite(self, count: int, source: str):
+        with self.stats_lock:
+            self.non_finite_rejected += count
+        logger.warning("packed.non_finite", "Skipped %d NaN or infinite values in %s", count, source)
+    
+    def _apply_dense(self, route: OSCRoute, positions: List[int], values: List[float]):
+        scene, effect, _, error = self.router.resolve(route)
+        if error:
+            logger.warning("resolve", "%s", error)
+            return
+        
+        all_ids = sorted(effect.segments)
+        segment_ids = [all_ids[position] for position in positions if position < len(all_ids)]
+        if effect.batch_update(segment_ids, values, self._packed_setter(route.param)) and self.simulator:
+            self._update_simulator(route.scene_id, route.effect_id)
+    
+    def _packed_setter(self, param: str):
+        """
+        Get the setter for a packed or dense parameter. While ramps are active the
+        setter also stops the ramp of each segment it writes.
+        """
+        setter = PACKED_SETTERS[param]
+        if not self.ramps.count or param not in RAMP_PARAMS:
+            return setter
+        
+        def set_and_cancel(segment: LightSegment, value):
+            self.ramps.cancel(segment, param)
+            return setter(segment, value)
+        return set_and_cancel
+    
+    def _on_ramp(self, route: OSCRoute, *args):
+        """
+        Queue a parameter ramp for the segments matched by the address, e.g.
+        /scene/1/effect/1/segment/2/ramp move_speed 40 2.5s ease-in-out.
+        Arguments are the parameter, the target value, the duration (seconds, or a string
+        such as "2.5s" or "250ms") and optionally the easing curve (linear by default).
+        "param stop" stops a ramp and leaves the parameter at its current value.
+        
+        Args:
+            route: Parsed route with scene, effect and segment selector
             *args: OSC message arguments
         """
-        pattern = r"/scene/(\d+)/load_palettes"
-        match = re.match(pattern, address)
+        if len(args) < 2 or args[0] not in RAMP_PARAMS:
+            logger.warning("ramp", "Expected a parameter (%s) and a target for %s/ramp",
+                           ", ".join(RAMP_PARAMS), route.selector)
+            return
+        param = args[0]
+        if args[1] == "stop":
+            self.update_queue.submit((route, param), self._apply_ramp, route, param, None, 0.0, None)
+            return
         
-        if not match:
-            print(f"Invalid address pattern: {address}")
+        easing = args[3] if len(args) > 3 else "linear"
+        try:
+            target = float(args[1])
+            duration = parse_duration(args[2] if len(args) > 2 else 0.0)
+            if not math.isfinite(target):
+                raise ValueError(f"Invalid ramp target: {args[1]}")
+        except (TypeError, ValueError) as e:
+            logger.warning("ramp", "Invalid ramp for %s: %s", param, e)
+            return
+        if easing not in EASINGS:
+            logger.warning("ramp", "Unknown easing %s, expected one of %s", easing, ", ".join(EASINGS))
+            return
+        # Keyed per parameter so that ramps of different parameters of a segment are not coalesced
+        self.update_queue.submit((route, param), self._apply_ramp, route, param, target, duration, easing)
+    
+    def _apply_ramp(self, route: OSCRoute, param: str, target: Optional[float], duration: float, easing: Optional[str]):
+        """
+        Start (or with target None, stop) a ramp on every segment matched by a ramp route.
+        """
+        scene, effect, _, error = self.router.resolve(route)
+        if error:
+            logger.warning("resolve", "%s", error)
             return
-            
-        scene_id = int(match.group(1))
-        file_path = args[0]
         
-        if scene_id not in self.light_scenes:
-            print(f"Scene {scene_id} not found")
+        try:
+            segment_ids = select_segments(route.selector, effect.segments.keys())
+        except ValueError as e:
+            logger.warning("ramp", "Invalid segment selector %s: %s", route.selector, e)
             return
+        for segment_id in segment_ids:
+            segment = effect.segments[segment_id]
+            if target is None:
+                self.ramps.cancel(segment, param)
+            else:
+                try:
+                    self.ramps.start(effect, segment, param, target, duration, easing, self._ramp_time())
+                except ValueError as e:
+                    logger.warning("ramp", "Invalid ramp for segment %s: %s", segment_id, e)
+    
+    def _on_effect_palette(self, route: OSCRoute, *args):
+        self.update_queue.submit(route, self._apply_effect_palette, route, args[0])
+    
+    def _apply_effect_palette(self, route: OSCRoute, value):
+        palette_id = value
+        scene, effect, _, error = self.router.resolve(route)
+        if error:
+            logger.warning("resolve", "%s", error)
+            return
+        
+        if palette_id in scene.palettes:
+            effect.set_palette(palette_id)
+            logger.debug("update.palette", "Set palette for effect %s to %s", route.effect_id, palette_id)
             
-        scene = self.light_scenes[scene_id]
+            if self.simulator:
+                self._update_simulator(route.scene_id, route.effect_id)
+    
+    def _on_scene_palette(self, route: OSCRoute, *args):
+        self.update_queue.submit(route, self._apply_scene_palette, route, args[0])
+    
+    def _apply_scene_palette(self, route: OSCRoute, value):
+        palette_id = value
+        scene, _, _, error = self.router.resolve(route)
+        if error:
+            logger.warning("resolve", "%s", error)
+            return
         
-        try:
-            scene.load_palettes_from_json(file_path)
-            print(f"Loaded palettes from {file_path}")
+        if palette_id in scene.palettes:
+            scene.set_palette(palette_id)
+            logger.debug("update.palette", "Set palette for scene %s to %s", route.scene_id, palette_id)
             
             if self.simulator:
-                self._update_simulator(scene_id)
-        except Exception as e:
-            print(f"Error loading palettes: {e}")
+                self._update_simulator(route.scene_id)
     
-    def legacy_effect_segment_callback(self, address, *args):
+    def _on_update_palettes(self, route: OSCRoute, *args):
+        self.update_queue.submit(route, self._apply_update_palettes, route, args[0])
+    
+    def _apply_update_palettes(self, route: OSCRoute, value):
+        new_palettes = value
+        scene, _, _, error = self.router.resolve(route)
+        if error:
+            logger.warning("resolve", "%s", error)
+            return
+        
+        if isinstance(new_palettes, dict):
+            scene.update_all_palettes(new_palettes)
+            logger.debug("update.palettes", "Updated palettes for scene %s", route.scene_id)
+            
+            if self.simulator:
+                self._update_simulator(route.scene_id)
+    
+    def _on_save_effects(self, route: OSCRoute, *args):
         """
-        Handle legacy OSC messages for backward compatibility.
-        Maps to new scene-based structure internally.
+        Save a scene to a JSON file without blocking. The scene is copied at the next frame
+        boundary, so the file holds the state of a single frame; the copy is encoded and
+        written (temp file + rename) by the file worker.
+        Completion is reported with /scene/{id}/save_effects/done or .../failed.
+        """
+        file_path = args[0]
+        start = time.perf_counter()
+        client = self.reply_client()
+        self.update_queue.submit(("save_effects", next(self.file_sequence)), self._save_snapshot,
+                                 route, client, "save_effects", file_path, start, LightScene.to_dict)
+    
+    def _save_snapshot(self, route: OSCRoute, client: Optional[OSCClient], operation: str, file_path: str,
+                       start: float, snapshot: Callable[[LightScene], Dict]):
+        """
+        Copy scene data on the render thread and hand only the copy to the file worker.
         
         Args:
-            address: OSC address pattern
-            *args: OSC message arguments
+            route: Route of the request
+            client: Client that made the request (None if unknown)
+            operation: save_effects or save_palettes
+            file_path: File to write
+            start: perf_counter() time the request was received
+            snapshot: Function returning the data to save for a scene
         """
-        pattern = r"/effect/(\d+)/segment/(\d+)/(.+)"
-        match = re.match(pattern, address)
-        
-        if not match:
-            print(f"Invalid address pattern: {address}")
+        scene, _, _, error = self.router.resolve(route)
+        if error:
+            self._file_done(route, client, operation, file_path, start, error)
             return
-            
-        effect_id = int(match.group(1))
-        segment_id = int(match.group(2))
-        param_name = match.group(3)
-        value = args[0]
         
-        scene_id = 1
+        data = copy.deepcopy(snapshot(scene))
+        self.scene_files.submit(lambda: write_json_atomic(file_path, data),
+                                lambda result, error, seconds: self._file_done(route, client, operation, file_path, start, error))
+    
+    def _on_load_effects(self, route: OSCRoute, *args):
+        """
+        Load a scene from a JSON file without blocking. The file is parsed into a staging
+        scene by the file worker, which replaces the current scene at the next frame boundary.
+        Completion is reported with /scene/{id}/load_effects/done or .../failed.
+        """
+        file_path = args[0]
+        start = time.perf_counter()
+        client = self.reply_client()
         
-        if scene_id not in self.light_scenes:
-            self.light_scenes[scene_id] = LightScene(scene_ID=scene_id)
+        def staged(new_scene, error, seconds):
+            if error:
+                self._file_done(route, client, "load_effects", file_path, start, error)
+            else:
+                # Not coalesced: loads finishing within one frame are each applied and answered
+                self.update_queue.submit(("load_effects", next(self.file_sequence)), self._swap_scene, route, client, new_scene, file_path, start)
         
-        scene = self.light_scenes[scene_id]
+        self.scene_files.submit(lambda: LightScene.from_dict(read_json(file_path)), staged)
+    
+    def _swap_scene(self, route: OSCRoute, client: Optional[OSCClient], new_scene: LightScene, file_path: str, start: float):
+        new_scene.scene_ID = route.scene_id  # Ensure the scene ID matches the request
+        old_scene = self.light_scenes.get(route.scene_id)
+        if old_scene is not None:
+            self.ramps.cancel_effects(old_scene.effects.values())
+        self.light_scenes[route.scene_id] = new_scene
+        self.router.invalidate()
+        if self.artnet:
+            # The loaded segments do not hold the DMX values; write them again
+            self.artnet.invalidate(route.scene_id)
         
-        if effect_id not in scene.effects:
-            scene.add_effect(effect_id, LightEffect(effect_ID=effect_id, led_count=DEFAULT_LED_COUNT, fps=DEFAULT_FPS))
+        if self.simulator:
+            self._update_simulator(route.scene_id)
+        self._file_done(route, client, "load_effects", file_path, start, None)
+    
+    def _on_save_palettes(self, route: OSCRoute, *args):
+        """
+        Save a scene's palettes to a JSON file without blocking. The palettes are copied at
+        the next frame boundary and written by the file worker.
+        Completion is reported with /scene/{id}/save_palettes/done or .../failed.
+        """
+        file_path = args[0]
+        start = time.perf_counter()
+        client = self.reply_client()
+        self.update_queue.submit(("save_palettes", next(self.file_sequence)), self._save_snapshot,
+                                 route, client, "save_palettes", file_path, start, LightScene.palettes_to_dict)
+    
+    def _on_load_palettes(self, route: OSCRoute, *args):
+        """
+        Load a scene's palettes from a JSON file without blocking. The file is read by the
+        file worker and the palettes are replaced at the next frame boundary.
+        Completion is reported with /scene/{id}/load_palettes/done or .../failed.
+        """
+        file_path = args[0]
+        start = time.perf_counter()
+        client = self.reply_client()
         
-        effect = scene.effects[effect_id]
+        def loaded(data, error, seconds):
+            if error:
+                self._file_done(route, client, "load_palettes", file_path, start, error)
+            else:
+                # Not coalesced: loads finishing within one frame are each applied and answered
+                self.update_queue.submit(("load_palettes", next(self.file_sequence)), self._apply_palette_file, route, client, data, file_path, start)
         
-        if segment_id not in effect.segments:
-            new_segment = LightSegment(
-                segment_ID=segment_id,
-                color=[0, 1, 2, 3],
-                transparency=DEFAULT_TRANSPARENCY,
-                length=DEFAULT_LENGTH,
-                move_speed=DEFAULT_MOVE_SPEED,
-                move_range=DEFAULT_MOVE_RANGE,
-                initial_position=DEFAULT_INITIAL_POSITION,
-                is_edge_reflect=DEFAULT_IS_EDGE_REFLECT,
-                dimmer_time=DEFAULT_DIMMER_TIME
-            )
-            effect.add_segment(segment_id, new_segment)
+        self.scene_files.submit(lambda: read_json(file_path), loaded)
+    
+    def _apply_palette_file(self, route: OSCRoute, client: Optional[OSCClient], data: Dict, file_path: str, start: float):
+        scene, _, _, error = self.router.resolve(route)
+        if error:
+            self._file_done(route, client, "load_palettes", file_path, start, error)
+            return
         
-        new_address = f"/scene/{scene_id}/effect/{effect_id}/segment/{segment_id}/{param_name}"
-        self.scene_effect_segment_callback(new_address, *args)
+        scene.set_palettes_from_dict(data)
+        if self.simulator:
+            self._update_simulator(route.scene_id)
+        self._file_done(route, client, "load_palettes", file_path, start, None)
     
-    def legacy_effect_object_callback(self, address, *args):
+    def _file_done(self, route: OSCRoute, client: Optional[OSCClient], operation: str, file_path: str, start: float, error):
         """
-        Handle legacy OSC messages with 'object' instead of 'segment'.
-        Maps to new scene-based structure internally.
+        Log the outcome of a save or load and report it, with the elapsed time, to the
+        requesting client and all subscribed clients.
         
         Args:
-            address: OSC address pattern
-            *args: OSC message arguments
+            route: Route of the request
+            client: Client that made the request (None if unknown)
+            operation: save_effects, load_effects, save_palettes or load_palettes
+            file_path: File that was written or read
+            start: perf_counter() time the request was received
+            error: None on success, otherwise the error (exception or message)
         """
-        pattern = r"/effect/(\d+)/object/(\d+)/(.+)"
-        match = re.match(pattern, address)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if error is None:
+            logger.info("save_load", "%s %s for scene %s in %.1f ms", operation, file_path, route.scene_id, elapsed_ms)
+            self.clients.broadcast(f"/scene/{route.scene_id}/{operation}/done", [file_path, elapsed_ms], (client,))
+        else:
+            logger.error("save_load", "%s %s for scene %s failed: %s", operation, file_path, route.scene_id, error)
+            self.clients.broadcast(f"/scene/{route.scene_id}/{operation}/failed", [file_path, str(error), elapsed_ms], (client,))
+    
+    def _on_legacy_segment(self, route: OSCRoute, *args):
+        """
+        Handle legacy /effect/N/segment/M/param and /effect/N/object/M/param messages.
         
-        if not match:
-            print(f"Invalid address pattern: {address}")
-            return
-            
-        effect_id = int(match.group(1))
-        object_id = int(match.group(2))
-        param_name = match.group(3)
-        value = args[0]
+        Args:
+            route: Parsed legacy route (scene_id is always 1)
+            *args: OSC message arguments (several arguments form a list value, e.g. position/range)
+        """
+        self._submit_segment_update(route, args[0] if len(args) == 1 else list(args), self._apply_legacy_segment_update)
+    
+    def _apply_legacy_segment_update(self, route: OSCRoute, update: SegmentUpdate):
+        """
+        Apply a legacy segment update. Missing scenes, effects and segments are created
+        with default settings, then the value is applied as a scene-based segment update.
         
-        scene_id = 1
+        Args:
+            route: Parsed legacy route
+            update: Compiled update (see SegmentSchema)
+        """
+        scene_id = route.scene_id
+        effect_id = route.effect_id
+        segment_id = route.segment_id
         
         if scene_id not in self.light_scenes:
             self.light_scenes[scene_id] = LightScene(scene_ID=scene_id)
@@ -534,10 +964,10 @@ class OSCHandler:
         
         effect = scene.effects[effect_id]
         
-        if object_id not in effect.segments:
+        if segment_id not in effect.segments:
             new_segment = LightSegment(
-                segment_ID=object_id,
-                color=[0, 1, 2, 3],  
+                segment_ID=segment_id,
+                color=[0, 1, 2, 3],
                 transparency=DEFAULT_TRANSPARENCY,
                 length=DEFAULT_LENGTH,
                 move_speed=DEFAULT_MOVE_SPEED,
@@ -546,32 +976,25 @@ class OSCHandler:
                 is_edge_reflect=DEFAULT_IS_EDGE_REFLECT,
                 dimmer_time=DEFAULT_DIMMER_TIME
             )
-            effect.add_segment(object_id, new_segment)
+            effect.add_segment(segment_id, new_segment)
         
-        new_address = f"/scene/{scene_id}/effect/{effect_id}/segment/{object_id}/{param_name}"
-        self.scene_effect_segment_callback(new_address, *args)
+        self._apply_segment_update(route, update)
     
-    def legacy_palette_callback(self, address, *args):
-        """
-        Handle legacy OSC messages for updating palettes.
-        Maps to new scene-based structure internally.
-        
-        Args:
-            address: OSC address pattern
-            *args: OSC message arguments
-        """
-        pattern = r"/palette/([A-E])"
-        match = re.match(pattern, address)
-        
-        if not match:
-            print(f"Invalid palette address: {address}")
+    def _on_legacy_palette(self, route: OSCRoute, *args):
+        if route.param not in DEFAULT_COLOR_PALETTES:
+            logger.warning("invalid_address", "Invalid palette address: /palette/%s", route.param)
             return
-            
-        palette_id = match.group(1)
-        colors_flat = args[0]
+        if not args:
+            logger.warning("palette", "No color data for palette %s", route.param)
+            return
+        self.update_queue.submit(route, self._apply_legacy_palette, route, args[0])
+    
+    def _apply_legacy_palette(self, route: OSCRoute, value):
+        palette_id = route.param
+        colors_flat = value
         
         if not isinstance(colors_flat, list) or len(colors_flat) % 3 != 0:
-            print(f"Invalid color data for palette {palette_id}: {colors_flat}")
+            logger.warning("palette", "Invalid color data for palette %s: %s", palette_id, colors_flat)
             return
         
         colors = []
@@ -584,15 +1007,248 @@ class OSCHandler:
         for scene_id, scene in self.light_scenes.items():
             scene.update_palette(palette_id, colors)
             
-        print(f"Updated palette {palette_id} with {len(colors)} colors in all scenes")
+        logger.debug("update.palette", "Updated palette %s with %d colors in all scenes", palette_id, len(colors))
         
         if self.simulator:
             self._update_simulator()
     
+    def _on_init(self, route: OSCRoute, *args):
+        self.init_callback("/request/init", *args)
+    
+    def _on_subscribe(self, route: OSCRoute, *args):
+        """
+        Subscribe the sender to feedback. An optional argument is the port to send to
+        on the sender's host, for controllers that do not listen on their source port.
+        """
+        address = self.router.current_client_address()
+        if address is not None and self.clients.subscribe(address, int(args[0]) if args else None) is None:
+            self.clients.get(address).send_message("/subscribe/refused", ["too many subscribed clients"])
+    
+    def _on_unsubscribe(self, route: OSCRoute, *args):
+        address = self.router.current_client_address()
+        if address is not None:
+            self.clients.unsubscribe(address)
+    
+    def _on_stream_subscribe(self, route: OSCRoute, *args):
+        """
+        Stream frames to the sender: /stream/subscribe [fps [downsample [delta [port]]]].
+        Defaults to 10 fps, no downsampling, delta packets and the sender's source port.
+        The chosen tier is confirmed with /stream/subscribed [fps, downsample, delta].
+        """
+        address = self.router.current_client_address()
+        if address is None or self.frame_streamer is None:
+            return
+        fps = args[0] if len(args) > 0 else 10
+        downsample = args[1] if len(args) > 1 else 1
+        delta = args[2] if len(args) > 2 else 1
+        client = self.clients.get(address)
+        if len(args) > 3:
+            client.set_reply_port(int(args[3]))
+        try:
+            key = self.frame_streamer.subscribe(client, fps, downsample, delta)
+        except ValueError as e:
+            logger.warning("stream", "Refused stream for %s:%s: %s", address[0], address[1], e)
+            client.send_message("/stream/refused", [str(e)])
+            return
+        if key is None:
+            client.send_message("/stream/refused", ["too many stream tiers"])
+        else:
+            client.send_message("/stream/subscribed", [key[0], key[1], int(key[2])])
+    
+    def _on_stream_unsubscribe(self, route: OSCRoute, *args):
+        address = self.router.current_client_address()
+        if address is not None and self.frame_streamer is not None:
+            self.frame_streamer.unsubscribe(address)
+    
+    def _on_stream_keyframe(self, route: OSCRoute, *args):
+        address = self.router.current_client_address()
+        if address is not None and self.frame_streamer is not None:
+            self.frame_streamer.request_keyframe(address)
+    
+    def start_namespace_server(self, port: int, host: Optional[str] = None) -> int:
+        """
+        Serve the namespace description over HTTP, like an OSCQuery server.
+        The server is read-only: it describes addresses and types, never values, and
+        cannot change anything.
+        
+        Args:
+            port: Port to listen on (0 picks a free port)
+            host: Address to listen on (defaults to the OSC server's address, e.g. 0.0.0.0 for
+                  all interfaces, so every controller that can reach the OSC server can
+                  discover it)
+            
+        Returns:
+            The port the server listens on
+        """
+        self.namespace_server = NamespaceHTTPServer(self.namespace, host or self.ip, port)
+        self.namespace_server.start()
+        return self.namespace_server.port
+    
+    def _on_namespace(self, route: OSCRoute, *args):
+        """
+        Reply with the JSON description of an address (default: the whole tree) as
+        /namespace/reply [path, index, count, text] messages; the client joins the texts
+        in index order. Unknown paths, descriptions too large for OSC and requests from
+        clients that have not subscribed are answered with /namespace/error [path, reason].
+        Replies can span many datagrams, so they only go to subscribed clients and a small
+        request with a forged source address cannot aim them at another host.
+        """
+        path = str(args[0]) if args else "/"
+        client = self.reply_client()
+        if self.router.current_client_address() is not None and not client.subscribed:
+            client.send_message("/namespace/error", [path, "Send /subscribe first, or use the HTTP server"])
+            return
+        document = self.namespace.get_json(path)
+        if document is None:
+            client.send_message("/namespace/error", [path, "No such OSC address"])
+            return
+        
+        # Leave room for the address, path and indexes in each datagram
+        chunk_size = MAX_DATAGRAM_SIZE - 64 - len(path.encode("utf-8"))
+        count = -(-len(document) // chunk_size)
+        if count > MAX_NAMESPACE_CHUNKS:
+            client.send_message("/namespace/error", [path, f"Description is {len(document)} bytes; "
+                                                           "query a subtree or use the HTTP server"])
+            return
+        for index in range(count):
+            text = document[index * chunk_size:(index + 1) * chunk_size].decode("ascii")
+            client.send_message("/namespace/reply", [path, index, count, text])
+    
+    def get_namespace_stats(self) -> Dict[str, int]:
+        """
+        Get counters for the namespace cache.
+        
+        Returns:
+            Dictionary of namespace tree counters
+        """
+        return self.namespace.get_stats()
+    
+    def _on_clock(self, route: OSCRoute, *args):
+        """
+        Add a sample of the external clock: /clock [seconds] with the remote time as a
+        number or an OSC timetag. The sample is paired with the time the datagram arrived,
+        taken by the ingress queue before it waits in the backlog, so queueing does not add
+        to the jitter. Samples are queued in order and never coalesced, since every one
+        contributes to the fit.
+        """
+        received = self.router.current_received_time()
+        if self.clock is None or not hasattr(self.clock, "add_sample"):
+            logger.warning("clock", "Received /clock but the show is not following an external clock")
+            return
+        if not args:
+            logger.warning("clock", "Expected a time in /clock")
+            return
+        try:
+            remote_time = clock_seconds(args[0])
+        except (TypeError, ValueError) as e:
+            logger.warning("clock", "Invalid /clock time: %s", e)
+            return
+        self.clock.add_sample(remote_time, received)
+    
+    def get_clock_stats(self) -> Dict[str, Any]:
+        """
+        Get the state of the clock source: offset, rate, jitter and sample counts.
+        
+        Returns:
+            Dictionary of clock counters (empty without a clock source)
+        """
+        return self.clock.get_stats() if self.clock is not None else {}
+    
+    def start_artnet_input(self, mappings: List[ArtNetMapping], port: int = ARTNET_PORT, host: str = "0.0.0.0") -> int:
+        """
+        Receive DMX over Art-Net and write mapped channels to segment parameters.
+        Writes go through the update queue like OSC updates and stop running ramps.
+        
+        Args:
+            mappings: Channel mappings (see controllers.artnet_input.ArtNetMapping)
+            port: UDP port to listen on (0 picks a free port)
+            host: Address to listen on
+            
+        Returns:
+            The port the input listens on
+        """
+        self.artnet = ArtNetInput(self.light_scenes, self.update_queue, mappings, host, port,
+                                  setter_for=self._packed_setter, on_update=self._on_external_update)
+        self.artnet.start()
+        return self.artnet.port
+    
+    def _on_external_update(self, scene_id: int, effect_id: Optional[int] = None):
+        if self.simulator:
+            self._update_simulator(scene_id, effect_id)
+    
+    def start_http_api(self, port: int, host: str = "127.0.0.1") -> int:
+        """
+        Serve scene state and batch PATCH endpoints as JSON over HTTP.
+        Changes share the update queue with OSC and are applied at frame boundaries.
+        
+        Args:
+            port: Port to listen on (0 picks a free port)
+            host: Address to listen on (defaults to loopback only; the API can change any state
+                  and has no authentication)
+            
+        Returns:
+            The port the server listens on
+        """
+        self.http_api = HTTPControlServer(self.light_scenes, self.update_queue, self.segment_schema,
+                                          self._set_segment_param, host, port,
+                                          on_update=self._on_external_update)
+        self.http_api.start()
+        return self.http_api.port
+    
+    def get_http_stats(self) -> Dict[str, Any]:
+        """
+        Get HTTP API request counters.
+        
+        Returns:
+            Dictionary of HTTP API counters (empty without the HTTP API)
+        """
+        return self.http_api.get_stats() if self.http_api else {}
+    
+    def get_artnet_stats(self) -> Dict[str, Any]:
+        """
+        Get Art-Net receive counters per universe.
+        
+        Returns:
+            Dictionary of Art-Net input counters (empty without Art-Net input)
+        """
+        return self.artnet.get_stats() if self.artnet else {}
+    
+    def get_stream_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get counters for the frame streaming tiers.
+        
+        Returns:
+            Dictionary mapping tier name to subscriber, frame and byte counts
+        """
+        return self.frame_streamer.get_stats() if self.frame_streamer else {}
+    
+    def reply_client(self) -> OSCClient:
+        """
+        Get the client to reply to for the message being handled on the calling thread.
+        
+        Returns:
+            The sender's client, or the default client if the sender is unknown
+        """
+        address = self.router.current_client_address()
+        return self.clients.get(address) if address is not None else self.client
+    
+    def get_client_stats(self) -> Dict[str, Any]:
+        """
+        Get counters for the tracked clients (received, sent, rate limited and failed sends).
+        
+        Returns:
+            Dictionary of client pool counters
+        """
+        return self.clients.get_stats()
+    
     def init_callback(self, address, *args):
         """
         Handle initialization request from clients.
-        Sends current configuration to the client.
+        Queues a dump of the current configuration, which is sent in bundles over the
+        next frames to the requesting client. An optional second argument is the state
+        version the client already has (from its last /init/version reply); only changes
+        since then are sent. The requesting client is also subscribed to feedback, if the
+        client pool has room.
         
         Args:
             address: OSC address pattern
@@ -601,97 +1257,13 @@ class OSCHandler:
         if address != "/request/init" or len(args) == 0 or args[0] != 1:
             return
             
-        print("Received initialization request")
-        
-        for scene_id, scene in self.light_scenes.items():
-            for palette_id, colors in scene.palettes.items():
-                flat_colors = []
-                for color in colors:
-                    flat_colors.extend(color)
-                self.client.send_message(f"/palette/{palette_id}", flat_colors)
-            
-            for effect_id, effect in scene.effects.items():
-                for segment_id, segment in effect.segments.items():
-                    self.client.send_message(
-                        f"/scene/{scene_id}/effect/{effect_id}/segment/{segment_id}/color", 
-                        {
-                            "colors": segment.color,
-                            "speed": segment.move_speed,
-                            "gradient": 1 if hasattr(segment, 'gradient') and segment.gradient else 0
-                        }
-                    )
-                    
-                    self.client.send_message(
-                        f"/scene/{scene_id}/effect/{effect_id}/segment/{segment_id}/position",
-                        {
-                            "initial_position": segment.initial_position,
-                            "speed": segment.move_speed,
-                            "range": segment.move_range,
-                            "interval": getattr(segment, 'position_interval', 10)
-                        }
-                    )
-                    
-                    self.client.send_message(
-                        f"/scene/{scene_id}/effect/{effect_id}/segment/{segment_id}/span",
-                        {
-                            "span": sum(segment.length),
-                            "range": getattr(segment, 'span_range', segment.move_range), 
-                            "speed": getattr(segment, 'span_speed', segment.move_speed),
-                            "interval": getattr(segment, 'span_interval', 10),
-                            "gradient_colors": segment.gradient_colors if hasattr(segment, "gradient_colors") else [0, -1, -1],
-                            "fade": 1 if hasattr(segment, 'fade') and segment.fade else 0
-                        }
-                    )
-                    
-                    self.client.send_message(
-                        f"/scene/{scene_id}/effect/{effect_id}/segment/{segment_id}/transparency", 
-                        segment.transparency
-                    )
-                    
-                    self.client.send_message(
-                        f"/scene/{scene_id}/effect/{effect_id}/segment/{segment_id}/is_edge_reflect", 
-                        1 if segment.is_edge_reflect else 0
-                    )
-                    
-                    self.client.send_message(
-                        f"/scene/{scene_id}/effect/{effect_id}/segment/{segment_id}/dimmer_time",
-                        segment.dimmer_time
-                    )
-                    
-                    self.client.send_message(
-                        f"/effect/{effect_id}/segment/{segment_id}/color", 
-                        {
-                            "colors": segment.color,
-                            "speed": segment.move_speed,
-                            "gradient": 1 if hasattr(segment, 'gradient') and segment.gradient else 0
-                        }
-                    )
-                    
-                    self.client.send_message(
-                        f"/effect/{effect_id}/object/{segment_id}/color", 
-                        {
-                            "colors": segment.color,
-                            "speed": segment.move_speed,
-                            "gradient": 1 if hasattr(segment, 'gradient') and segment.gradient else 0
-                        }
-                    )
-                    
-                    self.client.send_message(
-                        f"/effect/{effect_id}/object/{segment_id}/position/initial_position", 
-                        segment.initial_position
-                    )
-                    
-                    self.client.send_message(
-                        f"/effect/{effect_id}/object/{segment_id}/position/speed", 
-                        segment.move_speed
-                    )
-                    
-                    self.client.send_message(
-                        f"/effect/{effect_id}/object/{segment_id}/position/range", 
-                        segment.move_range
-                    )
-        
-        print("Sent initialization data")
+        logger.info("init", "Received initialization request")
+        since_version = args[1] if len(args) > 1 else None
+        address = self.router.current_client_address()
+        client = self.client
+        if address is not None:
+            client = self.clients.subscribe(address) or self.clients.get(address)
+        self.state_dump.request(self.light_scenes, since_version, client)
         
     def _update_simulator(self, scene_id=None, effect_id=None, segment_id=None):
         """
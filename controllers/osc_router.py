@@ -0,0 +1,339 @@
+from typing import Any, Callable, Collection, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import functools
+import re
+import sys
+import threading
+import time
+from pythonosc import dispatcher, osc_bundle, osc_message, osc_packet
+from pythonosc.parsing import osc_types
+
+sys.path.append('..')
+from models.light_scene import LightScene
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+
+class OSCRoute(NamedTuple):
+    """
+    Parsed form of an OSC address. Fields that do not appear in the address are None.
+    """
+    kind: str
+    scene_id: Optional[int] = None
+    effect_id: Optional[int] = None
+    segment_id: Optional[int] = None
+    param: Optional[str] = None
+    selector: Optional[str] = None
+
+
+# Largest number of IDs a segment selector range may span (segment IDs are uint16 in packed blobs)
+MAX_SELECTOR_SPAN = 65536
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_segment_selector(selector: str) -> Optional[Tuple[Tuple[int, int], ...]]:
+    """
+    Parse a segment selector from a bulk address. Ranges are kept as (first, last) pairs
+    rather than expanded, so a selector such as "[1-1000000]" costs nothing to parse; use
+    select_segments() to match it against the segments of an effect.
+
+    Args:
+        selector: "*" for all segments, or a bracketed list of IDs and inclusive
+                  numeric ranges such as "[1-500]" or "[1,4,10-20]"
+
+    Returns:
+        Tuple of inclusive (first, last) ID ranges (a single ID is a range with first == last),
+        or None for all segments
+
+    Raises:
+        ValueError: If the selector is malformed, a range is reversed (e.g. "[500-1]") or
+                    spans more than MAX_SELECTOR_SPAN IDs
+    """
+    if selector == "*":
+        return None
+    ranges = []
+    for part in selector.strip("[]").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = (int(bound) for bound in part.split("-", 1))
+            if first > last:
+                raise ValueError(f"Reversed segment range {part}")
+            if last - first >= MAX_SELECTOR_SPAN:
+                raise ValueError(f"Segment range {part} spans more than {MAX_SELECTOR_SPAN} IDs")
+        else:
+            first = last = int(part)
+        ranges.append((first, last))
+    if not ranges:
+        raise ValueError(f"Empty segment selector {selector}")
+    return tuple(ranges)
+
+
+def select_segments(selector: str, segment_ids: Collection[int]) -> Tuple[int, ...]:
+    """
+    Match a segment selector against existing segment IDs.
+
+    Args:
+        selector: Segment selector (see parse_segment_selector)
+        segment_ids: IDs of the segments that exist (e.g. the keys of LightEffect.segments)
+
+    Returns:
+        Sorted tuple of the existing IDs the selector matches
+
+    Raises:
+        ValueError: If the selector is invalid
+    """
+    ranges = parse_segment_selector(selector)
+    if ranges is None:
+        return tuple(sorted(segment_ids))
+    matched = set()
+    for first, last in ranges:
+        if last - first < len(segment_ids):
+            matched.update(segment_id for segment_id in range(first, last + 1) if segment_id in segment_ids)
+        else:
+            matched.update(segment_id for segment_id in segment_ids if first <= segment_id <= last)
+    return tuple(sorted(matched))
+
+
+class OSCRouter(dispatcher.Dispatcher):
+    """
+    OSCRouter parses each OSC address once into an OSCRoute and dispatches straight to the
+    route's callback, instead of matching every registered pattern and re-parsing the
+    address with a regular expression in every handler.
+
+    Parsed routes are cached per address string, and the scene, effect and segment a route
+    points at are cached per route until the structure of the scene or effect changes.
+    Addresses that match no route fall back to the regular pythonosc dispatcher mappings.
+    When a bundle scheduler is set, bundles are handed to it so their messages run together
+    on the frame given by the bundle's timetag. When a client pool is set, every packet marks
+    its sender as seen, and route callbacks can look up the sender with current_client_address().
+    """
+
+    def __init__(self, light_scenes: Dict[int, LightScene], max_cache_size: int = 8192):
+        """
+        Initialize the router.
+
+        Args:
+            light_scenes: Dictionary mapping scene_ID to LightScene instances
+            max_cache_size: Maximum number of cached addresses before the caches are reset
+        """
+        super().__init__()
+        self.light_scenes = light_scenes
+        self.max_cache_size = max_cache_size
+        self.routes: List[Tuple[str, Any, Sequence[str], Dict[str, Any], Callable]] = []
+        self.route_cache: Dict[str, Optional[Tuple[OSCRoute, Callable]]] = {}
+        self.target_cache: Dict[OSCRoute, tuple] = {}
+        self.bundle_scheduler = None
+        self.clients = None
+        self.context = threading.local()
+
+    def add_route(self, kind: str, pattern: str, fields: Sequence[str], callback: Callable, **defaults):
+        """
+        Register a route.
+
+        Args:
+            kind: Name of the route (stored in OSCRoute.kind)
+            pattern: Regular expression for the full address; groups map to fields in order
+            fields: OSCRoute field names for the pattern groups (*_id fields are converted to int)
+            callback: Function called as callback(route, *osc_args)
+            **defaults: Values for OSCRoute fields that are not part of the address
+        """
+        self.routes.append((kind, re.compile(pattern + "$"), tuple(fields), defaults, callback))
+        self.route_cache.clear()
+
+    def parse(self, address: str) -> Optional[Tuple[OSCRoute, Callable]]:
+        """
+        Parse an address into a route, using the per-address cache.
+
+        Args:
+            address: OSC address
+
+        Returns:
+            Tuple of (OSCRoute, callback), or None if no route matches
+        """
+        try:
+            return self.route_cache[address]
+        except KeyError:
+            pass
+
+        result = None
+        for kind, regex, fields, defaults, callback in self.routes:
+            match = regex.match(address)
+            if not match:
+                continue
+            values = dict(defaults)
+            for name, value in zip(fields, match.groups()):
+                values[name] = int(value) if name.endswith("_id") else value
+            result = (OSCRoute(kind, **values), callback)
+            break
+
+        if len(self.route_cache) >= self.max_cache_size:
+            self.route_cache.clear()
+        self.route_cache[address] = result
+        return result
+
+    def resolve(self, route: OSCRoute) -> tuple:
+        """
+        Resolve the scene, effect and segment a route points at.
+        Results are cached until a scene's effects or an effect's segments change.
+
+        Args:
+            route: Parsed route
+
+        Returns:
+            Tuple of (scene, effect, segment, error); objects not addressed by the route are None,
+            and error is a message describing the first missing object (None on success)
+        """
+        cached = self.target_cache.get(route)
+        if cached is not None:
+            scene, scene_version, effect, effect_version, segment = cached
+            if scene.structure_version == scene_version and (effect is None or effect.structure_version == effect_version):
+                return scene, effect, segment, None
+
+        scene = self.light_scenes.get(route.scene_id)
+        if scene is None:
+            return None, None, None, f"Scene {route.scene_id} not found"
+
+        effect = None
+        segment = None
+        if route.effect_id is not None:
+            effect = scene.effects.get(route.effect_id)
+            if effect is None:
+                return scene, None, None, f"Effect {route.effect_id} not found in scene {route.scene_id}"
+
+            if route.segment_id is not None:
+                segment = effect.segments.get(route.segment_id)
+                if segment is None:
+                    return scene, effect, None, f"Segment {route.segment_id} not found in effect {route.effect_id}"
+
+        if len(self.target_cache) >= self.max_cache_size:
+            self.target_cache.clear()
+        self.target_cache[route] = (scene, scene.structure_version, effect,
+                                    effect.structure_version if effect is not None else 0, segment)
+        return scene, effect, segment, None
+
+    def invalidate(self):
+        """
+        Drop all cached targets (call after replacing scenes in light_scenes).
+        """
+        self.target_cache.clear()
+
+    def dispatch(self, address: str, args: Sequence[Any]) -> bool:
+        """
+        Dispatch a single message to its route callback.
+
+        Args:
+            address: OSC address
+            args: OSC message arguments
+
+        Returns:
+            True if a route handled the message
+        """
+        parsed = self.parse(address)
+        if parsed is None:
+            return False
+
+        route, callback = parsed
+        callback(route, *args)
+        return True
+
+    def call_handlers_for_packet(self, data: bytes, client_address: Tuple[str, int],
+                                 received: Optional[float] = None) -> List:
+        """
+        Decode an OSC packet and dispatch every message it contains.
+        Messages that match no route are handed to the handlers registered with map().
+
+        Args:
+            data: Datagram contents
+            client_address: Address of the sender
+            received: time.perf_counter() time the datagram arrived, if it was queued before
+                      dispatch (defaults to now); see current_received_time()
+
+        Returns:
+            Results returned by handlers registered with map()
+        """
+        if self.clients is not None:
+            self.clients.seen(client_address)
+
+        if self.bundle_scheduler is not None and osc_bundle.OscBundle.dgram_is_bundle(data):
+            try:
+                bundle = osc_bundle.OscBundle(data)
+            except osc_bundle.ParseError:
+                return []
+            self._schedule_bundle(bundle, osc_types.IMMEDIATELY, client_address)
+            return []
+
+        try:
+            packet = osc_packet.OscPacket(data)
+        except osc_packet.ParseError:
+            return []
+        self.context.received = received
+        try:
+            return self.dispatch_messages([timed_msg.message for timed_msg in packet.messages], client_address)
+        finally:
+            self.context.received = None
+
+    def _schedule_bundle(self, bundle: osc_bundle.OscBundle, parent_time: float, client_address: Tuple[str, int]):
+        """
+        Hand the messages of a bundle and of its nested bundles to the bundle scheduler.
+        A nested bundle never runs before the bundle containing it.
+        """
+        timetag = bundle.timestamp
+        if timetag == osc_types.IMMEDIATELY or (parent_time != osc_types.IMMEDIATELY and timetag < parent_time):
+            timetag = parent_time
+
+        messages = []
+        for content in bundle:
+            if isinstance(content, osc_message.OscMessage):
+                messages.append(content)
+            else:
+                self._schedule_bundle(content, timetag, client_address)
+        if messages:
+            self.bundle_scheduler.schedule(timetag, messages, client_address)
+
+    def dispatch_messages(self, messages: Sequence[osc_message.OscMessage], client_address: Tuple[str, int]) -> List:
+        """
+        Dispatch decoded messages in order.
+
+        Args:
+            messages: Decoded OSC messages
+            client_address: Address of the sender
+
+        Returns:
+            Results returned by handlers registered with map()
+        """
+        results = []
+        self.context.client_address = client_address
+        for message in messages:
+            try:
+                if self.dispatch(message.address, message.params):
+                    continue
+                for handler in self.handlers_for_address(message.address):
+                    result = handler.invoke(client_address, message)
+                    if result is not None:
+                        results.append(result)
+            except Exception as e:
+                logger.error("dispatch", "Error handling %s: %s", message.address, e)
+        self.context.client_address = None
+        return results
+
+    def current_client_address(self) -> Optional[Tuple[str, int]]:
+        """
+        Get the sender of the message being dispatched on the calling thread.
+
+        Returns:
+            Source address, or None outside of a dispatch
+        """
+        return getattr(self.context, "client_address", None)
+
+    def current_received_time(self) -> float:
+        """
+        Get the arrival time of the packet being dispatched on the calling thread, as
+        recorded by the ingress queue. Outside of a queued dispatch this is the current time.
+
+        Returns:
+            Arrival time on the time.perf_counter() clock
+        """
+        received = getattr(self.context, "received", None)
+        return time.perf_counter() if received is None else received
@@ -0,0 +1,275 @@
+from typing import Callable, Dict, Optional, Tuple
+import sys
+import threading
+import time
+import numpy as np
+
+sys.path.append('..')
+from utils.frame_utils import Frame, frame_to_array
+from utils.log_utils import get_logger
+
+logger = get_logger("output")
+
+
+class FrameRing:
+    """
+    FrameRing is a bounded single-producer/multi-consumer ring of preallocated frame buffers.
+    The render thread pushes every frame; consumers only ever take the newest one.
+    """
+
+    def __init__(self, led_count: int, slot_count: int = 4):
+        """
+        Allocate the ring buffers.
+
+        Args:
+            led_count: Maximum number of LEDs per frame
+            slot_count: Number of frame buffers in the ring
+        """
+        self.capacity = led_count
+        self.slot_count = max(2, slot_count)
+        self.buffers = np.zeros((self.slot_count, led_count, 3), dtype=np.uint8)
+        self.counts = [0] * self.slot_count
+        self.sequence = 0
+        self.condition = threading.Condition()
+
+    def push(self, frame: Frame) -> int:
+        """
+        Copy a rendered frame into the next slot and wake waiting consumers.
+
+        Args:
+            frame: Rendered frame as returned by render() or get_led_output()
+
+        Returns:
+            Sequence number of the pushed frame
+        """
+        pixels = frame_to_array(frame)
+        count = min(len(pixels), self.capacity)
+        sequence = self.sequence + 1
+        slot = sequence % self.slot_count
+        with self.condition:
+            self.buffers[slot, :count] = pixels[:count]
+            self.counts[slot] = count
+            self.sequence = sequence
+            self.condition.notify_all()
+        return sequence
+
+    def wait_for_frame(self, after: int, timeout: float) -> int:
+        """
+        Block until a frame newer than the given sequence is available.
+
+        Args:
+            after: Last sequence number the caller has seen
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            Current sequence number (unchanged if the wait timed out)
+        """
+        with self.condition:
+            if self.sequence <= after:
+                self.condition.wait(timeout)
+            return self.sequence
+
+    def read_latest(self, out: np.ndarray) -> Tuple[int, int]:
+        """
+        Copy the newest frame into a consumer-owned buffer.
+
+        Args:
+            out: Preallocated (led_count, 3) uint8 array
+
+        Returns:
+            Tuple of (sequence number, LED count copied)
+        """
+        with self.condition:
+            sequence = self.sequence
+            slot = sequence % self.slot_count
+            count = self.counts[slot]
+            out[:count] = self.buffers[slot, :count]
+        return sequence, count
+
+
+class OutputWorker:
+    """
+    OutputWorker drives a single output from its own thread at its own rate.
+    A slow or blocking output only delays itself; intermediate frames are dropped
+    so the output always sends the latest frame available.
+    """
+
+    def __init__(self, name: str, ring: FrameRing, send: Callable[[np.ndarray], None], fps: Optional[float] = None):
+        """
+        Initialize the worker.
+
+        Args:
+            name: Name of the output (used in statistics)
+            ring: FrameRing to read frames from
+            send: Callable that receives an (n, 3) uint8 frame
+            fps: Maximum send rate (None sends every frame it can keep up with)
+        """
+        self.name = name
+        self.log_key = "output." + name
+        self.ring = ring
+        self.send = send
+        self.interval = 1.0 / fps if fps else 0.0
+        self.buffer = np.zeros((ring.capacity, 3), dtype=np.uint8)
+
+        self.last_sequence = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.errors = 0
+        self.lag = 0
+        self.last_send_time = 0.0
+
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """
+        Start the output thread.
+        """
+        self.running = True
+        self.last_sequence = self.ring.sequence
+        self.thread = threading.Thread(target=self._run, name=f"output-{self.name}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """
+        Stop the output thread.
+
+        Args:
+            timeout: Maximum time to wait for the thread to exit
+        """
+        self.running = False
+        with self.ring.condition:
+            self.ring.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _run(self):
+        next_send = time.perf_counter()
+        while self.running:
+            if self.ring.wait_for_frame(self.last_sequence, 0.1) <= self.last_sequence:
+                continue
+
+            if self.interval:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_send = max(next_send + self.interval, time.perf_counter())
+
+            sequence, count = self.ring.read_latest(self.buffer)
+            if self.last_sequence:
+                self.frames_dropped += max(0, sequence - self.last_sequence - 1)
+            self.last_sequence = sequence
+
+            start = time.perf_counter()
+            try:
+                self.send(self.buffer[:count])
+                self.frames_sent += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(self.log_key, "Error in output %s: %s", self.name, e)
+            self.last_send_time = time.perf_counter() - start
+            self.lag = self.ring.sequence - sequence
+
+    def get_stats(self) -> Dict:
+        """
+        Get the output's counters.
+
+        Returns:
+            Dictionary with sent, dropped, error, lag and send time values
+        """
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "errors": self.errors,
+            "lag": self.lag,
+            "last_send_time": self.last_send_time
+        }
+
+
+class OutputPipeline:
+    """
+    OutputPipeline decouples rendering from output drivers.
+    The render thread pushes frames into a FrameRing and each registered output
+    consumes them on its own OutputWorker thread.
+    """
+
+    def __init__(self, led_count: int, slot_count: int = 4):
+        """
+        Initialize the pipeline.
+
+        Args:
+            led_count: Maximum number of LEDs per frame
+            slot_count: Number of frame buffers in the ring
+        """
+        self.ring = FrameRing(led_count, slot_count)
+        self.outputs: Dict[str, OutputWorker] = {}
+        self.running = False
+
+    def add_output(self, name: str, send: Callable[[np.ndarray], None], fps: Optional[float] = None) -> OutputWorker:
+        """
+        Register an output driver.
+
+        Args:
+            name: Unique name of the output
+            send: Callable that receives an (n, 3) uint8 frame
+            fps: Maximum send rate for this output
+
+        Returns:
+            The OutputWorker driving the output
+        """
+        worker = OutputWorker(name, self.ring, send, fps)
+        self.outputs[name] = worker
+        if self.running:
+            worker.start()
+        return worker
+
+    def remove_output(self, name: str, timeout: float = 1.0):
+        """
+        Stop and remove an output driver.
+
+        Args:
+            name: Name of the output to remove
+            timeout: Maximum time to wait for its thread to exit (0 returns immediately)
+        """
+        worker = self.outputs.pop(name, None)
+        if worker:
+            worker.stop(timeout)
+
+    def push(self, frame: Frame) -> int:
+        """
+        Hand a rendered frame to all outputs without waiting for them.
+
+        Args:
+            frame: Rendered frame as returned by render() or get_led_output()
+
+        Returns:
+            Sequence number of the pushed frame
+        """
+        return self.ring.push(frame)
+
+    def start(self):
+        """
+        Start all output threads.
+        """
+        self.running = True
+        for worker in self.outputs.values():
+            worker.start()
+
+    def stop(self):
+        """
+        Stop all output threads.
+        """
+        self.running = False
+        for worker in self.outputs.values():
+            worker.stop()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        Get per-output counters.
+
+        Returns:
+            Dictionary mapping output name to its statistics
+        """
+        return {name: worker.get_stats() for name, worker in self.outputs.items()}
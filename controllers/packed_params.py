@@ -0,0 +1,125 @@
+from typing import Any, Callable, Dict, List, Tuple
+import functools
+import math
+import sys
+import numpy as np
+
+sys.path.append('..')
+from models.light_segment import LightSegment
+
+# One record of a packed parameter blob: little-endian segment ID, parameter ID and value
+PACKED_RECORD_DTYPE = np.dtype([("segment_id", "<u2"), ("param_id", "<u2"), ("value", "<f4")])
+
+# Parameter IDs used in packed blobs (index in this tuple) and names used by dense blobs
+PACKED_PARAMS = (
+    "current_position",
+    "move_speed",
+    "initial_position",
+    "transparency",
+    "color_0",
+    "color_1",
+    "color_2",
+    "color_3"
+)
+
+
+def decode_packed_records(blob: bytes) -> Tuple[Dict[str, Tuple[List[int], List[float]]], int]:
+    """
+    Decode a packed parameter blob. Records with a NaN or infinite value are skipped.
+
+    Args:
+        blob: Concatenated PACKED_RECORD_DTYPE records
+
+    Returns:
+        Dictionary mapping parameter name to (segment IDs, values), in record order, and
+        the number of records skipped
+
+    Raises:
+        ValueError: If the blob length is not a whole number of records
+    """
+    if len(blob) % PACKED_RECORD_DTYPE.itemsize:
+        raise ValueError(f"Packed blob length {len(blob)} is not a multiple of {PACKED_RECORD_DTYPE.itemsize}")
+
+    records = np.frombuffer(blob, dtype=PACKED_RECORD_DTYPE)
+    finite = np.isfinite(records["value"])
+    rejected = len(records) - int(finite.sum())
+    if rejected:
+        records = records[finite]
+    param_ids = records["param_id"]
+    updates = {}
+    present = np.flatnonzero(np.bincount(param_ids, minlength=len(PACKED_PARAMS))[:len(PACKED_PARAMS)])
+    for param_id in present.tolist():
+        mask = param_ids == param_id
+        updates[PACKED_PARAMS[param_id]] = (records["segment_id"][mask].tolist(), records["value"][mask].tolist())
+    return updates, rejected
+
+
+def decode_dense_values(blob: bytes) -> Tuple[List[int], List[float], int]:
+    """
+    Decode a dense parameter blob. NaN and infinite values are skipped; the segments at
+    their positions keep their current value.
+
+    Args:
+        blob: Little-endian float32 values, one per segment in ascending segment ID order
+
+    Returns:
+        Positions of the values kept, the values, and the number of values skipped
+
+    Raises:
+        ValueError: If the blob length is not a multiple of 4
+    """
+    if len(blob) % 4:
+        raise ValueError(f"Dense blob length {len(blob)} is not a multiple of 4")
+    values = np.frombuffer(blob, dtype="<f4")
+    finite = np.isfinite(values)
+    positions = np.flatnonzero(finite)
+    return positions.tolist(), values[positions].tolist(), len(values) - len(positions)
+
+
+def _finite(setter: Callable[[LightSegment, float], Any]) -> Callable[[LightSegment, float], Any]:
+    # Setters are shared by packed/dense blobs, ramps and Art-Net; none of them may store NaN or inf
+    @functools.wraps(setter)
+    def set_finite(segment: LightSegment, value: float):
+        if not math.isfinite(value):
+            return False
+        return setter(segment, value)
+    return set_finite
+
+
+def _set_current_position(segment: LightSegment, value: float):
+    # Runtime position, like update_position(); not part of the versioned state
+    segment.current_position = value
+
+
+def _set_move_speed(segment: LightSegment, value: float):
+    segment.update_param("move_speed", value)
+
+
+def _set_initial_position(segment: LightSegment, value: float):
+    segment.update_param("initial_position", int(value))
+
+
+def _set_transparency(segment: LightSegment, value: float):
+    segment.update_param("transparency", [value] * len(segment.transparency))
+
+
+def _color_setter(index: int) -> Callable[[LightSegment, float], Any]:
+    def set_color(segment: LightSegment, value: float):
+        if index >= len(segment.color):
+            return False
+        colors = list(segment.color)
+        colors[index] = int(value)
+        segment.update_param("color", colors)
+    return set_color
+
+
+PACKED_SETTERS: Dict[str, Callable[[LightSegment, float], Any]] = {
+    "current_position": _finite(_set_current_position),
+    "move_speed": _finite(_set_move_speed),
+    "initial_position": _finite(_set_initial_position),
+    "transparency": _finite(_set_transparency),
+    "color_0": _finite(_color_setter(0)),
+    "color_1": _finite(_color_setter(1)),
+    "color_2": _finite(_color_setter(2)),
+    "color_3": _finite(_color_setter(3))
+}
@@ -0,0 +1,277 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import math
+import sys
+import time
+import numpy as np
+
+sys.path.append('..')
+from controllers.packed_params import PACKED_SETTERS
+from models.light_effect import LightEffect
+from models.light_segment import LightSegment
+
+# Easing curves; the value is the curve's ID in the ramp table
+EASINGS = {
+    "linear": 0,
+    "ease-in": 1,
+    "ease-out": 2,
+    "ease-in-out": 3
+}
+
+
+def _set_move_speed(segment: LightSegment, value: float):
+    # Segments that reflect at the edges keep their direction of travel; the ramp sets the speed
+    if segment.is_edge_reflect and segment.move_speed < 0:
+        value = -value
+    segment.update_param("move_speed", value)
+
+
+# Parameters that can be ramped: (getter for the start value, setter)
+RAMP_PARAMS: Dict[str, Tuple[Callable[[LightSegment], float], Callable[[LightSegment, float], Any]]] = {
+    "move_speed": (lambda segment: segment.move_speed, _set_move_speed),
+    "transparency": (lambda segment: segment.transparency[0] if segment.transparency else 0.0, PACKED_SETTERS["transparency"]),
+    "current_position": (lambda segment: segment.current_position, PACKED_SETTERS["current_position"]),
+    "initial_position": (lambda segment: segment.initial_position, PACKED_SETTERS["initial_position"])
+}
+
+
+def parse_duration(value) -> float:
+    """
+    Parse a ramp duration.
+
+    Args:
+        value: Seconds as a number, or a string such as "2.5s", "250ms" or "2.5"
+
+    Returns:
+        Duration in seconds
+
+    Raises:
+        ValueError: If the duration cannot be parsed, is negative or is infinite
+    """
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text.endswith("ms"):
+            seconds = float(text[:-2]) / 1000.0
+        else:
+            seconds = float(text[:-1] if text.endswith("s") else text)
+    else:
+        seconds = float(value)
+    if not (math.isfinite(seconds) and seconds >= 0.0):
+        raise ValueError(f"Invalid ramp duration: {value}")
+    return seconds
+
+
+def ease(easing: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """
+    Apply easing curves to ramp progress values.
+
+    Args:
+        easing: Curve ID per ramp (see EASINGS)
+        t: Linear progress per ramp, 0.0~1.0
+
+    Returns:
+        Eased progress per ramp
+    """
+    return np.select(
+        (easing == 1, easing == 2, easing == 3),
+        (t * t, t * (2.0 - t), np.where(t < 0.5, 2.0 * t * t, 1.0 - 2.0 * (1.0 - t) ** 2)),
+        t
+    )
+
+
+class RampTable:
+    """
+    RampTable holds the active parameter ramps and advances all of them once per frame.
+
+    Start values, deltas, start times, durations and easing curves are kept in parallel
+    numpy arrays, so each frame evaluates every ramp in one vectorized pass and then writes
+    the values with one batch update per effect. Finished ramps are removed in the same
+    pass and end exactly on their target value.
+
+    A ramp replaces any ramp of the same segment and parameter. All methods are called on
+    the render thread (ramps are started through the ParameterUpdateQueue).
+    """
+
+    def __init__(self, capacity: int = 64):
+        """
+        Initialize the table.
+
+        Args:
+            capacity: Initial number of rows; the table grows as needed
+        """
+        self.count = 0
+        self.start_values = np.zeros(capacity)
+        self.deltas = np.zeros(capacity)
+        self.start_times = np.zeros(capacity)
+        self.durations = np.zeros(capacity)
+        self.easings = np.zeros(capacity, dtype=np.int8)
+        # (effect, segment, param) per row, and the row of each (segment, param)
+        self.targets: List[Tuple[LightEffect, LightSegment, str]] = []
+        self.rows: Dict[Tuple[LightSegment, str], int] = {}
+
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    @property
+    def active(self) -> int:
+        return self.count
+
+    def start(self, effect: LightEffect, segment: LightSegment, param: str, target: float,
+              duration: float, easing: str = "linear", now: Optional[float] = None):
+        """
+        Start ramping a segment parameter from its current value to a target value.
+
+        Args:
+            effect: Effect holding the segment
+            segment: Segment to ramp
+            param: Parameter name (see RAMP_PARAMS)
+            target: Value at the end of the ramp
+            duration: Ramp duration in seconds
+            easing: Easing curve name (see EASINGS)
+            now: Start time on the time.perf_counter() clock (defaults to now)
+
+        Raises:
+            ValueError: If the parameter or easing curve is not supported, or the start value,
+                        target or duration is not finite
+        """
+        if param not in RAMP_PARAMS:
+            raise ValueError(f"Parameter {param} cannot be ramped")
+        if easing not in EASINGS:
+            raise ValueError(f"Unknown easing {easing}")
+
+        start = float(RAMP_PARAMS[param][0](segment))
+        target = float(target)
+        duration = float(duration)
+        if not math.isfinite(start):
+            raise ValueError(f"Segment {segment.segment_ID} has no finite {param} to ramp from")
+        if not (math.isfinite(target) and math.isfinite(duration) and duration >= 0.0):
+            raise ValueError(f"Invalid ramp of {param} to {target} over {duration}s")
+        if param == "move_speed" and segment.is_edge_reflect:
+            start, target = abs(start), abs(target)
+
+        row = self.rows.get((segment, param))
+        if row is None:
+            if self.count == len(self.start_values):
+                self._grow()
+            row = self.count
+            self.count += 1
+            self.targets.append((effect, segment, param))
+            self.rows[(segment, param)] = row
+        else:
+            self.targets[row] = (effect, segment, param)
+
+        self.start_values[row] = start
+        self.deltas[row] = target - start
+        self.start_times[row] = time.perf_counter() if now is None else now
+        self.durations[row] = duration
+        self.easings[row] = EASINGS[easing]
+        self.started += 1
+
+    def cancel(self, segment: LightSegment, param: str) -> bool:
+        """
+        Stop a ramp, leaving the parameter at its current value.
+
+        Returns:
+            True if a ramp was active
+        """
+        row = self.rows.pop((segment, param), None)
+        if row is None:
+            return False
+        last = self.count - 1
+        if row != last:
+            for array in (self.start_values, self.deltas, self.start_times, self.durations, self.easings):
+                array[row] = array[last]
+            self.targets[row] = self.targets[last]
+            self.rows[self.targets[row][1:]] = row
+        self.targets.pop()
+        self.count = last
+        self.cancelled += 1
+        return True
+
+    def cancel_effects(self, effects) -> int:
+        """
+        Stop the ramps of the given effects (e.g. before their scene is replaced).
+
+        Args:
+            effects: Effects whose ramps are stopped
+
+        Returns:
+            Number of ramps stopped
+        """
+        effects = set(effects)
+        stopped = np.array([effect in effects for effect, _, _ in self.targets], dtype=bool)
+        removed = self._remove(stopped) if stopped.any() else 0
+        self.cancelled += removed
+        return removed
+
+    def step(self, now: Optional[float] = None) -> List[LightEffect]:
+        """
+        Advance all ramps and write their values. Called once per frame on the render thread.
+
+        Args:
+            now: Current time on the time.perf_counter() clock (defaults to now)
+
+        Returns:
+            Effects whose segments were updated
+        """
+        n = self.count
+        if not n:
+            return []
+        if now is None:
+            now = time.perf_counter()
+
+        durations = self.durations[:n]
+        elapsed = now - self.start_times[:n]
+        t = np.clip(np.divide(elapsed, durations, out=np.ones(n), where=durations > 0), 0.0, 1.0)
+        values = (self.start_values[:n] + self.deltas[:n] * ease(self.easings[:n], t)).tolist()
+
+        batches: Dict[LightEffect, Tuple[list, list]] = {}
+        for (effect, segment, param), value in zip(self.targets, values):
+            segment_ids, items = batches.setdefault(effect, ([], []))
+            segment_ids.append(segment.key)
+            items.append((RAMP_PARAMS[param][1], value))
+        for effect, (segment_ids, items) in batches.items():
+            effect.batch_update(segment_ids, items, _apply_ramp_value)
+
+        done = t >= 1.0
+        if done.any():
+            self.completed += self._remove(done)
+        return list(batches)
+
+    def _remove(self, rows: np.ndarray) -> int:
+        keep = ~rows
+        n = self.count
+        kept = int(keep.sum())
+        for array in (self.start_values, self.deltas, self.start_times, self.durations, self.easings):
+            array[:kept] = array[:n][keep]
+        self.targets = [target for target, keep_row in zip(self.targets, keep.tolist()) if keep_row]
+        self.rows = {(segment, param): row for row, (_, segment, param) in enumerate(self.targets)}
+        self.count = kept
+        return n - kept
+
+    def _grow(self):
+        size = len(self.start_values) * 2
+        for name in ("start_values", "deltas", "start_times", "durations", "easings"):
+            array = getattr(self, name)
+            grown = np.zeros(size, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get ramp counters.
+
+        Returns:
+            Dictionary with the number of active, started, completed and cancelled ramps
+        """
+        return {
+            "active": self.count,
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled
+        }
+
+
+def _apply_ramp_value(segment: LightSegment, item: Tuple[Callable, float]):
+    setter, value = item
+    return setter(segment, value)
@@ -0,0 +1,87 @@
+import os
+import stat
+import sys
+import numpy as np
+
+sys.path.append('..')
+from utils.frame_utils import Frame, frame_to_array
+from utils.log_utils import get_logger
+
+logger = get_logger("output")
+
+
+class RawRGBOutput:
+    """
+    RawRGBOutput writes each frame as raw packed RGB24 bytes to stdout or a named pipe.
+    Every frame is exactly led_count * 3 bytes, so the stream can be read directly by
+    tools such as ffmpeg (-f rawvideo -pix_fmt rgb24 -video_size {led_count}x1).
+    """
+
+    def __init__(self, path: str, led_count: int):
+        """
+        Open the output stream.
+
+        Args:
+            path: "-" for stdout, otherwise a path to a named pipe (created if missing) or file
+            led_count: Number of LEDs per written frame (shorter frames are padded with black)
+        """
+        self.path = path
+        self.led_count = led_count
+        self.buffer = np.zeros((led_count, 3), dtype=np.uint8)
+        self.frames_written = 0
+        self.closed = False
+
+        if path == "-":
+            # Keep the real stdout for frames and send everything else printed to stdout to stderr
+            fd = os.dup(sys.stdout.fileno())
+            sys.stdout.flush()
+            os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+        else:
+            if not os.path.exists(path):
+                os.mkfifo(path)
+            flags = os.O_WRONLY
+            if not stat.S_ISFIFO(os.stat(path).st_mode):
+                flags |= os.O_CREAT | os.O_TRUNC
+            # Opening a FIFO blocks until a reader attaches
+            fd = os.open(path, flags, 0o644)
+
+        self.stream = os.fdopen(fd, "wb", buffering=0)
+
+    def write_frame(self, frame: Frame):
+        """
+        Write one frame to the stream.
+
+        Args:
+            frame: Rendered frame as returned by render() or get_led_output()
+        """
+        if self.closed:
+            return
+
+        pixels = frame_to_array(frame)
+        if len(pixels) != self.led_count or not pixels.flags.c_contiguous:
+            count = min(len(pixels), self.led_count)
+            self.buffer[:count] = pixels[:count]
+            self.buffer[count:] = 0
+            pixels = self.buffer
+
+        try:
+            view = memoryview(pixels).cast("B")
+            while view:
+                written = self.stream.write(view)
+                view = view[written:]
+            self.frames_written += 1
+        except BrokenPipeError:
+            logger.warning("output.raw", "Raw output reader on %s disconnected", self.path)
+            self.close()
+
+    def close(self):
+        """
+        Close the output stream.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.stream.close()
+        except BrokenPipeError:
+            pass
@@ -0,0 +1,144 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional
+import json
+import os
+import stat
+import sys
+import tempfile
+import time
+
+sys.path.append('..')
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+# Process umask, read once at import (os.umask can only be read by setting it, which is not thread safe)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def iter_json(data: Any, depth: int) -> Iterator[str]:
+    """
+    Encode JSON in pieces. Dictionaries down to the given depth are written key by key
+    and everything below is encoded in one call, so the encoder never holds the
+    interpreter for long and the render thread keeps running while a large scene is saved.
+
+    Args:
+        data: JSON-serializable data
+        depth: Number of dictionary levels to split
+
+    Returns:
+        Iterator over the JSON text
+    """
+    if depth > 0 and isinstance(data, dict) and data:
+        separator = "{"
+        for key, value in data.items():
+            yield separator + json.dumps(str(key)) + ":"
+            separator = ","
+            yield from iter_json(value, depth - 1)
+        yield "}"
+    else:
+        yield json.dumps(data, separators=(",", ":"))
+
+
+def write_json_atomic(file_path: str, data: Any, depth: int = 4):
+    """
+    Write JSON to a temporary file next to file_path and rename it into place,
+    so readers never see a partially written file. The file keeps the permissions of
+    the file it replaces, or gets the usual permissions for a new file (0o666 less the
+    umask) instead of the private 0o600 of the temporary file.
+
+    Args:
+        file_path: Destination path
+        data: JSON-serializable data
+        depth: Dictionary levels encoded piece by piece (4 splits a scene per segment)
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.writelines(iter_json(data, depth))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(file_path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json(file_path: str) -> Any:
+    """
+    Read a JSON file.
+
+    Args:
+        file_path: Path to the JSON file
+
+    Returns:
+        Parsed data
+    """
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+
+class SceneFileWorker:
+    """
+    SceneFileWorker runs scene and palette file operations on a small thread pool so
+    that serializing, parsing and disk I/O never run on the OSC server or render threads.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        """
+        Initialize the worker pool.
+
+        Args:
+            max_workers: Number of worker threads
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scene-io")
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, operation: Callable[[], Any],
+               on_done: Callable[[Any, Optional[BaseException], float], None]) -> Future:
+        """
+        Run an operation on the pool.
+
+        Args:
+            operation: Function to run
+            on_done: Called on the worker thread as on_done(result, error, seconds) when the
+                     operation finishes; error is None on success
+
+        Returns:
+            Future of the operation
+        """
+        start = time.perf_counter()
+
+        def run():
+            try:
+                result = operation()
+                error = None
+                self.completed += 1
+            except Exception as e:
+                result = None
+                error = e
+                self.failed += 1
+            try:
+                on_done(result, error, time.perf_counter() - start)
+            except Exception as e:
+                logger.error("save_load", "Error completing file operation: %s", e)
+            return result
+
+        return self.executor.submit(run)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the pool, waiting for running operations to finish.
+        """
+        self.executor.shutdown(wait=wait)
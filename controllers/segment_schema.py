@@ -0,0 +1,289 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import json
+import logging
+import math
+import sys
+import threading
+
+sys.path.append('..')
+from models.light_segment import LightSegment
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+
+class SegmentField(NamedTuple):
+    """
+    Compiled entry of the segment schema: the attribute written, a function that validates
+    and coerces the received value (raising ValueError or TypeError), and the setter.
+    The OSC type tag and value range describe the field to controllers (see
+    controllers.namespace); a range maximum of None stands for the last LED of the effect.
+    coerce rejects values (or list items) outside the range; an open maximum is not checked.
+    """
+    name: str
+    coerce: Callable[[Any], Any]
+    setter: Callable[[LightSegment, Any], Any]
+    type_tag: str = "f"
+    value_range: Optional[Tuple[Any, Any]] = None
+
+
+def _number(value):
+    # Keeps ints as ints so that saved scenes look the same; rejects NaN and inf
+    kind = type(value)
+    if kind is int:
+        return value
+    if kind is not float:
+        if kind is bool:
+            raise TypeError(f"Expected a number, got {value!r}")
+        value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{value} is not a finite number")
+    return value
+
+
+def _integer(value) -> int:
+    if type(value) is int:
+        return value
+    return int(_number(value))
+
+
+def _flag(value) -> bool:
+    # Flags arrive as 0/1 from controllers
+    if isinstance(value, (list, dict, str)):
+        raise TypeError(f"Expected 0 or 1, got {value!r}")
+    return value == 1
+
+
+def _boolean(value) -> bool:
+    if isinstance(value, (list, dict, str)):
+        raise TypeError(f"Expected a boolean, got {value!r}")
+    return bool(value)
+
+
+_INT_TYPES = frozenset((int,))
+_NUMBER_TYPES = frozenset((int, float))
+
+
+def _list_of(item: Callable[[Any], Any], min_length: int = 1, length: Optional[int] = None) -> Callable[[Any], list]:
+    # Lists that already hold the right types are checked without a call per element
+    types = _INT_TYPES if item is _integer else _NUMBER_TYPES
+
+    def coerce(value) -> list:
+        if not isinstance(value, (list, tuple)):
+            raise TypeError(f"Expected a list, got {type(value).__name__}")
+        if length is not None and len(value) != length:
+            raise ValueError(f"Expected {length} values, got {len(value)}")
+        if len(value) < min_length:
+            raise ValueError(f"Expected at least {min_length} values, got {len(value)}")
+        if types.issuperset(map(type, value)) and (types is _INT_TYPES or all(map(math.isfinite, value))):
+            return list(value)
+        return list(map(item, value))
+    return coerce
+
+
+def _setter(name: str) -> Callable[[LightSegment, Any], Any]:
+    def set_param(segment: LightSegment, value):
+        segment.update_param(name, value)
+    return set_param
+
+
+def _set_initial_position(segment: LightSegment, value: int):
+    segment.update_param("initial_position", value)
+    segment.update_param("current_position", float(value))
+
+
+def _set_span(segment: LightSegment, value: int):
+    segment.update_param("length", [value // 3] * 3)
+
+
+def _in_range(coerce: Callable[[Any], Any], value_range: Tuple[Any, Any]) -> Callable[[Any], Any]:
+    low, high = value_range
+
+    def check(value):
+        value = coerce(value)
+        if isinstance(value, list):
+            if not value:
+                return value
+            smallest, largest = min(value), max(value)
+        else:
+            smallest = largest = value
+        if smallest < low:
+            raise ValueError(f"{smallest} is below {low}")
+        if high is not None and largest > high:
+            raise ValueError(f"{largest} is above {high}")
+        return value
+    return check
+
+
+def _field(name: str, coerce: Callable[[Any], Any], setter: Callable[[LightSegment, Any], Any] = None,
+           type_tag: str = "f", value_range: Optional[Tuple[Any, Any]] = None) -> SegmentField:
+    if value_range is not None:
+        coerce = _in_range(coerce, value_range)
+    return SegmentField(name, coerce, setter or _setter(name), type_tag, value_range)
+
+
+COLOR_INDEX_RANGE = (0, 5)
+FLAG_RANGE = (0, 1)
+LED_RANGE = (0, None)
+
+_COLORS = _field("color", _list_of(_integer), type_tag="[iiii]", value_range=COLOR_INDEX_RANGE)
+_MOVE_SPEED = _field("move_speed", _number)
+_RANGE = _list_of(_number, length=2)
+
+# Schema of the segment parameters accepted over OSC, keyed by (address parameter, payload
+# key). Dictionary payloads (e.g. /segment/1/position {"speed": 10}) use one entry per key;
+# plain values use the entry with key None. Legacy sub-parameter addresses such as
+# /effect/1/object/2/position/speed are looked up as ("position", "speed").
+SEGMENT_SCHEMA: Dict[Tuple[str, Optional[str]], SegmentField] = {
+    ("color", None): _COLORS,
+    ("color", "colors"): _COLORS,
+    ("color", "speed"): _MOVE_SPEED,
+    ("color", "gradient"): _field("gradient", _flag, type_tag="i", value_range=FLAG_RANGE),
+
+    ("position", "initial_position"): _field("initial_position", _integer, _set_initial_position, "i", LED_RANGE),
+    ("position", "speed"): _MOVE_SPEED,
+    ("position", "range"): _field("move_range", _RANGE, type_tag="[ff]", value_range=LED_RANGE),
+    ("position", "interval"): _field("position_interval", _number),
+
+    ("span", "span"): _field("length", _integer, _set_span, "i", LED_RANGE),
+    ("span", "range"): _field("span_range", _RANGE, type_tag="[ff]", value_range=LED_RANGE),
+    ("span", "speed"): _field("span_speed", _number),
+    ("span", "interval"): _field("span_interval", _number),
+    ("span", "gradient_colors"): _field("gradient_colors", _list_of(_integer), type_tag="[iii]", value_range=(-1, 5)),
+    ("span", "fade"): _field("fade", _flag, type_tag="i", value_range=FLAG_RANGE),
+
+    ("transparency", None): _field("transparency", _list_of(_number), type_tag="[ffff]", value_range=(0.0, 1.0)),
+    ("dimmer_time", None): _field("dimmer_time", _list_of(_number, min_length=5), type_tag="[iiiii]"),
+    ("is_edge_reflect", None): _field("is_edge_reflect", _boolean, type_tag="i", value_range=FLAG_RANGE),
+
+    ("move_speed", None): _MOVE_SPEED,
+    ("move_range", None): _field("move_range", _RANGE, type_tag="[ff]", value_range=LED_RANGE),
+    ("initial_position", None): _field("initial_position", _integer, type_tag="i", value_range=LED_RANGE),
+    ("current_position", None): _field("current_position", _number, value_range=LED_RANGE),
+    ("length", None): _field("length", _list_of(_integer, length=3), type_tag="[iii]"),
+    ("gradient", None): _field("gradient", _boolean, type_tag="i", value_range=FLAG_RANGE),
+    ("gradient_colors", None): _field("gradient_colors", _list_of(_integer), type_tag="[iii]", value_range=(-1, 5)),
+    ("fade", None): _field("fade", _boolean, type_tag="i", value_range=FLAG_RANGE)
+}
+
+# Compiled updates: (field, coerced value) pairs, applied in order
+SegmentUpdate = List[Tuple[SegmentField, Any]]
+
+
+class SegmentSchema:
+    """
+    SegmentSchema validates and coerces segment parameter payloads on the receiving thread,
+    so malformed values are rejected before they are queued instead of failing inside the
+    model. Each key costs one lookup in the compiled schema and one coercion; applying the
+    result calls the field's setter directly. Rejected keys are counted per parameter.
+    """
+
+    def __init__(self, schema: Dict[Tuple[str, Optional[str]], SegmentField] = None):
+        """
+        Initialize the schema.
+
+        Args:
+            schema: Mapping of (parameter, key) to SegmentField (defaults to SEGMENT_SCHEMA)
+        """
+        self.schema = schema if schema is not None else SEGMENT_SCHEMA
+        # Plain values are looked up by parameter name alone
+        self.plain = {param: field for (param, key), field in self.schema.items() if key is None}
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.rejected_by_param: Dict[str, int] = {}
+
+    def compile(self, param: str, value, errors: Optional[List[str]] = None) -> Optional[SegmentUpdate]:
+        """
+        Validate a payload for a segment parameter.
+
+        Args:
+            param: Parameter from the OSC address (e.g. "position" or legacy "position/speed")
+            value: Received value, or a dictionary of sub-parameters (also as a JSON string,
+                   which is how the init dump sends them)
+            errors: List collecting a message for each rejected key (optional)
+
+        Returns:
+            The update to apply, or None if nothing in the payload was valid
+            (keys that fail are skipped and counted)
+        """
+        if type(value) is str and value.startswith("{"):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if type(value) is not dict and "/" not in param:
+            # Plain value: a single lookup and coercion
+            field = self.plain.get(param)
+            if field is None:
+                self._reject(param, None, value, "unknown parameter", errors)
+                return None
+            try:
+                update = [(field, field.coerce(value))]
+            except (TypeError, ValueError) as e:
+                self._reject(param, None, value, e, errors)
+                return None
+            self.accepted += 1
+            return update
+
+        if isinstance(value, dict):
+            items = value.items()
+        else:
+            param, key = param.split("/", 1)
+            items = ((key, value),)
+
+        update = []
+        schema = self.schema
+        for key, item in items:
+            field = schema.get((param, key))
+            if field is None:
+                self._reject(param, key, item, "unknown parameter", errors)
+                continue
+            try:
+                update.append((field, field.coerce(item)))
+            except (TypeError, ValueError) as e:
+                self._reject(param, key, item, e, errors)
+
+        if not update:
+            return None
+        self.accepted += 1
+        return update
+
+    def _reject(self, param: str, key: Optional[str], value, reason, errors: Optional[List[str]] = None):
+        name = param if key is None else f"{param}.{key}"
+        if errors is not None:
+            errors.append(f"{name}: {reason}")
+        with self.lock:
+            self.rejected += 1
+            self.rejected_by_param[name] = self.rejected_by_param.get(name, 0) + 1
+        logger.warning("schema." + name, "Rejected %s = %.80r: %s", name, value, reason)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get validation counters.
+
+        Returns:
+            Dictionary with accepted payloads, rejected keys and rejected keys per parameter
+        """
+        with self.lock:
+            return {
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "rejected_by_param": dict(self.rejected_by_param)
+            }
+
+
+def apply_segment_update(segment: LightSegment, update: SegmentUpdate) -> bool:
+    """
+    Apply a compiled update to a segment.
+
+    Returns:
+        True (the segment was updated)
+    """
+    # Checked once, so the per-field log keys are not built when debug logging is off
+    debug = logger.isEnabledFor(logging.DEBUG)
+    for field, value in update:
+        field.setter(segment, value)
+        if debug:
+            logger.debug("update." + field.name, "Updated %s: %s", field.name, value)
+    return True
@@ -0,0 +1,440 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+import itertools
+import json
+import queue
+import sys
+import threading
+import time
+from pythonosc import osc_bundle, osc_bundle_builder, osc_message, osc_message_builder
+
+sys.path.append('..')
+from models.light_scene import LightScene
+from models.light_segment import LightSegment
+from models.change_log import current_version
+from controllers.osc_clients import OSCClient
+from controllers.update_queue import ParameterUpdateQueue
+from utils.log_utils import get_logger
+from config import DEFAULT_FPS
+
+logger = get_logger("osc")
+
+# Largest UDP payload that fits a 1500 byte Ethernet MTU without IP fragmentation
+MAX_DATAGRAM_SIZE = 1472
+
+_BUNDLE_HEADER_SIZE = 16
+
+
+class SegmentState(NamedTuple):
+    """
+    Copy of the segment attributes a state dump reports, taken at a frame boundary.
+    """
+    color: list
+    move_speed: float
+    gradient: bool
+    initial_position: float
+    position_interval: Any
+    move_range: list
+    length: list
+    span_range: list
+    span_speed: Any
+    span_interval: Any
+    gradient_colors: list
+    fade: bool
+    transparency: list
+    is_edge_reflect: bool
+    dimmer_time: list
+
+    @classmethod
+    def of(cls, segment: LightSegment) -> "SegmentState":
+        """
+        Copy a segment's attributes. Lists are copied, since they may be changed in place.
+        """
+        # Positional: called for every segment at a frame boundary
+        return cls(
+            list(segment.color),
+            segment.move_speed,
+            bool(getattr(segment, 'gradient', False)),
+            segment.initial_position,
+            getattr(segment, 'position_interval', 10),
+            list(segment.move_range),
+            list(segment.length),
+            list(getattr(segment, 'span_range', segment.move_range)),
+            getattr(segment, 'span_speed', segment.move_speed),
+            getattr(segment, 'span_interval', 10),
+            list(getattr(segment, 'gradient_colors', [0, -1, -1])),
+            bool(getattr(segment, 'fade', False)),
+            list(segment.transparency),
+            segment.is_edge_reflect,
+            list(segment.dimmer_time)
+        )
+
+
+# A snapshot is a list of ("palette", palette_id, colors) and
+# ("segment", scene_id, effect_id, segment_id, SegmentState) entries, in send order
+Snapshot = List[tuple]
+
+
+def snapshot_state(light_scenes: Dict[int, LightScene]) -> Snapshot:
+    """
+    Copy the state of all scenes that a state dump reports. Only copies attribute values,
+    so it is cheap enough to run at a frame boundary; the messages are built from the
+    snapshot later with build_snapshot_messages().
+
+    Args:
+        light_scenes: Dictionary mapping scene_ID to LightScene instances
+
+    Returns:
+        Snapshot of every palette and segment
+    """
+    snapshot = []
+    for scene_id, scene in light_scenes.items():
+        add_scene_snapshot(snapshot, scene_id, scene)
+    return snapshot
+
+
+def snapshot_changes(light_scenes: Dict[int, LightScene], since_version: int) -> Tuple[Snapshot, bool]:
+    """
+    Copy the state of everything that changed after a state version.
+    Scenes whose change log does not reach back far enough, or whose effects or
+    segments were added or removed, are copied in full.
+
+    Args:
+        light_scenes: Dictionary mapping scene_ID to LightScene instances
+        since_version: Version the client is up to date with
+
+    Returns:
+        Tuple of (snapshot, incremental); incremental is False if every scene was copied in full
+    """
+    snapshot = []
+    incremental = False
+    for scene_id, scene in light_scenes.items():
+        changes = scene.changes_since(since_version)
+        # Removed effects, segments and palettes can only be conveyed by sending the scene in full
+        if changes is None or any(param in ("effects", "segments", "removed") for _, param in changes):
+            add_scene_snapshot(snapshot, scene_id, scene)
+            continue
+
+        incremental = True
+        for path, _ in changes:
+            if path[0] == "segment":
+                effect = scene.effects.get(path[1])
+                segment = effect.segments.get(path[2]) if effect is not None else None
+                if segment is not None:
+                    snapshot.append(("segment", scene_id, path[1], path[2], SegmentState.of(segment)))
+            elif path[0] == "palette" and path[1] in scene.palettes:
+                snapshot.append(("palette", path[1], [list(color) for color in scene.palettes[path[1]]]))
+    return snapshot, incremental
+
+
+def add_scene_snapshot(snapshot: Snapshot, scene_id: int, scene: LightScene):
+    """
+    Add a scene's palettes and segments to a snapshot.
+    """
+    for palette_id, colors in scene.palettes.items():
+        snapshot.append(("palette", palette_id, [list(color) for color in colors]))
+
+    for effect_id, effect in scene.effects.items():
+        for segment_id, segment in effect.segments.items():
+            snapshot.append(("segment", scene_id, effect_id, segment_id, SegmentState.of(segment)))
+
+
+def build_snapshot_messages(snapshot: Snapshot) -> Dict[str, list]:
+    """
+    Build the OSC messages for a snapshot. Dictionary payloads are encoded as JSON strings.
+
+    Args:
+        snapshot: Snapshot from snapshot_state() or snapshot_changes()
+
+    Returns:
+        Dictionary mapping OSC address to message arguments, in send order
+    """
+    messages = {}
+    for entry in snapshot:
+        if entry[0] == "palette":
+            add_palette_message(messages, entry[1], entry[2])
+        else:
+            add_segment_messages(messages, *entry[1:])
+    return messages
+
+
+def build_state_messages(light_scenes: Dict[int, LightScene]) -> Dict[str, list]:
+    """
+    Build the OSC messages describing the current state of all scenes.
+
+    Args:
+        light_scenes: Dictionary mapping scene_ID to LightScene instances
+
+    Returns:
+        Dictionary mapping OSC address to message arguments, in send order
+    """
+    return build_snapshot_messages(snapshot_state(light_scenes))
+
+
+def build_change_messages(light_scenes: Dict[int, LightScene], since_version: int) -> Tuple[Dict[str, list], bool]:
+    """
+    Build the OSC messages for everything that changed after a state version
+    (see snapshot_changes()).
+
+    Args:
+        light_scenes: Dictionary mapping scene_ID to LightScene instances
+        since_version: Version the client is up to date with
+
+    Returns:
+        Tuple of (messages, incremental); incremental is False if every scene was sent in full
+    """
+    snapshot, incremental = snapshot_changes(light_scenes, since_version)
+    return build_snapshot_messages(snapshot), incremental
+
+
+def add_palette_message(messages: Dict[str, list], palette_id: str, colors: List[List[int]]):
+    """
+    Add the message for a palette.
+    """
+    flat_colors = []
+    for color in colors:
+        flat_colors.extend(color)
+    messages[f"/palette/{palette_id}"] = flat_colors
+
+
+def add_segment_messages(messages: Dict[str, list], scene_id: int, effect_id: int, segment_id: int, segment: SegmentState):
+    """
+    Add the messages for a segment.
+    """
+    color = json.dumps({
+        "colors": segment.color,
+        "speed": segment.move_speed,
+        "gradient": 1 if segment.gradient else 0
+    })
+    prefix = f"/scene/{scene_id}/effect/{effect_id}/segment/{segment_id}"
+    messages[f"{prefix}/color"] = [color]
+    messages[f"{prefix}/position"] = [json.dumps({
+        "initial_position": segment.initial_position,
+        "speed": segment.move_speed,
+        "range": segment.move_range,
+        "interval": segment.position_interval
+    })]
+    messages[f"{prefix}/span"] = [json.dumps({
+        "span": sum(segment.length),
+        "range": segment.span_range,
+        "speed": segment.span_speed,
+        "interval": segment.span_interval,
+        "gradient_colors": segment.gradient_colors,
+        "fade": 1 if segment.fade else 0
+    })]
+    messages[f"{prefix}/transparency"] = list(segment.transparency)
+    messages[f"{prefix}/is_edge_reflect"] = [1 if segment.is_edge_reflect else 0]
+    messages[f"{prefix}/dimmer_time"] = list(segment.dimmer_time)
+
+    messages[f"/effect/{effect_id}/segment/{segment_id}/color"] = [color]
+    messages[f"/effect/{effect_id}/object/{segment_id}/color"] = [color]
+    messages[f"/effect/{effect_id}/object/{segment_id}/position/initial_position"] = [segment.initial_position]
+    messages[f"/effect/{effect_id}/object/{segment_id}/position/speed"] = [segment.move_speed]
+    messages[f"/effect/{effect_id}/object/{segment_id}/position/range"] = list(segment.move_range)
+
+
+def pack_bundles(messages: List[Tuple[str, list]],
+                 max_size: int = MAX_DATAGRAM_SIZE) -> List[Union[osc_bundle.OscBundle, osc_message.OscMessage]]:
+    """
+    Pack messages into as few OSC bundles as possible, each no larger than max_size bytes.
+    A message too large to fit in a bundle on its own is sent as a plain message.
+
+    Args:
+        messages: List of (address, arguments)
+        max_size: Maximum datagram size in bytes
+
+    Returns:
+        List of bundles and messages, one per datagram
+    """
+    datagrams = []
+    builder = None
+    size = 0
+    for address, args in messages:
+        message_builder = osc_message_builder.OscMessageBuilder(address)
+        for arg in args:
+            message_builder.add_arg(arg)
+        message = message_builder.build()
+        element_size = 4 + message.size
+
+        if _BUNDLE_HEADER_SIZE + element_size > max_size:
+            datagrams.append(message)
+            continue
+
+        if builder is not None and size + element_size > max_size:
+            datagrams.append(builder.build())
+            builder = None
+        if builder is None:
+            builder = osc_bundle_builder.OscBundleBuilder(osc_bundle_builder.IMMEDIATELY)
+            size = _BUNDLE_HEADER_SIZE
+        builder.add_content(message)
+        size += element_size
+
+    if builder is not None:
+        datagrams.append(builder.build())
+    return datagrams
+
+
+class StateDumpSender:
+    """
+    StateDumpSender answers /request/init on a worker thread.
+
+    The scenes are copied at a frame boundary (through the update queue, on the render
+    thread), so a dump never mixes two frames. The copy holds only attribute values; the
+    worker builds the messages from it and packs them into MTU-sized OSC bundles, which
+    are sent a few per frame interval, so a large scene neither stalls the OSC server and render threads nor
+    overflows the receiver's socket buffer. Datagrams over the client's rate limit are
+    retried over the next frames; datagrams that still cannot be sent are counted. Every dump
+    ends with /init/version N.
+    A client that sends that version back in its next request receives only the
+    segments and palettes that changed since then, looked up in the scenes' change logs.
+    """
+
+    def __init__(self, client: OSCClient, fps: int = DEFAULT_FPS, bundles_per_frame: int = 8,
+                 max_datagram_size: int = MAX_DATAGRAM_SIZE, update_queue: Optional[ParameterUpdateQueue] = None,
+                 max_retries: int = 3):
+        """
+        Initialize the sender.
+
+        Args:
+            client: Client dumps are sent to when a request names no client
+            fps: Frame rate the sending is paced to
+            bundles_per_frame: Number of datagrams sent per frame interval
+            max_datagram_size: Maximum datagram size in bytes
+            update_queue: Queue the scenes are copied on (None copies them on the requesting thread)
+            max_retries: Frame intervals a rate limited datagram is retried for
+        """
+        self.client = client
+        self.update_queue = update_queue
+        self.sequence = itertools.count()
+        self.frame_interval = 1.0 / fps
+        self.bundles_per_frame = bundles_per_frame
+        self.max_datagram_size = max_datagram_size
+        self.max_retries = max_retries
+
+        self.requests = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+        self.version = 0
+
+        self.dumps = 0
+        self.incremental_dumps = 0
+        self.messages_sent = 0
+        self.datagrams_sent = 0
+        self.datagrams_failed = 0
+
+    def request(self, light_scenes: Dict[int, LightScene], since_version: Optional[int] = None,
+                client: Optional[OSCClient] = None):
+        """
+        Queue a state dump. Returns immediately.
+
+        Args:
+            light_scenes: Dictionary mapping scene_ID to LightScene instances
+            since_version: Version the client already has, or None for a full dump
+            client: Client the dump is sent to (default: the sender's default client)
+        """
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="osc-init-dump")
+            self.thread.daemon = True
+            self.thread.start()
+        client = client or self.client
+        if self.update_queue is not None:
+            # Not coalesced: every request is answered
+            self.update_queue.submit(("init", next(self.sequence)), self._snapshot, light_scenes, since_version, client)
+        else:
+            self._snapshot(light_scenes, since_version, client)
+
+    def stop(self, timeout: float = 1.0):
+        """
+        Stop the worker thread. Dumps still queued are discarded.
+        """
+        if self.thread is None:
+            return
+        self.running = False
+        self.requests.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def _run(self):
+        while self.running:
+            job = self.requests.get()
+            if job is None:
+                break
+            try:
+                self._dump(*job)
+            except Exception as e:
+                logger.error("init", "Error sending initialization data: %s", e)
+
+    def _snapshot(self, light_scenes: Dict[int, LightScene], since_version: Optional[int], client: OSCClient):
+        # Runs on the render thread and only copies values; the worker builds, packs and sends the messages
+        version = current_version()
+        if since_version is not None:
+            snapshot, incremental = snapshot_changes(light_scenes, since_version)
+        else:
+            snapshot, incremental = snapshot_state(light_scenes), False
+        self.requests.put((snapshot, incremental, version, client))
+
+    def _dump(self, snapshot: Snapshot, incremental: bool, version: int, client: OSCClient):
+        if incremental:
+            self.incremental_dumps += 1
+        self.version = version
+
+        changed = list(build_snapshot_messages(snapshot).items())
+        changed.append(("/init/version", [version]))
+
+        datagrams = pack_bundles(changed, self.max_datagram_size)
+        next_send = time.perf_counter()
+        sent = failed = 0
+        for start in range(0, len(datagrams), self.bundles_per_frame):
+            if not self.running:
+                return
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_send += self.frame_interval
+            for datagram in datagrams[start:start + self.bundles_per_frame]:
+                if self._send(client, datagram):
+                    sent += 1
+                else:
+                    failed += 1
+
+        self.dumps += 1
+        self.messages_sent += len(changed)
+        self.datagrams_sent += sent
+        self.datagrams_failed += failed
+        kind = "changes" if incremental else "messages"
+        if failed:
+            logger.warning("init", "Initialization data to %s:%s incomplete: %d of %d datagrams not sent (version %d)",
+                           client.reply_address[0], client.reply_address[1], failed, len(datagrams), version)
+        else:
+            logger.info("init", "Sent initialization data: %d %s in %d datagrams (version %d)",
+                        len(changed) - 1, kind, len(datagrams), version)
+
+    def _send(self, client: OSCClient, datagram) -> bool:
+        # Rate limited sends succeed once the client's token bucket refills; socket errors are not retried
+        for _ in range(self.max_retries):
+            dropped = client.dropped
+            if client.send(datagram):
+                return True
+            if client.dropped == dropped or not self.running:
+                return False
+            time.sleep(self.frame_interval)
+        return client.send(datagram)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the sender counters.
+
+        Returns:
+            Dictionary with dump, message, sent and failed datagram counts and the version of
+            the last dump
+        """
+        return {
+            "dumps": self.dumps,
+            "incremental_dumps": self.incremental_dumps,
+            "messages_sent": self.messages_sent,
+            "datagrams_sent": self.datagrams_sent,
+            "datagrams_failed": self.datagrams_failed,
+            "version": self.version,
+            "pending": self.requests.qsize()
+        }
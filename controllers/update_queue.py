@@ -0,0 +1,109 @@
+from typing import Any, Callable, Dict, Hashable, Tuple
+import sys
+import threading
+
+sys.path.append('..')
+from utils.log_utils import get_logger
+
+logger = get_logger("osc")
+
+
+class ParameterUpdateQueue:
+    """
+    ParameterUpdateQueue collects parameter writes from OSC server threads and applies
+    them on the render thread at a frame boundary.
+
+    Writes are coalesced last-write-wins per key (a target and parameter), so a fader
+    sweep that sends hundreds of messages per frame results in a single mutation.
+    Until the queue is attached to a frame loop it runs in immediate mode and applies
+    every write as soon as it is submitted.
+    """
+
+    def __init__(self, immediate: bool = True):
+        """
+        Initialize the queue.
+
+        Args:
+            immediate: Apply writes as they are submitted instead of once per frame
+        """
+        self.immediate = immediate
+        self.lock = threading.Lock()
+        self.pending: Dict[Hashable, Tuple[Callable, tuple]] = {}
+
+        self.received = 0
+        self.applied = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.batches = 0
+        self.last_batch_size = 0
+
+    def submit(self, key: Hashable, apply: Callable[..., Any], *args):
+        """
+        Queue a write, replacing any pending write with the same key.
+
+        Args:
+            key: Identifies the target and parameter being written
+            apply: Function that performs the write
+            *args: Arguments for apply
+        """
+        if self.immediate:
+            with self.lock:
+                self.received += 1
+            self._apply(apply, args)
+            return
+
+        with self.lock:
+            self.received += 1
+            if self.pending.pop(key, None) is not None:
+                self.coalesced += 1
+            self.pending[key] = (apply, args)
+
+    def apply_pending(self, frame_index: int = None) -> int:
+        """
+        Apply all pending writes in arrival order. Called by the render thread before update().
+
+        Args:
+            frame_index: Index of the frame being started (unused, allows use as a frame hook)
+
+        Returns:
+            Number of writes applied
+        """
+        with self.lock:
+            if not self.pending:
+                return 0
+            batch = self.pending
+            self.pending = {}
+
+        for apply, args in batch.values():
+            self._apply(apply, args)
+
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        return len(batch)
+
+    def _apply(self, apply: Callable, args: tuple):
+        try:
+            apply(*args)
+            self.applied += 1
+        except Exception as e:
+            self.errors += 1
+            logger.error("apply", "Error applying update: %s", e)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get the queue counters.
+
+        Returns:
+            Dictionary with received, applied, coalesced, error and batch counts
+        """
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            "received": self.received,
+            "applied": self.applied,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "pending": pending,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size
+        }
@@ -1,13 +1,16 @@
 import sys
-import time
 import os
 import argparse
 import logging
+import numpy as np
 from typing import Dict, List, Any
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
+# pygame prints a banner to stdout on import, which would corrupt --raw-output -
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -28,6 +31,13 @@ from models.light_segment import LightSegment
 from models.light_effect import LightEffect
 from models.light_scene import LightScene
 from controllers.osc_handler import OSCHandler
+from controllers.frame_publisher import SharedMemoryFramePublisher
+from controllers.output_pipeline import OutputPipeline
+from controllers.frame_recorder import FrameRecorder, FrameReplayer
+from controllers.frame_scheduler import FrameScheduler
+from controllers.raw_output import RawRGBOutput
+from controllers.clock_source import ClockSource, OSCClock
+from controllers.artnet_input import ARTNET_PORT, load_mappings
 from ui.led_simulator import LEDSimulator
 
 def create_default_segments(effect: LightEffect, count: int = 3):
@@ -61,15 +71,40 @@ def parse_arguments():
     parser.add_argument('--led-count', type=int, default=DEFAULT_LED_COUNT, help=f'Number of LEDs (default: {DEFAULT_LED_COUNT})')
     parser.add_argument('--osc-ip', type=str, default=DEFAULT_OSC_IP, help=f'OSC IP address (default: {DEFAULT_OSC_IP})')
     parser.add_argument('--osc-port', type=int, default=DEFAULT_OSC_PORT, help=f'OSC port (default: {DEFAULT_OSC_PORT})')
+    parser.add_argument('--osc-server', type=str, choices=['threading', 'asyncio'], default='threading',
+                        help='OSC server implementation (default: threading)')
+    parser.add_argument('--osc-backlog', type=int, default=4096,
+                        help='OSC ingress queue size; stale messages are shed under backlog, 0 disables the queue (default: 4096)')
+    parser.add_argument('--namespace-port', type=int, default=0,
+                        help='Serve the OSC namespace as JSON over HTTP on this port (default: 0, disabled)')
+    parser.add_argument('--clock', type=str, choices=['frame', 'internal', 'osc'], default='frame',
+                        help='Show time source: fixed frame steps, the local clock, or /clock messages (default: frame)')
+    parser.add_argument('--clock-latency', type=float, default=0.0,
+                        help='Seconds added to the external clock time to compensate for output delay (default: 0)')
+    parser.add_argument('--http-port', type=int, default=0,
+                        help='Serve the HTTP/JSON control API on this port (default: 0, disabled)')
+    parser.add_argument('--artnet-map', type=str, help='Receive Art-Net DMX and map channels to segments as described in this JSON file')
+    parser.add_argument('--artnet-port', type=int, default=ARTNET_PORT, help=f'Art-Net UDP port (default: {ARTNET_PORT})')
     parser.add_argument('--no-gui', action='store_true', help='Run without GUI')
     parser.add_argument('--simulator-only', action='store_true', help='Run only the simulator without OSC')
     parser.add_argument('--config-file', type=str, help='Load configuration from a JSON file')
     parser.add_argument('--scale-factor', type=float, default=1.2, help='Scale factor for UI elements (default: 1.2)')
     parser.add_argument('--japanese-font', type=str, help='Path to Japanese font file')
-    return parser.parse_args()
+    parser.add_argument('--shm-output', type=str, help='Publish frames to a shared memory ring with this name (headless mode)')
+    parser.add_argument('--record', type=str, help='Record output frames to a file (headless mode)')
+    parser.add_argument('--replay', type=str, help='Replay a recording to the outputs instead of running the engine (headless mode)')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='Replay speed multiplier (default: 1.0)')
+    parser.add_argument('--log-level', type=str, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO',
+                        help='Log level; DEBUG logs every parameter update, rate limited per parameter (default: INFO)')
+    parser.add_argument('--raw-output', type=str, help='Write raw RGB24 frames to a named pipe, or "-" for stdout')
+    args = parser.parse_args()
+    if not args.replay_speed > 0:
+        parser.error('--replay-speed must be greater than 0')
+    return args
 
 def main():
     args = parse_arguments()
+    logging.getLogger().setLevel(args.log_level)
     
     logger.info("Initializing Color Signal Generation System...")
     logger.info(f"FPS: {args.fps}, LED Count: {args.led_count}, OSC: {args.osc_ip}:{args.osc_port}")
@@ -104,7 +139,56 @@ def main():
     osc_handler = None
     if not args.simulator_only:
         osc_handler = OSCHandler(light_scenes, ip=args.osc_ip, port=args.osc_port)
-        osc_handler.start_server()
+        osc_handler.start_server(args.osc_server, args.osc_backlog)
+        if args.namespace_port:
+            osc_handler.start_namespace_server(args.namespace_port)
+        if args.http_port:
+            osc_handler.start_http_api(args.http_port)
+        if args.artnet_map:
+            osc_handler.start_artnet_input(load_mappings(args.artnet_map), args.artnet_port)
+    
+    output_pipeline = OutputPipeline(led_count=args.led_count)
+    
+    frame_publisher = None
+    if args.shm_output:
+        frame_publisher = SharedMemoryFramePublisher(args.shm_output, led_count=args.led_count)
+        output_pipeline.add_output("shm", frame_publisher.publish)
+        logger.info(f"Publishing frames to shared memory '{args.shm_output}'")
+    
+    frame_recorder = None
+    if args.record:
+        frame_recorder = FrameRecorder(args.record)
+        frame_recorder.start()
+        logger.info(f"Recording frames to {args.record}")
+    
+    raw_output = None
+    if args.raw_output:
+        logger.info(f"Writing raw RGB24 frames to {'stdout' if args.raw_output == '-' else args.raw_output}")
+        raw_output = RawRGBOutput(args.raw_output, led_count=args.led_count)
+        output_pipeline.add_output("raw", raw_output.write_frame)
+    
+    output_pipeline.start()
+    
+    frame_scheduler = FrameScheduler(fps=args.fps)
+    if output_pipeline.outputs:
+        frame_scheduler.add_frame_hook(output_pipeline.push)
+    if frame_recorder:
+        # Every rendered frame with its render time, rather than the latest frame in the pipeline
+        frame_scheduler.add_frame_hook(frame_recorder.record)
+    if osc_handler:
+        osc_handler.set_output_pipeline(output_pipeline, frame_scheduler)
+    if osc_handler and not args.replay:
+        osc_handler.set_frame_scheduler(frame_scheduler)
+    
+    if args.clock == 'internal':
+        frame_scheduler.set_clock(ClockSource())
+    elif args.clock == 'osc':
+        clock = OSCClock(latency=args.clock_latency)
+        frame_scheduler.set_clock(clock)
+        if osc_handler:
+            osc_handler.set_clock(clock)
+        else:
+            logger.warning("--clock osc needs the OSC server; the clock will run free")
     
     try:
         if not args.no_gui:
@@ -120,15 +204,33 @@ def main():
             if not args.simulator_only and osc_handler:
                 osc_handler.set_simulator(simulator)
             
+            simulator.frame_scheduler = frame_scheduler
             simulator.run()
+        elif args.replay:
+            replayer = FrameReplayer(args.replay)
+            logger.info(f"Replaying {replayer.frame_count} frames ({replayer.duration:.1f}s) from {args.replay}")
+            
+            def replay_frame(frame):
+                output_pipeline.push(frame)
+                if frame_recorder:
+                    frame_recorder.record(frame)
+            
+            try:
+                replayer.play(replay_frame, speed=args.replay_speed)
+            finally:
+                replayer.close()
         else:
             logger.info("Running in headless mode (no GUI)...")
             logger.info("Press Ctrl+C to exit")
             
-            while True:
+            def update_scenes():
                 for scene in light_scenes.values():
-                    scene.update()
-                time.sleep(1.0/args.fps)
+                    scene.update(frame_scheduler.frame_time)
+            
+            # Rendered into one preallocated array; the frame hooks copy what they keep.
+            # Looked up every frame so the output follows a scene replaced by /scene/N/load_effects
+            frame_buffer = np.zeros((args.led_count, 3), dtype=np.uint8)
+            frame_scheduler.run(update_scenes, lambda: light_scenes[1].render(frame_buffer))
                 
     except KeyboardInterrupt:
         logger.info("User interrupted. Shutting down...")
@@ -139,6 +241,13 @@ def main():
     finally:
         if not args.simulator_only and osc_handler:
             osc_handler.stop_server()
+        output_pipeline.stop()
+        if frame_publisher:
+            frame_publisher.close()
+        if frame_recorder:
+            frame_recorder.close()
+        if raw_output:
+            raw_output.close()
         logger.info("System shutdown complete.")
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+from collections import deque
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+import itertools
+import threading
+
+_versions = itertools.count(1)
+_current_version = 0
+
+
+def next_version() -> int:
+    """
+    Allocate the next state version. Versions increase monotonically across all scenes.
+
+    Returns:
+        New version number
+    """
+    global _current_version
+    # next() on itertools.count is atomic; _current_version may briefly lag behind a
+    # concurrently allocated version, which only makes readers resend a change
+    version = next(_versions)
+    if version > _current_version:
+        _current_version = version
+    return version
+
+
+def current_version() -> int:
+    """
+    Get the most recently allocated state version.
+
+    Returns:
+        Latest version number (0 if nothing has changed yet)
+    """
+    return _current_version
+
+
+class ChangeLog:
+    """
+    ChangeLog records which parts of a scene changed at which version.
+
+    Entries are (version, path, param), where path identifies the object inside the
+    scene by the keys it is stored under, e.g. ("segment", effect_ID, segment_ID),
+    ("effect", effect_ID), ("scene",) or ("palette", palette_id). The log keeps the most recent max_entries changes;
+    asking for changes older than that returns None so the caller can fall back to
+    reading the whole scene.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        """
+        Initialize an empty change log.
+
+        Args:
+            max_entries: Maximum number of changes kept
+        """
+        self.max_entries = max_entries
+        self.entries = deque(maxlen=max_entries)
+        self.lock = threading.Lock()
+        # Changes at or before this version are not in the log
+        self.floor = current_version()
+
+    def record(self, path: Tuple[Hashable, ...], param: str) -> int:
+        """
+        Record a change.
+
+        Args:
+            path: Object that changed, relative to the scene
+            param: Name of the changed parameter
+
+        Returns:
+            Version assigned to the change
+        """
+        with self.lock:
+            version = next_version()
+            entries = self.entries
+            if len(entries) == self.max_entries:
+                self.floor = entries[0][0]
+            entries.append((version, path, param))
+        return version
+
+    def record_many(self, changes: Iterable[Tuple[Tuple[Hashable, ...], str]]) -> int:
+        """
+        Record several changes made as one operation under a single version.
+
+        Args:
+            changes: (path, param) pairs
+
+        Returns:
+            Version assigned to the changes
+        """
+        with self.lock:
+            version = next_version()
+            entries = self.entries
+            for path, param in changes:
+                if len(entries) == self.max_entries:
+                    self.floor = entries[0][0]
+                entries.append((version, path, param))
+        return version
+
+    def changes_since(self, version: int) -> Optional[Dict[Tuple[tuple, str], int]]:
+        """
+        Get the changes made after a version, newest first, in O(changes).
+
+        Args:
+            version: Version the caller is up to date with
+
+        Returns:
+            Dictionary mapping (path, param) to the version of its latest change,
+            or None if the log no longer covers the requested version
+        """
+        with self.lock:
+            if version < self.floor or version > current_version():
+                return None
+            changes = {}
+            for entry_version, path, param in reversed(self.entries):
+                if entry_version <= version:
+                    break
+                changes.setdefault((path, param), entry_version)
+        return changes
@@ -1,10 +1,16 @@
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, Callable, Iterable
 import json
+import math
 import sys
+import numpy as np
 sys.path.append('..')
 from models.light_segment import LightSegment
+from models.change_log import next_version
 from utils.color_utils import blend_colors, apply_transparency, apply_brightness
 
+# Largest step in seconds a segment moves by when the show time comes from a clock source
+MAX_CLOCK_STEP = 0.25
+
 class LightEffect:
     """
     LightEffect manages multiple LightSegment instances to create a complete lighting effect.
@@ -27,6 +33,17 @@ class LightEffect:
         self.time_step = 1.0 / fps
         self.time = 0.0
         self.current_palette = "A"
+        self.structure_version = 0
+        
+        # Version of the last change to this effect or its segments, the LightScene holding it
+        # and the key it is stored under there (which change log paths use; may differ from effect_ID)
+        self.version = 0
+        self.owner = None
+        self.key = effect_ID
+        self.pending_changes: Optional[List[tuple]] = None
+        
+        # Per-LED accumulated transparency, reused by render()
+        self.led_transparency = np.ones(led_count)
         
     def set_palette(self, palette_id: str):
         """
@@ -41,6 +58,7 @@ class LightEffect:
 
         for segment in self.segments.values():
             segment.rgb_color = segment.calculate_rgb(self.current_palette)
+        self.record_change(("effect", self.key), "current_palette")
         
     def add_segment(self, segment_ID: int, segment: LightSegment):
         """
@@ -51,6 +69,10 @@ class LightEffect:
             segment: LightSegment instance to add
         """
         self.segments[segment_ID] = segment
+        segment.owner = self
+        segment.key = segment_ID
+        self.structure_version += 1
+        self.record_change(("effect", self.key), "segments")
         
     def remove_segment(self, segment_ID: int):
         """
@@ -60,7 +82,63 @@ class LightEffect:
             segment_ID: ID of the segment to remove
         """
         if segment_ID in self.segments:
-            del self.segments[segment_ID]
+            self.segments.pop(segment_ID).owner = None
+            self.structure_version += 1
+            self.record_change(("effect", self.key), "segments")
+    
+    def record_change(self, path: tuple, param_name: str) -> int:
+        """
+        Record a change to this effect or one of its segments.
+        
+        Args:
+            path: Changed object, relative to the scene
+            param_name: Name of the changed parameter
+            
+        Returns:
+            Version assigned to the change
+        """
+        if self.pending_changes is not None:
+            self.pending_changes.append((path, param_name))
+            return self.version
+        if self.owner is not None:
+            self.version = self.owner.record_change(path, param_name)
+        else:
+            self.version = next_version()
+        return self.version
+    
+    def batch_update(self, segment_IDs: Iterable[int], values: Iterable[Any],
+                     apply: Callable[[LightSegment, Any], Any]) -> List[int]:
+        """
+        Update many segments as one operation. All changes are recorded in a single
+        pass under one version instead of once per segment.
+        
+        Args:
+            segment_IDs: IDs of the segments to update (missing IDs are skipped)
+            values: Value for each segment, in the same order
+            apply: Function called as apply(segment, value); returning False marks the value as rejected
+            
+        Returns:
+            IDs of the segments that were updated
+        """
+        updated = []
+        self.pending_changes = []
+        try:
+            for segment_ID, value in zip(segment_IDs, values):
+                segment = self.segments.get(segment_ID)
+                if segment is not None and apply(segment, value) is not False:
+                    updated.append(segment_ID)
+        finally:
+            # Also runs when apply raises partway, so segments already changed are recorded
+            changes, self.pending_changes = self.pending_changes, None
+            if changes:
+                if self.owner is not None:
+                    self.version = self.owner.record_changes(changes)
+                else:
+                    self.version = next_version()
+                for path, _ in changes:
+                    if path[0] == "segment" and path[-1] in self.segments:
+                        self.segments[path[-1]].version = self.version
+        return updated
     
     def update_segment_param(self, segment_ID: int, param_name: str, value: Any):
         """
@@ -74,20 +152,110 @@ class LightEffect:
         if segment_ID in self.segments:
             self.segments[segment_ID].update_param(param_name, value)
     
-    def update_all(self):
+    def update_all(self, time: Optional[float] = None):
         """
         Update all segments based on the frame rate.
         Process movement and time-based effects for each frame.
+        
+        Args:
+            time: Show time of the frame from a clock source (see controllers.clock_source).
+                  If None, time advances by one frame (1 / fps).
         """
-        self.time += self.time_step
+        if time is None:
+            dt = self.time_step
+            self.time += dt
+        else:
+            # Segments move by the elapsed show time; clock jumps and effects that were not
+            # running move them by at most MAX_CLOCK_STEP, and never backwards
+            dt = min(max(time - self.time, 0.0), MAX_CLOCK_STEP)
+            self.time = time
         
         for segment in self.segments.values():
             segment.time = self.time
-            segment.update_position(self.fps)
+            segment.update_position(self.fps, dt)
+    
+    def render(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Render the LEDs into an array, accounting for overlapping segments.
+        Gives the same colors as get_led_output(), but each segment is drawn with array
+        operations over its LED range instead of a Python loop over the LEDs.
+        
+        Args:
+            out: Preallocated (n, 3) uint8 array with n >= led_count to render into
+                 (allocated if None or too small)
+            
+        Returns:
+            (led_count, 3) uint8 array (a view of out if given)
+        """
+        if out is None or len(out) < self.led_count:
+            out = np.empty((self.led_count, 3), dtype=np.uint8)
+        frame = out[:self.led_count]
+        frame[:] = 0
+        if len(self.led_transparency) != self.led_count:
+            self.led_transparency = np.ones(self.led_count)
+        led_transparency = self.led_transparency
+        led_transparency[:] = 1.0
+        
+        for segment_id, segment in sorted(self.segments.items(), key=lambda x: x[0]):
+            segment_data = segment.get_light_data(self.current_palette)
+            if segment_data['brightness'] <= 0:
+                continue
+            
+            positions = segment_data['positions']
+            start_pos = max(0, int(positions[0]))
+            end_pos = min(self.led_count - 1, int(positions[3]))
+            if start_pos > end_pos:
+                continue
+            
+            colors = np.array(segment_data['colors'], dtype=np.float64)
+            transparency = segment_data['transparency']
+            # The three parts of the segment, each a contiguous LED range blending two colors
+            first = start_pos
+            for part in range(3):
+                last = end_pos if part == 2 else min(end_pos, math.floor(positions[part + 1]))
+                if first <= last:
+                    self._draw_part(frame[first:last + 1], led_transparency[first:last + 1], first,
+                                    positions[part], positions[part + 1], colors[part], colors[part + 1],
+                                    transparency[part])
+                first = max(first, last + 1)
+        
+        return frame
+    
+    @staticmethod
+    def _draw_part(pixels: np.ndarray, led_transparency: np.ndarray, first: int, part_start: float,
+                   part_end: float, color1: np.ndarray, color2: np.ndarray, current_transparency: float):
+        # Same arithmetic as the loop in get_led_output(), over a range of LEDs at once
+        rel_pos = (np.arange(first, first + len(pixels)) - part_start) / max(1, part_end - part_start)
+        # interpolate_colors(), truncated toward zero like int()
+        led_color = np.clip((color1 + (color2 - color1) * rel_pos[:, None]).astype(np.int64), 0, 255)
+        
+        empty = ~pixels.any(axis=1)
+        if empty.all():
+            pixels[:] = led_color
+            led_transparency[:] = current_transparency
+            return
+        
+        # Blend over lit LEDs with the weights blend_colors() normalizes
+        weight_current = led_transparency
+        weight_new = current_transparency * (1.0 - led_transparency)
+        total_weight = weight_current + weight_new
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight_current = weight_current / total_weight
+            weight_new = weight_new / total_weight
+            weight_sum = weight_current + weight_new
+            blended = pixels * (weight_current / weight_sum)[:, None] + led_color * (weight_new / weight_sum)[:, None]
+        blend = ~empty & (total_weight > 0)
+        blended = np.where((weight_sum != 0)[:, None], np.nan_to_num(blended), 0.0)
+        
+        new_transparency = np.clip(led_transparency + current_transparency * (1.0 - led_transparency), 0.0, 1.0)
+        pixels[blend] = np.clip(blended[blend].astype(np.int64), 0, 255)
+        pixels[empty] = led_color[empty]
+        led_transparency[:] = np.where(empty, current_transparency, new_transparency)
     
     def get_led_output(self) -> List[List[int]]:
         """
         Get the final color values for all LEDs, accounting for overlapping segments.
+        Prefer render() for output drivers, which avoids building the nested lists.
         
         Returns:
             List of RGB color values for each LED [r, g, b]
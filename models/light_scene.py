@@ -1,9 +1,11 @@
 from typing import Dict, List, Any, Optional
 import json
 import sys
+import numpy as np
 sys.path.append('..')
 from models.light_effect import LightEffect
 from models.light_segment import LightSegment
+from models.change_log import ChangeLog
 from config import DEFAULT_COLOR_PALETTES
 
 class LightScene:
@@ -26,6 +28,12 @@ class LightScene:
         self.current_effect_ID = None
         self.palettes = DEFAULT_COLOR_PALETTES.copy()
         self.current_palette = "A"
+        self.structure_version = 0
+        
+        # Version of the last change anywhere in the scene, per-palette versions and the change log
+        self.version = 0
+        self.palette_versions: Dict[str, int] = {}
+        self.change_log = ChangeLog()
     
     def add_effect(self, effect_ID: int, effect: LightEffect):
         """
@@ -37,6 +45,10 @@ class LightScene:
         """
         self.effects[effect_ID] = effect
         effect.current_palette = self.current_palette
+        effect.owner = self
+        effect.key = effect_ID
+        self.structure_version += 1
+        self.record_change(("scene",), "effects")
         
         if self.current_effect_ID is None:
             self.current_effect_ID = effect_ID
@@ -49,7 +61,9 @@ class LightScene:
             effect_ID: ID of the effect to remove
         """
         if effect_ID in self.effects:
-            del self.effects[effect_ID]
+            self.effects.pop(effect_ID).owner = None
+            self.structure_version += 1
+            self.record_change(("scene",), "effects")
 
             if effect_ID == self.current_effect_ID:
                 if self.effects:
@@ -66,6 +80,7 @@ class LightScene:
         """
         if palette_id in self.palettes:
             self.current_palette = palette_id
+            self.record_change(("scene",), "current_palette")
 
             for effect in self.effects.values():
                 effect.set_palette(palette_id)
@@ -80,6 +95,7 @@ class LightScene:
         """
         if palette_id in self.palettes:
             self.palettes[palette_id] = colors
+            self._palette_changed(palette_id)
 
             if palette_id == self.current_palette:
                 self.set_palette(palette_id)
@@ -91,7 +107,7 @@ class LightScene:
         Args:
             new_palettes: Dictionary of palette_id -> color list
         """
-        self.palettes = new_palettes.copy()
+        self._replace_palettes(new_palettes.copy())
         
         if self.current_palette in self.palettes:
             self.set_palette(self.current_palette)
@@ -100,6 +116,58 @@ class LightScene:
             self.current_palette = next(iter(self.palettes.keys()))
             self.set_palette(self.current_palette)
     
+    def record_change(self, path: tuple, param_name: str) -> int:
+        """
+        Record a change to this scene or anything in it.
+        
+        Args:
+            path: Changed object, relative to the scene
+            param_name: Name of the changed parameter
+            
+        Returns:
+            Version assigned to the change
+        """
+        self.version = self.change_log.record(path, param_name)
+        return self.version
+    
+    def record_changes(self, changes: List[tuple]) -> int:
+        """
+        Record several changes made as one operation under a single version.
+        
+        Args:
+            changes: (path, param) pairs
+            
+        Returns:
+            Version assigned to the changes
+        """
+        self.version = self.change_log.record_many(changes)
+        return self.version
+    
+    def _replace_palettes(self, palettes: Dict[str, List[List[int]]]):
+        # Palettes that are gone are recorded too, so clients syncing from the change log drop them
+        for palette_id in set(self.palettes) - set(palettes):
+            self.palette_versions.pop(palette_id, None)
+            self.record_change(("palette", palette_id), "removed")
+        self.palettes = palettes
+        for palette_id in self.palettes:
+            self._palette_changed(palette_id)
+    
+    def _palette_changed(self, palette_id: str):
+        self.palette_versions[palette_id] = self.record_change(("palette", palette_id), "colors")
+    
+    def changes_since(self, version: int) -> Optional[Dict[tuple, int]]:
+        """
+        Get what changed in the scene after a version.
+        
+        Args:
+            version: Version the caller is up to date with
+            
+        Returns:
+            Dictionary mapping (path, param) to the version of its latest change, or None
+            if the change log no longer reaches back to that version
+        """
+        return self.change_log.changes_since(version)
+    
     def switch_effect(self, effect_ID: int):
         """
         Switch to a different LightEffect.
@@ -110,13 +178,30 @@ class LightScene:
         if effect_ID in self.effects:
             self.current_effect_ID = effect_ID
     
-    def update(self):
+    def update(self, time: Optional[float] = None):
         """
         Update the current LightEffect.
         Delegates to the active effect's update_all method.
+        
+        Args:
+            time: Show time of the frame from a clock source (None advances by one frame)
+        """
+        if self.current_effect_ID is not None and self.current_effect_ID in self.effects:
+            self.effects[self.current_effect_ID].update_all(time)
+    
+    def render(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Render the current effect into an array (see LightEffect.render).
+        
+        Args:
+            out: Preallocated (n, 3) uint8 array to render into
+            
+        Returns:
+            (led_count, 3) uint8 array, empty if there is no current effect
         """
         if self.current_effect_ID is not None and self.current_effect_ID in self.effects:
-            self.effects[self.current_effect_ID].update_all()
+            return self.effects[self.current_effect_ID].render(out)
+        return np.zeros((0, 3), dtype=np.uint8)
     
     def get_led_output(self) -> List[List[int]]:
         """
@@ -129,12 +214,12 @@ class LightScene:
             return self.effects[self.current_effect_ID].get_led_output()
         return []
     
-    def save_to_json(self, file_path: str):
+    def to_dict(self) -> Dict:
         """
-        Save the complete scene configuration to a JSON file.
+        Convert the scene to a dictionary representation for serialization.
         
-        Args:
-            file_path: Path to save the JSON file
+        Returns:
+            Dictionary containing scene properties, palettes and effects
         """
         data = {
             "scene_ID": self.scene_ID,
@@ -148,23 +233,19 @@ class LightScene:
             effect_data = effect.to_dict()
             data["effects"][str(effect_id)] = effect_data
         
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=4)
+        return data
     
     @classmethod
-    def load_from_json(cls, file_path: str):
+    def from_dict(cls, data: Dict):
         """
-        Load a scene configuration from a JSON file.
+        Create a scene from a dictionary representation (deserialization).
         
         Args:
-            file_path: Path to the JSON file
+            data: Dictionary containing scene properties
             
         Returns:
-            A new LightScene instance with the loaded configuration
+            A new LightScene instance
         """
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        
         scene = cls(scene_ID=data["scene_ID"])
         
         if "palettes" in data:
@@ -183,17 +264,67 @@ class LightScene:
             
         return scene
     
-    def save_palettes_to_json(self, file_path: str):
+    def save_to_json(self, file_path: str):
         """
-        Save only color palettes to a JSON file.
+        Save the complete scene configuration to a JSON file.
         
         Args:
             file_path: Path to save the JSON file
         """
-        data = {
+        data = self.to_dict()
+        
+        with open(file_path, 'w') as f:
+            json.dump(data, f, indent=4)
+    
+    @classmethod
+    def load_from_json(cls, file_path: str):
+        """
+        Load a scene configuration from a JSON file.
+        
+        Args:
+            file_path: Path to the JSON file
+            
+        Returns:
+            A new LightScene instance with the loaded configuration
+        """
+        with open(file_path, 'r') as f:
+            data = json.load(f)
+        
+        return cls.from_dict(data)
+    
+    def palettes_to_dict(self) -> Dict:
+        """
+        Convert the palettes to a dictionary representation for serialization.
+        
+        Returns:
+            Dictionary with the palettes and the current palette
+        """
+        return {
             "palettes": self.palettes,
             "current_palette": self.current_palette
         }
+    
+    def set_palettes_from_dict(self, data: Dict):
+        """
+        Replace the palettes from a dictionary created by palettes_to_dict().
+        
+        Args:
+            data: Dictionary with "palettes" and optionally "current_palette"
+        """
+        if "palettes" in data:
+            self._replace_palettes(data["palettes"])
+        
+        if "current_palette" in data:
+            self.set_palette(data["current_palette"])
+    
+    def save_palettes_to_json(self, file_path: str):
+        """
+        Save only color palettes to a JSON file.
+        
+        Args:
+            file_path: Path to save the JSON file
+        """
+        data = self.palettes_to_dict()
         
         with open(file_path, 'w') as f:
             json.dump(data, f, indent=4)
@@ -208,8 +339,4 @@ class LightScene:
         with open(file_path, 'r') as f:
             data = json.load(f)
         
-        if "palettes" in data:
-            self.palettes = data["palettes"]
-        
-        if "current_palette" in data:
-            self.set_palette(data["current_palette"])
\ No newline at end of file
+        self.set_palettes_from_dict(data)
@@ -4,6 +4,10 @@ import sys
 sys.path.append('..')
 from config import DEFAULT_COLOR_PALETTES
 from utils.color_utils import interpolate_colors, apply_brightness
+from models.change_log import next_version
+from utils.log_utils import get_logger
+
+logger = get_logger("models")
 
 class LightSegment:
     """
@@ -49,6 +53,12 @@ class LightSegment:
         self.rgb_color = self.calculate_rgb()
         self.total_length = sum(self.length)
 
+        # Version of the last parameter change, the LightEffect holding this segment and the
+        # key it is stored under there (which change log paths use; may differ from segment_ID)
+        self.version = 0
+        self.owner = None
+        self.key = segment_ID
+
     def update_param(self, param_name: str, value: Any):
         """
         Update a specific parameter of the segment.
@@ -77,16 +87,36 @@ class LightSegment:
                 self.current_position = self.move_range[0]
             elif self.current_position > self.move_range[1]:
                 self.current_position = self.move_range[1]
+
+        self.mark_changed(param_name)
+
+    def mark_changed(self, param_name: str) -> int:
+        """
+        Assign a new version to the segment and record the change in the scene's change log.
+        
+        Args:
+            param_name: Name of the changed parameter
+            
+        Returns:
+            Version assigned to the change
+        """
+        if self.owner is not None:
+            self.version = self.owner.record_change(("segment", self.owner.key, self.key), param_name)
+        else:
+            self.version = next_version()
+        return self.version
     
-    def update_position(self, fps: int):
+    def update_position(self, fps: int, dt: Optional[float] = None):
         """
         Update the position of the segment based on move_speed and fps.
         Based on the move_speed, only specified LED particles are moved in 1 second.
         
         Args:
             fps: Frames per second
+            dt: Elapsed time in seconds (defaults to one frame, 1 / fps)
         """
-        dt = 1.0 / fps
+        if dt is None:
+            dt = 1.0 / fps
         self.time += dt
         
         delta = self.move_speed * dt
@@ -128,7 +158,7 @@ class LightSegment:
                 else:
                     rgb_values.append([255, 0, 0])
             except Exception as e:
-                print(f"Error getting color {color_idx} from palette: {e}")
+                logger.warning("calculate_rgb", "Error getting color %s from palette: %s", color_idx, e)
                 rgb_values.append([255, 0, 0])
         
 
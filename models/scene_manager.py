@@ -68,7 +68,7 @@ class SceneManager:
             self.transition_start_time = 0.0
             self.transition_opacity = 0.0
     
-    def update(self):
+    def update(self, time: Optional[float] = None):
 
         if self.current_scene is None or self.current_scene not in self.scenes:
             return
@@ -118,7 +118,7 @@ class SceneManager:
                 self.next_palette_idx = None
         
 
-        current_scene.update()
+        current_scene.update(time)
     
     def get_led_output(self):
         if self.current_scene is None or self.current_scene not in self.scenes:
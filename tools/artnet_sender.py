@@ -0,0 +1,74 @@
+"""
+Art-Net test sender.
+
+Sends ArtDmx packets to a local (or remote) Art-Net input, for testing channel mappings
+and merging without a lighting desk. The pattern is a sine chase over the channels; run
+two senders with different --phase values to exercise HTP/LTP merging.
+
+Usage:
+    python tools/artnet_sender.py --universe 0 --channels 100 --fps 40 --seconds 10
+    python tools/artnet_sender.py --host 192.168.1.20 --universe 1 --phase 0.5
+"""
+
+import argparse
+import math
+import os
+import socket
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers.artnet_input import ARTNET_PORT, build_artdmx
+
+
+def chase(channels: int, t: float, period: float, phase: float) -> bytes:
+    """
+    Build one frame of the test pattern.
+
+    Args:
+        channels: Number of channels
+        t: Time in seconds
+        period: Seconds per cycle of the chase
+        phase: Offset of the pattern, 0.0~1.0
+
+    Returns:
+        Channel values
+    """
+    return bytes(
+        int(127.5 + 127.5 * math.sin(2 * math.pi * (t / period + phase + channel / channels)))
+        for channel in range(channels)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Send an Art-Net test pattern')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Destination address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=ARTNET_PORT, help=f'Destination port (default: {ARTNET_PORT})')
+    parser.add_argument('--universe', type=int, default=0, help='Universe (15-bit port address, default: 0)')
+    parser.add_argument('--channels', type=int, default=512, help='Channels per packet (default: 512)')
+    parser.add_argument('--fps', type=float, default=40.0, help='Packets per second (default: 40)')
+    parser.add_argument('--seconds', type=float, default=10.0, help='Duration, 0 for no limit (default: 10)')
+    parser.add_argument('--period', type=float, default=4.0, help='Seconds per cycle of the chase (default: 4)')
+    parser.add_argument('--phase', type=float, default=0.0, help='Pattern offset 0.0~1.0 (default: 0)')
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    interval = 1.0 / args.fps
+    start = time.perf_counter()
+    sent = 0
+    try:
+        while not args.seconds or time.perf_counter() - start < args.seconds:
+            t = time.perf_counter() - start
+            sequence = sent % 255 + 1
+            sock.sendto(build_artdmx(args.universe, chase(args.channels, t, args.period, args.phase), sequence),
+                        (args.host, args.port))
+            sent += 1
+            time.sleep(max(0.0, start + sent * interval - time.perf_counter()))
+    except KeyboardInterrupt:
+        pass
+    print(f"Sent {sent} packets to {args.host}:{args.port} universe {args.universe}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+OSC throughput benchmarks.
+
+Dispatch mode feeds pre-encoded OSC datagrams straight into OSCHandler's dispatcher and
+reports how many messages per second are parsed and applied, without any network I/O.
+
+Server mode starts a real OSC server ("threading", "asyncio" or "both"), floods it over UDP
+from a separate process while a render loop runs, and reports the sustained message rate
+and the jitter of the frame intervals.
+
+Usage:
+    python tools/osc_benchmark.py --messages 50000 --segments 100
+    python tools/osc_benchmark.py --server both --duration 5
+"""
+
+import argparse
+import contextlib
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from config import (
+    DEFAULT_TRANSPARENCY, DEFAULT_LENGTH, DEFAULT_MOVE_SPEED, DEFAULT_MOVE_RANGE,
+    DEFAULT_INITIAL_POSITION, DEFAULT_IS_EDGE_REFLECT, DEFAULT_DIMMER_TIME, DEFAULT_LED_COUNT, DEFAULT_FPS
+)
+from models.light_segment import LightSegment
+from models.light_effect import LightEffect
+from models.light_scene import LightScene
+from controllers.osc_handler import OSCHandler
+from controllers.frame_scheduler import FrameScheduler
+
+
+def build_scenes(segment_count: int):
+    scene = LightScene(scene_ID=1)
+    effect = LightEffect(effect_ID=1, led_count=DEFAULT_LED_COUNT, fps=DEFAULT_FPS)
+    for segment_id in range(1, segment_count + 1):
+        effect.add_segment(segment_id, LightSegment(
+            segment_ID=segment_id,
+            color=[0, 1, 2, 3],
+            transparency=list(DEFAULT_TRANSPARENCY),
+            length=list(DEFAULT_LENGTH),
+            move_speed=DEFAULT_MOVE_SPEED,
+            move_range=list(DEFAULT_MOVE_RANGE),
+            initial_position=DEFAULT_INITIAL_POSITION,
+            is_edge_reflect=DEFAULT_IS_EDGE_REFLECT,
+            dimmer_time=list(DEFAULT_DIMMER_TIME)
+        ))
+    scene.add_effect(1, effect)
+    return {1: scene}
+
+
+def encode(address: str, *values) -> bytes:
+    builder = OscMessageBuilder(address=address)
+    for value in values:
+        builder.add_arg(value)
+    return builder.build().dgram
+
+
+def build_messages(count: int, segment_count: int, seed: int = 0):
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        segment_id = rng.randint(1, segment_count)
+        kind = rng.randrange(5)
+        if kind == 0:
+            messages.append(encode(f"/scene/1/effect/1/segment/{segment_id}/color", [rng.randrange(6) for _ in range(4)]))
+        elif kind == 1:
+            messages.append(encode(f"/scene/1/effect/1/segment/{segment_id}/transparency", [rng.random() for _ in range(4)]))
+        elif kind == 2:
+            messages.append(encode(f"/scene/1/effect/1/segment/{segment_id}/move_speed", rng.uniform(-50, 50)))
+        elif kind == 3:
+            messages.append(encode(f"/scene/1/effect/1/segment/{segment_id}/is_edge_reflect", rng.randrange(2)))
+        else:
+            messages.append(encode(f"/effect/1/segment/{segment_id}/move_speed", rng.uniform(-50, 50)))
+    return messages
+
+
+def run_benchmark(message_count: int, segment_count: int, repeat: int = 3, messages_per_frame: int = 0) -> float:
+    """
+    Measure dispatcher throughput.
+
+    Args:
+        message_count: Number of messages per run
+        segment_count: Number of segments in the test effect
+        repeat: Number of runs (the best one is reported)
+        messages_per_frame: If set, queue updates and apply them once per this many messages
+
+    Returns:
+        Best throughput in messages per second
+    """
+    handler = OSCHandler(build_scenes(segment_count), ip="127.0.0.1", port=0)
+    handler.update_queue.immediate = not messages_per_frame
+    messages = build_messages(message_count, segment_count)
+    client_address = ("127.0.0.1", 9000)
+
+    best = 0.0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for i, datagram in enumerate(messages):
+                handler.dispatcher.call_handlers_for_packet(datagram, client_address)
+                if messages_per_frame and i % messages_per_frame == 0:
+                    handler.apply_pending_updates()
+            handler.apply_pending_updates()
+            elapsed = time.perf_counter() - start
+            best = max(best, message_count / elapsed)
+    return best
+
+
+def _send_datagrams(port: int, datagrams, duration: float, rate: float, sent_counter):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    interval = 1.0 / rate if rate else 0.0
+    start = time.perf_counter()
+    next_send = start
+    sent = 0
+    while time.perf_counter() - start < duration:
+        sock.sendto(datagrams[sent % len(datagrams)], ("127.0.0.1", port))
+        sent += 1
+        if interval:
+            next_send += interval
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    sent_counter.value = sent
+    sock.close()
+
+
+def free_port() -> int:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def run_server_benchmark(mode: str, duration: float, rate: float, segment_count: int, fps: int) -> dict:
+    """
+    Flood a live OSC server while rendering and measure throughput and frame jitter.
+
+    Args:
+        mode: Server mode passed to OSCHandler.start_server ("threading" or "asyncio")
+        duration: Length of the run in seconds
+        rate: Target send rate in messages per second (0 sends as fast as possible)
+        segment_count: Number of segments in the test effect
+        fps: Render loop frame rate
+
+    Returns:
+        Dictionary with sent/received counts, message rate and frame interval statistics
+    """
+    port = free_port()
+    scenes = build_scenes(segment_count)
+    handler = OSCHandler(scenes, ip="127.0.0.1", port=port)
+    scheduler = FrameScheduler(fps)
+    handler.set_frame_scheduler(scheduler)
+
+    frame_starts = []
+    scheduler.add_pre_update_hook(lambda frame_index: frame_starts.append(time.perf_counter()))
+
+    sent_counter = multiprocessing.Value("q", 0)
+    sender = multiprocessing.Process(target=_send_datagrams,
+                                     args=(port, build_messages(5000, segment_count), duration, rate, sent_counter))
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        handler.start_server(mode)
+        sender.start()
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration + 0.5:
+            scheduler.begin_frame()
+            scenes[1].update()
+            scheduler.end_frame(scenes[1].get_led_output())
+            scheduler.wait_for_next_frame()
+        sender.join()
+        handler.apply_pending_updates()
+        handler.stop_server()
+
+    stats = handler.get_update_stats()
+    intervals = [(b - a) * 1000.0 for a, b in zip(frame_starts, frame_starts[1:])]
+    return {
+        "mode": mode,
+        "sent": sent_counter.value,
+        "received": stats["received"],
+        "rate": stats["received"] / duration,
+        "frame_interval_mean_ms": statistics.mean(intervals),
+        "frame_interval_stdev_ms": statistics.pstdev(intervals),
+        "frame_interval_max_ms": max(intervals)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process OSC dispatch throughput benchmark")
+    parser.add_argument("--messages", type=int, default=50000, help="Messages per run (default: 50000)")
+    parser.add_argument("--segments", type=int, default=100, help="Segments in the test effect (default: 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs (default: 3)")
+    parser.add_argument("--messages-per-frame", type=int, default=0,
+                        help="Coalesce updates and apply them once per this many messages (default: apply immediately)")
+    parser.add_argument("--server", choices=["threading", "asyncio", "both"],
+                        help="Benchmark a live server over UDP instead of in-process dispatch")
+    parser.add_argument("--duration", type=float, default=5.0, help="Server benchmark duration in seconds (default: 5)")
+    parser.add_argument("--rate", type=float, default=0, help="Server benchmark send rate (default: as fast as possible)")
+    parser.add_argument("--fps", type=int, default=60, help="Server benchmark render rate (default: 60)")
+    args = parser.parse_args()
+
+    if args.server:
+        modes = ["threading", "asyncio"] if args.server == "both" else [args.server]
+        for mode in modes:
+            result = run_server_benchmark(mode, args.duration, args.rate, args.segments, args.fps)
+            print(f"{mode:>9}: {result['rate']:,.0f} messages/sec received "
+                  f"({result['received']}/{result['sent']} messages), "
+                  f"frame interval {result['frame_interval_mean_ms']:.2f} ms "
+                  f"+/- {result['frame_interval_stdev_ms']:.2f} ms (max {result['frame_interval_max_ms']:.2f} ms)")
+        return
+
+    rate = run_benchmark(args.messages, args.segments, args.repeat, args.messages_per_frame)
+    mode = f"coalesced every {args.messages_per_frame} messages" if args.messages_per_frame else "immediate"
+    print(f"dispatch ({mode}): {rate:,.0f} messages/sec ({args.messages} messages, {args.segments} segments)")
+
+
+if __name__ == "__main__":
+    main()
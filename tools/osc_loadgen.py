@@ -0,0 +1,394 @@
+"""
+OSC load generator.
+
+Starts a live OSCHandler with a render loop, replays a mix of segment, palette and scene
+messages to it over UDP from a separate process at one or more target rates, and reports
+for each rate:
+
+- loss: messages sent vs. messages that reached the update queue (including messages
+  shed by the ingress queue, which are reported separately)
+- applied latency: time from sending a probe message until the frame that applied it
+- frame impact: frame work time and frame interval with load vs. an idle baseline
+
+Probes are move_speed writes to a separate, never rendered effect (effect 2) whose value
+is the probe number, so lost or coalesced probes are told apart from applied ones.
+Reports can be saved as JSON and compared with a report from another version.
+
+Usage:
+    python tools/osc_loadgen.py --rate 2000,10000,40000 --mix segment=80,palette=10,scene=10
+    python tools/osc_loadgen.py --rate 10000 --report after.json --compare before.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    DEFAULT_TRANSPARENCY, DEFAULT_LENGTH, DEFAULT_MOVE_RANGE, DEFAULT_INITIAL_POSITION, DEFAULT_DIMMER_TIME,
+    DEFAULT_LED_COUNT, DEFAULT_FPS
+)
+from models.light_segment import LightSegment
+from models.light_effect import LightEffect
+from controllers.osc_handler import OSCHandler
+from controllers.frame_scheduler import FrameScheduler
+from controllers.packed_params import PACKED_RECORD_DTYPE, PACKED_PARAMS
+from tools.osc_benchmark import build_scenes, encode, free_port
+
+import numpy as np
+
+MESSAGE_CLASSES = ("segment", "bulk", "packed", "palette", "scene")
+DEFAULT_MIX = "segment=80,palette=10,scene=10"
+PROBE_EFFECT_ID = 2
+PROBE_SEGMENTS = 64
+
+
+def parse_mix(spec: str) -> dict:
+    """
+    Parse a message mix such as "segment=80,palette=10,scene=10".
+
+    Returns:
+        Dictionary mapping message class to weight
+    """
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in MESSAGE_CLASSES:
+            raise argparse.ArgumentTypeError(f"Unknown message class {name!r} (choose from {', '.join(MESSAGE_CLASSES)})")
+        mix[name] = float(weight) if weight else 1.0
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("Mix weights must not all be zero")
+    return mix
+
+
+def build_mix_messages(mix: dict, count: int, segment_count: int, seed: int = 0) -> list:
+    """
+    Build a pool of encoded messages drawn from the mix.
+
+    segment: single segment parameters (color, transparency, move_speed, is_edge_reflect)
+    bulk:    /segment/* and /segment/[a-b] writes
+    packed:  packed blobs of 16 records
+    palette: /palette/{A-E} with five RGB colors
+    scene:   scene and effect palette selection
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    prefix = "/scene/1/effect/1"
+    messages = []
+    for name in rng.choices(names, weights, k=count):
+        segment_id = rng.randint(1, segment_count)
+        if name == "segment":
+            kind = rng.randrange(4)
+            if kind == 0:
+                messages.append(encode(f"{prefix}/segment/{segment_id}/color", [rng.randrange(6) for _ in range(4)]))
+            elif kind == 1:
+                messages.append(encode(f"{prefix}/segment/{segment_id}/transparency", [rng.random() for _ in range(4)]))
+            elif kind == 2:
+                messages.append(encode(f"{prefix}/segment/{segment_id}/move_speed", rng.uniform(-50, 50)))
+            else:
+                messages.append(encode(f"{prefix}/segment/{segment_id}/is_edge_reflect", rng.randrange(2)))
+        elif name == "bulk":
+            if rng.randrange(2):
+                messages.append(encode(f"{prefix}/segment/*/move_speed", rng.uniform(-50, 50)))
+            else:
+                first = rng.randint(1, segment_count)
+                last = min(segment_count, first + rng.randrange(32))
+                messages.append(encode(f"{prefix}/segment/[{first}-{last}]/transparency", rng.random()))
+        elif name == "packed":
+            records = np.zeros(16, dtype=PACKED_RECORD_DTYPE)
+            records["segment_id"] = [rng.randint(1, segment_count) for _ in range(16)]
+            records["param_id"] = PACKED_PARAMS.index("current_position")
+            records["value"] = [rng.uniform(0, DEFAULT_LED_COUNT) for _ in range(16)]
+            messages.append(encode(f"{prefix}/packed", records.tobytes()))
+        elif name == "palette":
+            colors = [rng.randrange(256) for _ in range(15)]
+            messages.append(encode(f"/palette/{rng.choice('ABCDE')}", colors))
+        else:
+            palette_id = rng.choice("ABCDE")
+            address = "/scene/1/set_palette" if rng.randrange(2) else f"{prefix}/set_palette"
+            messages.append(encode(address, palette_id))
+    return messages
+
+
+def add_probe_effect(scenes: dict):
+    """
+    Add the effect probe messages are written to. It is never the current effect,
+    so probe values do not affect rendering.
+    """
+    effect = LightEffect(effect_ID=PROBE_EFFECT_ID, led_count=DEFAULT_LED_COUNT, fps=DEFAULT_FPS)
+    for segment_id in range(1, PROBE_SEGMENTS + 1):
+        effect.add_segment(segment_id, LightSegment(
+            segment_ID=segment_id,
+            color=[0, 1, 2, 3],
+            transparency=list(DEFAULT_TRANSPARENCY),
+            length=list(DEFAULT_LENGTH),
+            move_speed=-1.0,
+            move_range=list(DEFAULT_MOVE_RANGE),
+            initial_position=DEFAULT_INITIAL_POSITION,
+            is_edge_reflect=False,
+            dimmer_time=list(DEFAULT_DIMMER_TIME)
+        ))
+    scenes[1].add_effect(PROBE_EFFECT_ID, effect)
+    return effect
+
+
+def _send_load(port: int, datagrams: list, duration: float, rate: float, probe_every: int,
+               probe_times, sent_counter, probe_counter):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+    address = ("127.0.0.1", port)
+    probes = [encode(f"/scene/1/effect/{PROBE_EFFECT_ID}/segment/{i % PROBE_SEGMENTS + 1}/move_speed", float(i))
+              for i in range(len(probe_times))]
+    sent = 0
+    probe = 0
+    start = time.perf_counter()
+    while True:
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            break
+        # Send in small bursts to keep up with rates above the sleep resolution
+        due = int(elapsed * rate) + 1 if rate else sent + 64
+        while sent < due:
+            if sent % probe_every == 0 and probe < len(probe_times):
+                probe_times[probe] = time.perf_counter()
+                sock.sendto(probes[probe], address)
+                probe += 1
+            else:
+                sock.sendto(datagrams[sent % len(datagrams)], address)
+            sent += 1
+        if rate:
+            time.sleep(0.0005)
+    sent_counter.value = sent
+    probe_counter.value = probe
+    sock.close()
+
+
+def _percentile(values: list, fraction: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _summarize(values: list) -> dict:
+    if not values:
+        return {"mean": float("nan"), "p50": float("nan"), "p99": float("nan"), "max": float("nan")}
+    return {
+        "mean": statistics.mean(values),
+        "p50": _percentile(values, 0.5),
+        "p99": _percentile(values, 0.99),
+        "max": max(values)
+    }
+
+
+def run_load(rate: float, mix: dict, duration: float, segment_count: int, fps: int, server: str,
+             baseline: float = 1.0, probe_rate: float = 200.0, drain: float = 0.5) -> dict:
+    """
+    Run one load step against a fresh OSCHandler.
+
+    Args:
+        rate: Target send rate in messages per second (0 sends as fast as possible)
+        mix: Message class weights (see parse_mix)
+        duration: Length of the loaded phase in seconds
+        segment_count: Number of segments in the rendered effect
+        fps: Render loop frame rate
+        server: Server mode passed to OSCHandler.start_server
+        baseline: Length of the idle phase measured before the load starts
+        probe_rate: Latency probes sent per second
+        drain: Time to keep rendering after the sender stops
+
+    Returns:
+        Dictionary with sent/received counts, loss, probe latency and frame statistics
+    """
+    port = free_port()
+    scenes = build_scenes(segment_count)
+    probe_effect = add_probe_effect(scenes)
+    probe_segments = [probe_effect.segments[i + 1] for i in range(PROBE_SEGMENTS)]
+    handler = OSCHandler(scenes, ip="127.0.0.1", port=port)
+    scheduler = FrameScheduler(fps)
+    handler.set_frame_scheduler(scheduler)
+
+    effective_rate = rate if rate else 100000.0
+    probe_every = max(1, int(effective_rate / probe_rate))
+    max_probes = int(duration * effective_rate / probe_every) + 16
+    probe_times = multiprocessing.Array("d", max_probes, lock=False)
+    applied_times = {}
+    last_seen = [-1.0] * PROBE_SEGMENTS
+
+    def collect_probes(frame_index):
+        # Registered after the update queue hook, so this sees the updates applied this frame
+        now = time.perf_counter()
+        for i, segment in enumerate(probe_segments):
+            value = segment.move_speed
+            if value != last_seen[i]:
+                last_seen[i] = value
+                applied_times[int(value)] = now
+
+    scheduler.add_pre_update_hook(collect_probes)
+
+    sent_counter = multiprocessing.Value("q", 0)
+    probe_counter = multiprocessing.Value("q", 0)
+    sender = multiprocessing.Process(target=_send_load, args=(
+        port, build_mix_messages(mix, 4096, segment_count), duration, rate, probe_every,
+        probe_times, sent_counter, probe_counter))
+
+    phases = {"baseline": ([], []), "load": ([], [])}
+    overruns = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        handler.start_server(server)
+        for phase, length in (("baseline", baseline), ("load", duration + drain)):
+            durations, starts = phases[phase]
+            overruns_before = scheduler.overruns
+            if phase == "load":
+                sender.start()
+            phase_start = time.perf_counter()
+            while time.perf_counter() - phase_start < length:
+                scheduler.begin_frame()
+                starts.append(scheduler.frame_start)
+                scenes[1].update()
+                scheduler.end_frame(scenes[1].get_led_output())
+                durations.append(scheduler.last_frame_duration * 1000.0)
+                scheduler.wait_for_next_frame()
+            overruns[phase] = scheduler.overruns - overruns_before
+        sender.join()
+        handler.apply_pending_updates()
+        handler.stop_server()
+
+    stats = handler.get_update_stats()
+    sent = sent_counter.value
+    probes_sent = probe_counter.value
+    received = stats["received"]
+    latencies = [(applied_times[i] - probe_times[i]) * 1000.0 for i in range(probes_sent) if i in applied_times]
+
+    result = {
+        "rate": rate,
+        "mix": mix,
+        "server": server,
+        "segments": segment_count,
+        "fps": fps,
+        "duration": duration,
+        "sent": sent,
+        "received": received,
+        "loss": 1.0 - received / sent if sent else 0.0,
+        "received_rate": received / duration,
+        "applied": stats["applied"],
+        "coalesced": stats["coalesced"],
+        "errors": stats["errors"],
+        "probes_sent": probes_sent,
+        "probes_applied": len(latencies),
+        "latency_ms": _summarize(latencies),
+        "ingress": handler.get_ingress_stats()
+    }
+    for phase, (durations, starts) in phases.items():
+        intervals = [(b - a) * 1000.0 for a, b in zip(starts, starts[1:])]
+        result[f"{phase}_frame_ms"] = _summarize(durations)
+        result[f"{phase}_interval_ms"] = _summarize(intervals)
+        result[f"{phase}_overruns"] = overruns[phase]
+    return result
+
+
+def format_result(result: dict) -> str:
+    latency = result["latency_ms"]
+    return (f"{result['rate']:>8,.0f}/s  received {result['received_rate']:>8,.0f}/s  "
+            f"loss {result['loss'] * 100:5.1f}%  "
+            f"latency p50 {latency['p50']:6.1f} p99 {latency['p99']:6.1f} ms  "
+            f"frame p99 {result['baseline_frame_ms']['p99']:5.2f} -> {result['load_frame_ms']['p99']:5.2f} ms  "
+            f"interval max {result['baseline_interval_ms']['max']:5.1f} -> {result['load_interval_ms']['max']:5.1f} ms")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare_reports(old: dict, new: dict) -> list:
+    """
+    Compare two reports step by step (steps are matched by rate, mix and server mode).
+
+    Returns:
+        Lines describing the change of the main metrics
+    """
+    def step_key(result):
+        return (result["rate"], json.dumps(result["mix"], sort_keys=True), result["server"])
+
+    metrics = (
+        ("received/s", lambda r: r["received_rate"]),
+        ("loss %", lambda r: r["loss"] * 100),
+        ("latency p50 ms", lambda r: r["latency_ms"]["p50"]),
+        ("latency p99 ms", lambda r: r["latency_ms"]["p99"]),
+        ("frame p99 ms", lambda r: r["load_frame_ms"]["p99"]),
+        ("interval max ms", lambda r: r["load_interval_ms"]["max"])
+    )
+    old_steps = {step_key(result): result for result in old["results"]}
+    lines = [f"comparing {old['meta'].get('revision') or '?'} -> {new['meta'].get('revision') or '?'}"]
+    for result in new["results"]:
+        previous = old_steps.get(step_key(result))
+        if previous is None:
+            lines.append(f"{result['rate']:>8,.0f}/s  no matching step in the old report")
+            continue
+        changes = [f"{name} {getter(previous):,.2f} -> {getter(result):,.2f}" for name, getter in metrics]
+        lines.append(f"{result['rate']:>8,.0f}/s  " + ", ".join(changes))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OSC load generator for a live OSCHandler")
+    parser.add_argument("--rate", default="1000,5000,20000",
+                        help="Comma-separated target rates in messages/sec; 0 sends as fast as possible (default: 1000,5000,20000)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Message class weights, classes: {', '.join(MESSAGE_CLASSES)} (default: {DEFAULT_MIX})")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load per rate (default: 5)")
+    parser.add_argument("--baseline", type=float, default=1.0, help="Seconds of idle rendering measured before each rate (default: 1)")
+    parser.add_argument("--segments", type=int, default=100, help="Segments in the rendered effect (default: 100)")
+    parser.add_argument("--fps", type=int, default=60, help="Render rate (default: 60)")
+    parser.add_argument("--server", choices=["threading", "asyncio"], default="threading", help="OSC server mode (default: threading)")
+    parser.add_argument("--probe-rate", type=float, default=200.0, help="Latency probes per second (default: 200)")
+    parser.add_argument("--report", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Compare the results with an earlier JSON report")
+    args = parser.parse_args()
+
+    rates = [float(rate) for rate in args.rate.split(",")]
+    results = []
+    for rate in rates:
+        result = run_load(rate, args.mix, args.duration, args.segments, args.fps, args.server,
+                          args.baseline, args.probe_rate)
+        print(format_result(result))
+        results.append(result)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "results": results
+    }
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=4)
+    if args.compare:
+        with open(args.compare) as f:
+            for line in compare_reports(json.load(f), report):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
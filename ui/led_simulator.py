@@ -60,6 +60,7 @@ class LEDSimulator:
         
         self.is_playing = True
         self.fps = DEFAULT_FPS
+        self.frame_scheduler = None
         self.last_segment_state = None
         self.segment_states = {}
         self.previous_layout_mode = None
@@ -994,10 +995,7 @@ class LEDSimulator:
         elif event.ui_element in [self.ui_elements.get('fade_toggle'), self.ui_elements.get('fade_toggle_2')]:
             segment = self._get_active_segment()
             if segment:
-                if hasattr(segment, 'fade'):
-                    segment.fade = not segment.fade
-                else:
-                    segment.fade = True
+                segment.update_param('fade', not getattr(segment, 'fade', False))
                 
                 text = 'ON' if segment.fade else 'OFF'
                 if self.ui_elements.get('fade_toggle'):
@@ -1008,13 +1006,10 @@ class LEDSimulator:
         elif event.ui_element == self.ui_elements.get('gradient_toggle'):
             segment = self._get_active_segment()
             if segment:
-                if hasattr(segment, 'gradient'):
-                    segment.gradient = not segment.gradient
-                else:
-                    segment.gradient = True
-                    
-                if segment.gradient and (not hasattr(segment, 'gradient_colors') or segment.gradient_colors[0] == 0):
-                    segment.gradient_colors = [1, 0, 1] 
+                gradient = not getattr(segment, 'gradient', False)
+                if gradient and (not hasattr(segment, 'gradient_colors') or segment.gradient_colors[0] == 0):
+                    segment.update_param('gradient_colors', [1, 0, 1])
+                segment.update_param('gradient', gradient)
                 
                 event.ui_element.set_text('オン' if segment.gradient else 'オフ')
         
@@ -1022,7 +1017,7 @@ class LEDSimulator:
         elif event.ui_element == self.ui_elements.get('reflect_toggle'):
             segment = self._get_active_segment()
             if segment:
-                segment.is_edge_reflect = not segment.is_edge_reflect
+                segment.update_param('is_edge_reflect', not segment.is_edge_reflect)
                 event.ui_element.set_text('オン' if segment.is_edge_reflect else 'オフ')
         
 
@@ -1104,26 +1099,26 @@ class LEDSimulator:
         
 
         elif event.ui_element == self.ui_elements.get('speed_slider'):
-            segment.move_speed = event.value
+            segment.update_param('move_speed', event.value)
         
         elif event.ui_element == self.ui_elements.get('position_slider'):
-            segment.current_position = event.value
+            segment.update_param('current_position', event.value)
         
         elif event.ui_element == self.ui_elements.get('initial_position_slider'):
-            segment.initial_position = int(event.value)
+            segment.update_param('initial_position', int(event.value))
         
 
         elif event.ui_element == self.ui_elements.get('range_min'):
 
             new_min = min(int(event.value), segment.move_range[1])
-            segment.move_range[0] = new_min
+            segment.update_param('move_range', [new_min, segment.move_range[1]])
             if self.ui_elements.get('range_min'):
                 self.ui_elements['range_min'].set_current_value(new_min)
         
         elif event.ui_element == self.ui_elements.get('range_max'):
 
             new_max = max(int(event.value), segment.move_range[0])
-            segment.move_range[1] = new_max
+            segment.update_param('move_range', [segment.move_range[0], new_max])
             if self.ui_elements.get('range_max'):
                 self.ui_elements['range_max'].set_current_value(new_max)
         
@@ -1131,19 +1126,25 @@ class LEDSimulator:
         for i in range(4):  # 4 vị trí độ trong suốt
             if event.ui_element == self.ui_elements.get(f'transparency_{i}_slider'):
                 if i < len(segment.transparency):
-                    segment.transparency[i] = event.value
+                    transparency = list(segment.transparency)
+                    transparency[i] = event.value
+                    segment.update_param('transparency', transparency)
                 
 
         for i in range(5):  # 5 tham số dimmer_time
             if event.ui_element == self.ui_elements.get(f'dimmer_time_{i}_slider'):
                 if hasattr(segment, 'dimmer_time') and i < len(segment.dimmer_time):
-                    segment.dimmer_time[i] = int(event.value)
+                    dimmer_time = list(segment.dimmer_time)
+                    dimmer_time[i] = int(event.value)
+                    segment.update_param('dimmer_time', dimmer_time)
         
 
         for i in range(3):  # 3 phần chiều dài
             if event.ui_element == self.ui_elements.get(f'length_{i}_slider'):
                 if i < len(segment.length):
-                    segment.length[i] = int(event.value)
+                    length = list(segment.length)
+                    length[i] = int(event.value)
+                    segment.update_param('length', length)
                     
 
                     if self.ui_elements.get('total_length_label'):
@@ -1208,7 +1209,9 @@ class LEDSimulator:
                 if event.ui_element == self.ui_elements.get(f'color_{i}_dropdown'):
                     color_idx = int(event.text)
                     if i < len(segment.color):
-                        segment.color[i] = color_idx
+                        color = list(segment.color)
+                        color[i] = color_idx
+                        segment.update_param('color', color)
 
                         if hasattr(segment, 'calculate_rgb'):
                             segment.rgb_color = segment.calculate_rgb(self.scene.current_palette)
@@ -1625,11 +1628,19 @@ class LEDSimulator:
                 self._build_ui()
             
 
+            if self.frame_scheduler:
+                self.frame_scheduler.begin_frame()
+
             if self.is_playing:
+                frame_time = self.frame_scheduler.frame_time if self.frame_scheduler else None
                 if self.scene_manager:
-                    self.scene_manager.update()
+                    self.scene_manager.update(frame_time)
                 else:
-                    self.scene.update()
+                    self.scene.update(frame_time)
+
+            if self.frame_scheduler:
+                source = self.scene_manager if self.scene_manager else self.scene
+                self.frame_scheduler.end_frame(source.get_led_output() if self.frame_scheduler.frame_hooks else None)
             
 
             self.screen.fill(UI_BACKGROUND_COLOR)
@@ -2,8 +2,11 @@ from .color_utils import (
     interpolate_colors, apply_transparency, blend_colors,
     apply_brightness, get_color_from_palette
 )
+from .frame_utils import frame_to_array
+from .log_utils import RateLimitedLogger, get_logger
 
 __all__ = [
     'interpolate_colors', 'apply_transparency', 'blend_colors',
-    'apply_brightness', 'get_color_from_palette'
-]
\ No newline at end of file
+    'apply_brightness', 'get_color_from_palette', 'frame_to_array',
+    'RateLimitedLogger', 'get_logger'
+]
@@ -0,0 +1,34 @@
+"""
+Utility functions for handling rendered LED frames.
+These functions convert the output of get_led_output() (or arrays from render()) into packed RGB24 arrays for output drivers.
+"""
+
+from typing import List, Optional, Union
+import numpy as np
+
+Frame = Union[List[List[int]], np.ndarray]
+
+def frame_to_array(frame: Frame, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert a rendered frame into a packed (led_count, 3) uint8 array.
+
+    Args:
+        frame: List of RGB values [[r, g, b], ...] or an existing array
+        out: Optional preallocated (n, 3) uint8 array to write into
+
+    Returns:
+        Array of shape (led_count, 3) with dtype uint8 (a view of out if given)
+    """
+    if isinstance(frame, np.ndarray) and frame.dtype == np.uint8:
+        pixels = frame.reshape(-1, 3)
+    elif len(frame) == 0:
+        pixels = np.zeros((0, 3), dtype=np.uint8)
+    else:
+        pixels = np.asarray(frame, dtype=np.uint8).reshape(-1, 3)
+
+    if out is None:
+        return pixels
+
+    count = min(len(pixels), len(out))
+    out[:count] = pixels[:count]
+    return out[:count]
@@ -0,0 +1,135 @@
+from typing import Dict, List, Tuple
+import logging
+import threading
+import time
+
+LOGGER_NAME = "color_signal_system"
+
+
+class RateLimitedLogger:
+    """
+    RateLimitedLogger wraps a logging.Logger for messages logged from hot paths.
+
+    Every message has a key (e.g. "update.color"). At most burst messages per key are
+    emitted per interval; the rest are only counted, and when the interval ends one summary
+    line per key reports how many messages were logged ("update.color: 1234 messages in
+    the last 1.0s, 1229 not shown"). Messages use %-style arguments, which are only
+    formatted when the message is emitted, and a disabled level returns immediately.
+    """
+
+    def __init__(self, name: str, interval: float = 1.0, burst: int = 5):
+        """
+        Initialize the logger.
+
+        Args:
+            name: Name of the underlying logging.Logger
+            interval: Length of a rate limiting window in seconds
+            burst: Messages emitted per key and window before suppressing
+        """
+        self.logger = logging.getLogger(name)
+        self.interval = interval
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_counts: Dict[str, List[int]] = {}
+        self.totals: Dict[str, int] = {}
+
+    def isEnabledFor(self, level: int) -> bool:
+        """
+        Check whether messages of a level would be logged, like logging.Logger.isEnabledFor.
+        """
+        return self.logger.isEnabledFor(level)
+
+    def debug(self, key: str, msg: str, *args):
+        self.log(logging.DEBUG, key, msg, *args)
+
+    def info(self, key: str, msg: str, *args):
+        self.log(logging.INFO, key, msg, *args)
+
+    def warning(self, key: str, msg: str, *args):
+        self.log(logging.WARNING, key, msg, *args)
+
+    def error(self, key: str, msg: str, *args):
+        self.log(logging.ERROR, key, msg, *args)
+
+    def log(self, level: int, key: str, msg: str, *args):
+        """
+        Log a message unless its key exceeded the rate limit in the current window.
+
+        Args:
+            level: Logging level
+            key: Rate limiting key
+            msg: Message format string
+            *args: Arguments for the format string
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+
+        now = time.monotonic()
+        summaries = None
+        with self.lock:
+            if now - self.window_start >= self.interval:
+                summaries = self._roll(now)
+            counts = self.window_counts.get(key)
+            if counts is None:
+                counts = self.window_counts[key] = [level, 0]
+            counts[1] += 1
+            self.totals[key] = self.totals.get(key, 0) + 1
+            emit = counts[1] <= self.burst
+
+        if summaries:
+            self._emit_summaries(summaries)
+        if emit:
+            self.logger.log(level, msg, *args)
+
+    def flush(self):
+        """
+        End the current window and emit the summaries of suppressed messages.
+        """
+        with self.lock:
+            summaries = self._roll(time.monotonic())
+        self._emit_summaries(summaries)
+
+    def _roll(self, now: float) -> List[Tuple[str, int, int, float]]:
+        elapsed = now - self.window_start
+        summaries = [(key, level, count, elapsed) for key, (level, count) in self.window_counts.items()
+                     if count > self.burst]
+        self.window_counts = {}
+        self.window_start = now
+        return summaries
+
+    def _emit_summaries(self, summaries: List[Tuple[str, int, int, float]]):
+        for key, level, count, elapsed in summaries:
+            self.logger.log(level, "%s: %d messages in the last %.1fs, %d not shown",
+                            key, count, elapsed, count - self.burst)
+
+    def get_counts(self) -> Dict[str, int]:
+        """
+        Get the number of messages logged per key, including suppressed ones.
+
+        Returns:
+            Dictionary mapping key to message count
+        """
+        with self.lock:
+            return dict(self.totals)
+
+
+_loggers: Dict[str, RateLimitedLogger] = {}
+_loggers_lock = threading.Lock()
+
+
+def get_logger(name: str) -> RateLimitedLogger:
+    """
+    Get the shared rate limited logger for a component.
+
+    Args:
+        name: Component name, used as a child of the application logger (e.g. "osc")
+
+    Returns:
+        RateLimitedLogger for color_signal_system.<name>
+    """
+    with _loggers_lock:
+        logger = _loggers.get(name)
+        if logger is None:
+            logger = _loggers[name] = RateLimitedLogger(f"{LOGGER_NAME}.{name}")
+        return logger